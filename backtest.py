@@ -1,47 +1,113 @@
 import os
-from untrade.client import Client
 from tabulate import tabulate
 import json
+from loader import read_csv_cached
+from local_backtest import as_event_stream, run_backtest
+from instrument import instrumented
 
-def perform_backtest(csv_file_path):
-    client = Client()
+_client = None
+
+def untrade_client():
+    """
+    The untrade Client shared by every backtest of this process, created on first use.
+    """
+    global _client
+    if _client is None:
+        from untrade.client import Client
+
+        _client = Client()
+    return _client
+
+@instrumented(rows=None)
+def perform_backtest(csv_file_path, leverage=1, client=None):
+    client = client or untrade_client()
 
     result = client.backtest(
         file_path=csv_file_path,
-        leverage=1,
+        leverage=leverage,
         jupyter_id="screening",
     )
     return result
 
+@instrumented(rows=None)
+def perform_local_backtest(csv_file_path, leverage=1, fee=0.001, slippage=0.0):
+    """
+    Backtest a signals CSV locally, without a network round trip.
+
+    Returns the same 'data: ...' event lines as perform_backtest, so the
+    result can be passed to parse_and_print_statistics unchanged.
+    """
+    data = read_csv_cached(csv_file_path)
+    statistics = run_backtest(data, leverage=leverage, fee=fee, slippage=slippage)
+    return as_event_stream(statistics)
+
+def print_statistics(stats):
+    static_stats = stats.get("static_statistics", {})
+    compound_stats = stats.get("compound_statistics", {})
+
+    static_table = [[key, value] for key, value in static_stats.items()]
+    print("\nStatic Statistics:")
+    print(tabulate(static_table, headers=["Metric", "Value"], tablefmt="pretty"))
+
+    compound_table = [[key, value] for key, value in compound_stats.items()]
+    print("\nCompound Statistics:")
+    print(tabulate(compound_table, headers=["Metric", "Value"], tablefmt="pretty"))
+
+def parse_event_stream(result):
+    """
+    Extract the statistics from the 'data: {...}' event lines of a backtest.
+
+    Parameters:
+        result (iterable): Event lines (str or bytes) as returned by the client.
+
+    Returns:
+        dict: The 'result' payload of the first data event.
+
+    Raises:
+        ValueError: If no line carries a data event.
+    """
+    for item in result:
+        if isinstance(item, bytes):
+            item = item.decode()
+        if isinstance(item, str) and "data: " in item:
+            return json.loads(item.split("data: ", 1)[1]).get("result", {})
+    raise ValueError("No 'data:' event in the backtest result")
+
 def parse_and_print_statistics(result):
     try:
-        for item in result:
-            if isinstance(item, str):
-                result_data = json.loads(item.split("data: ", 1)[1])
-                stats = result_data.get("result", {})
-                static_stats = stats.get("static_statistics", {})
-                compound_stats = stats.get("compound_statistics", {})
-
-                static_table = [[key, value] for key, value in static_stats.items()]
-                print("\nStatic Statistics:")
-                print(tabulate(static_table, headers=["Metric", "Value"], tablefmt="pretty"))
-
-                compound_table = [[key, value] for key, value in compound_stats.items()]
-                print("\nCompound Statistics:")
-                print(tabulate(compound_table, headers=["Metric", "Value"], tablefmt="pretty"))
-                break
+        print_statistics(parse_event_stream(result))
     except Exception as e:
         print(f"Error parsing backtest result: {e}")
         print("Raw result:", result)
 
 if __name__ == "__main__":
-    csv_file_path = "/Users/shivanshgupta/Desktop/zelta hack/signals_BTC_2019_2023_15m.csv"
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Backtest a signals CSV.")
+    parser.add_argument("--file", default=None,
+                        help="signals CSV (default: BTC_2019_2023_15m.csv in the configured signals folder)")
+    parser.add_argument("--config", default=None, help="pipeline JSON configuration (signals folder)")
+    parser.add_argument("--local", action="store_true", help="use the local backtester instead of untrade")
+    parser.add_argument("--leverage", type=float, default=1)
+    parser.add_argument("--fee", type=float, default=0.001, help="fee per unit traded (local only)")
+    parser.add_argument("--slippage", type=float, default=0.0, help="slippage per unit traded (local only)")
+    args = parser.parse_args()
+
+    if args.file:
+        csv_file_path = args.file
+    else:
+        from pipeline import load_config
+
+        csv_file_path = os.path.join(load_config(args.config)["signals"], "BTC_2019_2023_15m.csv")
 
     if not os.path.exists(csv_file_path):
         print(f"Error: File not found at path {csv_file_path}")
     else:
         print("### Performing backtest ###")
-        backtest_result = perform_backtest(csv_file_path)
+        if args.local:
+            backtest_result = perform_local_backtest(csv_file_path, args.leverage, args.fee, args.slippage)
+        else:
+            backtest_result = perform_backtest(csv_file_path, args.leverage)
 
         print("### Backtest Results ###")
         if not backtest_result:
@@ -0,0 +1,196 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+from backtest import parse_event_stream, untrade_client
+
+CACHE_FOLDER = ".backtest_cache"
+
+def signals_digest(file_path, leverage, client_key="untrade"):
+    """
+    Cache key of a backtest: a hash of the signals file contents, the leverage and the backend.
+
+    Parameters:
+        file_path (str): Signals CSV file.
+        leverage (float): Leverage of the backtest.
+        client_key (str): Identifies the backend and its settings.
+
+    Returns:
+        str: 64 hexadecimal characters.
+    """
+    digest = hashlib.sha256(f"{client_key}|leverage={float(leverage)}|".encode())
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ResultCache:
+    """
+    Backtest statistics saved as one JSON file per cache key.
+
+    Parameters:
+        folder (str): Directory of the cached results.
+    """
+
+    def __init__(self, folder=CACHE_FOLDER):
+        self.folder = folder
+
+    def path(self, key):
+        return os.path.join(self.folder, f"{key}.json")
+
+    def get(self, key):
+        """
+        Cached statistics for a key, or None.
+        """
+        try:
+            with open(self.path(key)) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, key, statistics):
+        os.makedirs(self.folder, exist_ok=True)
+        tmp_path = f"{self.path(key)}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(statistics, f)
+        os.replace(tmp_path, self.path(key))
+
+async def _backtest_one(client, file_path, leverage, semaphore, retries, backoff, cache, jupyter_id):
+    """
+    Backtest one file: cache lookup, then up to retries + 1 attempts under the semaphore.
+
+    Returns:
+        dict: 'file', 'statistics' (None on failure), 'cached', 'attempts', 'seconds' and 'error'.
+    """
+    start = time.perf_counter()
+    outcome = {"file": file_path, "statistics": None, "cached": False, "attempts": 0, "error": None}
+    key = signals_digest(file_path, leverage, getattr(client, "cache_key", "untrade")) if cache else None
+    statistics = cache.get(key) if cache else None
+    if statistics is not None:
+        outcome.update(statistics=statistics, cached=True, seconds=time.perf_counter() - start)
+        return outcome
+
+    for attempt in range(retries + 1):
+        outcome["attempts"] = attempt + 1
+        try:
+            async with semaphore:
+                # the client is blocking; the event stream is read in a worker thread
+                lines = await asyncio.to_thread(
+                    lambda: list(client.backtest(file_path=file_path, leverage=leverage, jupyter_id=jupyter_id))
+                )
+            statistics = parse_event_stream(lines)
+            break
+        except Exception as e:
+            outcome["error"] = f"{type(e).__name__}: {e}"
+            if attempt < retries:
+                await asyncio.sleep(backoff * 2 ** attempt)
+    else:
+        outcome["seconds"] = time.perf_counter() - start
+        return outcome
+
+    if cache:
+        cache.put(key, statistics)
+    outcome.update(statistics=statistics, error=None, seconds=time.perf_counter() - start)
+    return outcome
+
+async def backtest_batch(file_paths, client=None, leverage=1, concurrency=4, retries=3, backoff=1.0,
+                         cache=None, jupyter_id="screening"):
+    """
+    Backtest many signals files through one client, yielding results as they arrive.
+
+    At most 'concurrency' backtests are in flight at a time. A failed call is
+    retried with exponential backoff (backoff, 2 * backoff, ...). Files whose
+    contents were already backtested with the same leverage and backend come
+    from the cache without a call.
+
+    Parameters:
+        file_paths (list): Signals CSV files.
+        client: Object with untrade's backtest(file_path, leverage, jupyter_id);
+            defaults to the shared untrade client. local_backtest.LocalClient
+            runs offline.
+        leverage (float): Leverage of every backtest.
+        concurrency (int): Maximum number of backtests in flight.
+        retries (int): Extra attempts per file after a failure.
+        backoff (float): Seconds before the first retry.
+        cache (ResultCache): Result cache; None to always submit.
+        jupyter_id (str): Passed through to the client.
+
+    Yields:
+        dict: One outcome per file, in completion order (see _backtest_one).
+    """
+    client = client or untrade_client()
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = [
+        asyncio.create_task(_backtest_one(client, file_path, leverage, semaphore, retries, backoff, cache, jupyter_id))
+        for file_path in file_paths
+    ]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
+
+def run_batch(file_paths, on_result=None, **kwargs):
+    """
+    Run backtest_batch to completion from synchronous code.
+
+    Parameters:
+        file_paths (list): Signals CSV files.
+        on_result (callable): Called with each outcome as it arrives.
+        **kwargs: Passed to backtest_batch.
+
+    Returns:
+        list: Outcomes in completion order.
+    """
+    async def collect():
+        outcomes = []
+        async for outcome in backtest_batch(file_paths, **kwargs):
+            if on_result:
+                on_result(outcome)
+            outcomes.append(outcome)
+        return outcomes
+
+    return asyncio.run(collect())
+
+def format_outcome(outcome):
+    """
+    One line summarising a backtest outcome.
+    """
+    name = os.path.basename(outcome["file"])
+    if outcome["statistics"] is None:
+        return f"{name}: failed after {outcome['attempts']} attempts ({outcome['error']})"
+    compound = outcome["statistics"].get("compound_statistics", {})
+    source = "cache" if outcome["cached"] else f"{outcome['attempts']} attempt(s)"
+    return (f"{name}: return {compound.get('Total Return (%)', float('nan')):.2f}%, "
+            f"drawdown {compound.get('Maximum Drawdown (%)', float('nan')):.2f}%, "
+            f"{compound.get('Total Trades', 0)} trades [{source}, {outcome['seconds']:.2f}s]")
+
+if __name__ == "__main__":
+    import argparse
+    from parallel import list_csv_files
+    from local_backtest import LocalClient
+
+    parser = argparse.ArgumentParser(description="Backtest a folder of signals files concurrently.")
+    parser.add_argument("--signals", default="signals", help="Folder with the signals CSV files.")
+    parser.add_argument("--local", action="store_true", help="use the local backtester instead of untrade")
+    parser.add_argument("--leverage", type=float, default=1)
+    parser.add_argument("--fee", type=float, default=0.001, help="fee per unit traded (local only)")
+    parser.add_argument("--slippage", type=float, default=0.0, help="slippage per unit traded (local only)")
+    parser.add_argument("--concurrency", type=int, default=4, help="backtests in flight at a time")
+    parser.add_argument("--retries", type=int, default=3, help="extra attempts after a failure")
+    parser.add_argument("--cache", default=CACHE_FOLDER, help="folder of cached results")
+    parser.add_argument("--no-cache", action="store_true", help="always submit, ignoring cached results")
+    args = parser.parse_args()
+
+    client = LocalClient(args.fee, args.slippage) if args.local else None
+    cache = None if args.no_cache else ResultCache(args.cache)
+    start = time.perf_counter()
+    outcomes = run_batch(
+        list_csv_files(args.signals), on_result=lambda outcome: print(format_outcome(outcome), flush=True),
+        client=client, leverage=args.leverage, concurrency=args.concurrency, retries=args.retries, cache=cache,
+    )
+    failed = sum(outcome["statistics"] is None for outcome in outcomes)
+    print(f"{len(outcomes)} files in {time.perf_counter() - start:.2f}s, "
+          f"{sum(outcome['cached'] for outcome in outcomes)} from cache, {failed} failed")
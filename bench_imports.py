@@ -0,0 +1,117 @@
+import os
+import sys
+import subprocess
+
+# Import-time budget of the entry points, in milliseconds on top of numpy and
+# pandas (which every run needs), and the packages they must not load at
+# import. Plotting and the TA library are imported by the functions using them.
+BUDGETS = {
+    "loader": 40,
+    "feature_eng": 40,
+    "strat": 40,
+    "pipeline": 30,
+    "live": 80,
+}
+BASE_MODULES = ("numpy", "pandas")
+DEFERRED_MODULES = ("matplotlib", "seaborn", "plotly", "ta", "scipy")
+
+REPO = os.path.dirname(os.path.abspath(__file__))
+
+def import_times(module, cwd=None):
+    """
+    Import a module in a fresh interpreter under 'python -X importtime'.
+
+    Parameters:
+        module (str): Module to import; the repository is on the path.
+        cwd (str): Working directory of the interpreter; the repository by default.
+
+    Returns:
+        list: (depth, module name, cumulative microseconds) per imported module,
+            in the order Python reports them (submodules before their importer).
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO, os.environ.get("PYTHONPATH")])))
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                               cwd=cwd or REPO, env=env, capture_output=True, text=True, check=True)
+    entries = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, name.strip(), int(cumulative)))
+    return entries
+
+def base_microseconds(entries, base_modules=BASE_MODULES):
+    # time of the base modules, without counting numpy again when pandas imported it
+    total = 0
+    for i, (depth, name, cumulative) in enumerate(entries):
+        if name not in base_modules:
+            continue
+        nested = False
+        for parent_depth, parent, _ in entries[i + 1:]:
+            if parent_depth < depth:
+                depth = parent_depth
+                nested |= parent in base_modules
+        if not nested:
+            total += cumulative
+    return total
+
+def measure(module, repeat=5, cwd=None):
+    """
+    Import cost of a module beyond numpy and pandas, best of several runs.
+
+    Returns:
+        tuple: (milliseconds of the module beyond the base modules,
+            milliseconds of the whole import, deferred packages it loaded).
+    """
+    best = None
+    for _ in range(repeat):
+        entries = import_times(module, cwd)
+        total = next(cumulative for _, name, cumulative in entries if name == module)
+        own = (total - base_microseconds(entries)) / 1000
+        loaded = sorted({name.split(".")[0] for _, name, _ in entries} & set(DEFERRED_MODULES))
+        if best is None or own < best[0]:
+            best = (own, total / 1000, loaded)
+    return best
+
+def check(budgets=BUDGETS, repeat=5, cwd=None):
+    """
+    Measure every module of the budget.
+
+    Parameters:
+        budgets (dict): Module -> milliseconds allowed beyond numpy and pandas.
+        repeat (int): Runs per module; the fastest is kept.
+        cwd (str): Working directory of the imports.
+
+    Returns:
+        list: (module, own ms, total ms, budget ms, deferred packages loaded, ok) per module.
+    """
+    results = []
+    for module, budget in budgets.items():
+        own, total, loaded = measure(module, repeat, cwd)
+        results.append((module, own, total, budget, loaded, own <= budget and not loaded))
+    return results
+
+if __name__ == "__main__":
+    import argparse
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Check the import time of the entry points against their budget.")
+    parser.add_argument("modules", nargs="*", default=None, help="modules to check (default: all budgeted ones)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per module; the fastest is kept")
+    args = parser.parse_args()
+
+    budgets = {module: BUDGETS.get(module, 0) for module in args.modules} if args.modules else BUDGETS
+    print(f"numpy + pandas: {base_microseconds(import_times('pandas')) / 1000:.0f} ms")
+    # an empty working directory shows that importing creates no folders
+    with tempfile.TemporaryDirectory() as workdir:
+        results = check(budgets, args.repeat, workdir)
+        created = sorted(os.listdir(workdir))
+    failed = bool(created)
+    for module, own, total, budget, loaded, ok in results:
+        note = f" loads {', '.join(loaded)}" if loaded else ""
+        print(f"{'ok  ' if ok else 'FAIL'} {module:<14} {own:7.1f} ms (budget {budget} ms, {total:.0f} ms in total){note}")
+        failed |= not ok
+    if created:
+        print(f"FAIL importing created {', '.join(created)} in the working directory")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,82 @@
+import sys
+import time
+import tracemalloc
+import numpy as np
+from ta.utils import dropna
+from ta.momentum import RSIIndicator
+from ta.volatility import BollingerBands
+from ta.trend import MACD, SMAIndicator, EMAIndicator
+from loader import read_csv_cached
+from feature_eng import technical_indicators_frame
+from indicators import INDICATOR_COLUMNS, compute_indicators
+
+def ta_indicators(close):
+    """
+    Compute the feature_eng indicators with the ta library.
+
+    Parameters:
+        close (pd.Series): Close prices after dropna.
+
+    Returns:
+        dict: Indicator name to array.
+    """
+    bb = BollingerBands(close, window=20, window_dev=2)
+    macd = MACD(close, window_slow=26, window_fast=12, window_sign=9)
+    return {
+        "sma_10": SMAIndicator(close, window=10).sma_indicator().to_numpy(),
+        "ema_10": EMAIndicator(close, window=10).ema_indicator().to_numpy(),
+        "rsi_14": RSIIndicator(close, window=14).rsi().to_numpy(),
+        "bb_upper": bb.bollinger_hband().to_numpy(),
+        "bb_lower": bb.bollinger_lband().to_numpy(),
+        "bb_width": bb.bollinger_wband().to_numpy(),
+        "macd": macd.macd().to_numpy(),
+        "macd_signal": macd.macd_signal().to_numpy(),
+        "macd_diff": macd.macd_diff().to_numpy(),
+    }
+
+def measure(func, *args, repeat=5):
+    """
+    Return the best wall time over a few runs, the peak traced memory and the result.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, result
+
+def report(label, ta_result, numpy_result):
+    ta_seconds, ta_peak, _ = ta_result
+    np_seconds, np_peak, _ = numpy_result
+    print(f"{label}")
+    print(f"  ta     {ta_seconds:8.4f}s  peak {ta_peak / 2**20:8.1f} MiB")
+    print(f"  numpy  {np_seconds:8.4f}s  peak {np_peak / 2**20:8.1f} MiB  "
+          f"(speedup {ta_seconds / np_seconds:.2f}x, peak memory ratio {np_peak / max(ta_peak, 1):.2f})")
+
+if __name__ == "__main__":
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else "data/BTC_2019_2023_1m.csv"
+    df = read_csv_cached(csv_path)
+    close = dropna(df)["close"]
+    print(f"{csv_path}: {len(close)} rows")
+
+    ta_arrays = measure(ta_indicators, close)
+    np_arrays = measure(compute_indicators, close.to_numpy())
+    report("indicator arrays", ta_arrays, np_arrays)
+    ta_frame = measure(technical_indicators_frame, df, "ta")
+    np_frame = measure(technical_indicators_frame, df, "numpy")
+    report("technical_indicators_frame", ta_frame, np_frame)
+
+    # the engines must agree bit for bit, NaN warm-ups included
+    expected, actual = ta_arrays[2], np_arrays[2]
+    matches = True
+    for column in INDICATOR_COLUMNS:
+        identical = np.array_equal(actual[column], expected[column], equal_nan=True)
+        print(f"  {column:<12} identical={identical}")
+        matches &= identical
+    matches &= ta_frame[2].equals(np_frame[2])
+    if not matches:
+        sys.exit("The NumPy engine differs from the ta library.")
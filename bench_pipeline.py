@@ -0,0 +1,223 @@
+import os
+import sys
+import json
+import time
+import platform
+import resource
+import tempfile
+import contextlib
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from instrument import reset_peak_rss, rss_bytes
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+STAGES = [
+    "load_csv_data", "add_technical_indicators", "add_lagged_features", "calculate_price_changes",
+    "save_engineered_data", "generate_signals", "save_trading_plot", "plot_signals",
+]
+
+def benchmark_size(rows, workdir, memory="rss", seed=0):
+    """
+    Run every pipeline stage once on synthetic 1m bars and measure it.
+
+    Runs in its own process (see run_benchmarks), so the peak resident set
+    size belongs to this size alone. Outputs are written under workdir.
+
+    Parameters:
+        rows (int): Number of synthetic 1m bars.
+        workdir (str): Scratch folder for the CSV, plots and signals.
+        memory (str): How the extra memory of each stage is measured:
+            'rss' resets and reads the kernel's peak RSS (Linux, no overhead,
+            falls back to tracemalloc elsewhere); 'tracemalloc' traces Python
+            and NumPy allocations (slows allocation-heavy stages such as
+            to_csv down several times); None skips it.
+        seed (int): Seed of the synthetic bars.
+
+    Returns:
+        dict: 'rows', 'memory', 'max_rss_mib' and per stage 'seconds' and
+            'peak_mib' (peak above the memory in use when the stage started).
+    """
+    # anything written to a relative path stays in the scratch folder
+    os.chdir(workdir)
+    from synthetic import write_synthetic
+    from loader import load_csv_data, save_trading_plot
+    from feature_eng import add_technical_indicators, add_lagged_features, calculate_price_changes
+    from schema import to_csv
+    from strat import generate_signals, plot_signals
+
+    folder = os.path.join(workdir, f"raw_{rows}")
+    os.makedirs(folder, exist_ok=True)
+    file_name = f"BTC_synthetic_{rows}_1m.csv"
+    start = time.perf_counter()
+    write_synthetic(os.path.join(folder, file_name), rows, seed)
+    if memory == "rss" and not reset_peak_rss():
+        memory = "tracemalloc"
+    result = {"rows": rows, "generate_seconds": time.perf_counter() - start, "memory": memory, "stages": {}}
+
+    engineered_path = os.path.join(workdir, f"engineered_{file_name}")
+    signals_path = os.path.join(workdir, f"signals_{file_name}")
+    state = {}
+
+    def load():
+        state["data"] = load_csv_data(folder, use_cache=False)
+
+    def save_engineered():
+        to_csv(state["data"][file_name], engineered_path)
+
+    def signals():
+        with contextlib.redirect_stdout(None):
+            generate_signals(state["data"][file_name], signals_path)
+
+    steps = {
+        "load_csv_data": load,
+        "add_technical_indicators": lambda: state.update(data=add_technical_indicators(state["data"])),
+        "add_lagged_features": lambda: state.update(data=add_lagged_features(state["data"], lag=3)),
+        "calculate_price_changes": lambda: state.update(data=calculate_price_changes(state["data"])),
+        "save_engineered_data": save_engineered,
+        "generate_signals": signals,
+        "save_trading_plot": lambda: save_trading_plot(file_name, state["data"][file_name], workdir),
+        "plot_signals": lambda: plot_signals(signals_path, output_html_path=os.path.join(workdir, "signals.html"), show=False),
+    }
+
+    if memory == "tracemalloc":
+        tracemalloc.start()
+    for stage in STAGES:
+        if memory == "rss":
+            reset_peak_rss()
+            before = rss_bytes("VmRSS")
+        elif memory == "tracemalloc":
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        steps[stage]()
+        seconds = time.perf_counter() - start
+        if memory == "rss":
+            peak = rss_bytes("VmHWM") - before
+        elif memory == "tracemalloc":
+            peak = tracemalloc.get_traced_memory()[1] - before
+        result["stages"][stage] = {"seconds": seconds, "peak_mib": peak / 2**20 if memory else None}
+    if memory == "tracemalloc":
+        tracemalloc.stop()
+    # Linux reports kilobytes, macOS bytes
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result["max_rss_mib"] = max_rss / (2**20 if sys.platform == "darwin" else 2**10)
+    return result
+
+def environment():
+    """
+    Versions and machine details saved with the results.
+    """
+    import numpy as np
+    import pandas as pd
+
+    return {
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+def run_benchmarks(sizes=DEFAULT_SIZES, workdir=None, memory="rss", seed=0):
+    """
+    Benchmark the pipeline at several sizes, each in a fresh process.
+
+    Parameters:
+        sizes (list): Row counts of the synthetic series.
+        workdir (str): Scratch folder; a temporary one if None.
+        memory (str): Passed to benchmark_size.
+        seed (int): Seed of the synthetic bars.
+
+    Returns:
+        dict: 'environment' and one entry per size in 'results'.
+    """
+    results = []
+    with contextlib.ExitStack() as stack:
+        if workdir is None:
+            workdir = stack.enter_context(tempfile.TemporaryDirectory(prefix="bench_pipeline_"))
+        workdir = os.path.abspath(workdir)
+        os.makedirs(workdir, exist_ok=True)
+        for rows in sizes:
+            # spawn gives each size a clean interpreter and its own peak RSS
+            with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as pool:
+                result = pool.submit(benchmark_size, rows, workdir, memory, seed).result()
+            results.append(result)
+            print(format_result(result), flush=True)
+    return {"environment": environment(), "results": results}
+
+def format_result(result):
+    """
+    Table of the stage timings and peaks of one size.
+    """
+    lines = [f"{result['rows']:,} rows (generated in {result['generate_seconds']:.2f}s, "
+             f"peak RSS {result['max_rss_mib']:.0f} MiB)"]
+    for stage, stats in result["stages"].items():
+        peak = f"{stats['peak_mib']:9.1f} MiB" if stats["peak_mib"] is not None else ""
+        lines.append(f"  {stage:<26} {stats['seconds']:9.3f}s {peak}")
+    return "\n".join(lines)
+
+def compare(current, baseline, tolerance=0.2, min_seconds=0.05, min_mib=16):
+    """
+    Find the stages that got slower, or used more memory, than in a baseline run.
+
+    Parameters:
+        current (dict): Output of run_benchmarks.
+        baseline (dict): A saved output of run_benchmarks.
+        tolerance (float): Allowed relative increase, e.g. 0.2 for 20%.
+        min_seconds (float): Stages faster than this in both runs are ignored as noise.
+        min_mib (float): Same for the memory of stages that stay below this.
+
+    Returns:
+        list: (rows, stage, metric, baseline value, current value, ratio) per regression.
+    """
+    previous = {result["rows"]: result for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        if result["rows"] not in previous:
+            continue
+        for stage, stats in result["stages"].items():
+            base = previous[result["rows"]]["stages"].get(stage)
+            if base is None:
+                continue
+            # peaks measured in different ways are not comparable
+            same_method = result.get("memory") == previous[result["rows"]].get("memory")
+            for metric in ("seconds", "peak_mib") if same_method else ("seconds",):
+                old, new = base.get(metric), stats.get(metric)
+                noise = min_seconds if metric == "seconds" else min_mib
+                if old is None or new is None or max(old, new) < noise:
+                    continue
+                ratio = new / old if old else float("inf")
+                if ratio > 1 + tolerance:
+                    regressions.append((result["rows"], stage, metric, old, new, ratio))
+    return regressions
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Time every pipeline stage on synthetic 1m bars.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="row counts, e.g. 10000 10000000")
+    parser.add_argument("--workdir", default=None, help="keep the generated files in this folder")
+    parser.add_argument("--memory", choices=["rss", "tracemalloc", "none"], default="rss",
+                        help="how stage memory is measured (default: peak RSS)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", default=None, help="save the results to this JSON file")
+    parser.add_argument("--baseline", default=None, help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before a stage is flagged")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.sizes, args.workdir, None if args.memory == "none" else args.memory, args.seed)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results saved to {args.save}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for rows, stage, metric, old, new, ratio in regressions:
+            print(f"REGRESSION {rows:,} rows {stage} {metric}: {old:.3f} -> {new:.3f} ({ratio:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline.")
@@ -0,0 +1,91 @@
+import io
+import os
+import sys
+import time
+import pandas as pd
+from schema import compact_frame, to_csv
+from strat import compute_signals
+
+def legacy_generate_signals(data):
+    """
+    Row-by-row reference implementation of the strategy, kept for comparison.
+
+    Parameters:
+        data (pd.DataFrame): DataFrame with 'rsi_14' and 'macd_diff' columns.
+
+    Returns:
+        pd.DataFrame: The same DataFrame with 'signals' and 'trade_type' added.
+    """
+    data['signals'] = 0
+    data['trade_type'] = 'hold'
+
+    for i in range(1, len(data)):
+        if data.loc[i, 'rsi_14'] < 30 and data.loc[i, 'macd_diff'] > 0 and data.loc[i - 1, 'macd_diff'] <= 0:
+            data.loc[i, 'signals'] = 1
+            data.loc[i, 'trade_type'] = 'long_open'
+        elif data.loc[i, 'rsi_14'] > 70 and data.loc[i, 'macd_diff'] < 0 and data.loc[i - 1, 'macd_diff'] >= 0:
+            data.loc[i, 'signals'] = -1
+            data.loc[i, 'trade_type'] = 'short_open'
+        elif data.loc[i, 'macd_diff'] > 0 and data.loc[i - 1, 'macd_diff'] <= 0:
+            data.loc[i, 'signals'] = 2
+            data.loc[i, 'trade_type'] = 'long_reversal'
+        elif data.loc[i, 'macd_diff'] < 0 and data.loc[i - 1, 'macd_diff'] >= 0:
+            data.loc[i, 'signals'] = -2
+            data.loc[i, 'trade_type'] = 'short_reversal'
+    return data
+
+def benchmark_signals(folder_path):
+    """
+    Time the legacy loop against the vectorized engine on every CSV in a folder.
+
+    The CSV text produced by both implementations is compared byte for byte,
+    and so is the text strat.generate_signals writes through the compact
+    schema (float32 prices, parsed datetimes) and schema.to_csv.
+
+    Parameters:
+        folder_path (str): Path to the folder containing engineered CSV files.
+
+    Returns:
+        list: One dictionary of timings per file.
+    """
+    results = []
+    for file_name in sorted(os.listdir(folder_path)):
+        if not file_name.endswith(".csv"):
+            continue
+        data = pd.read_csv(os.path.join(folder_path, file_name))
+
+        start = time.perf_counter()
+        legacy = legacy_generate_signals(data.copy())
+        legacy_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        vectorized = compute_signals(data.copy())
+        vectorized_seconds = time.perf_counter() - start
+
+        compact = io.StringIO()
+        to_csv(compute_signals(compact_frame(data, datetime_index=False)), compact)
+
+        expected = legacy.to_csv(index=False)
+        identical = expected == vectorized.to_csv(index=False)
+        compact_identical = expected == compact.getvalue()
+        results.append({
+            "file": file_name,
+            "rows": len(data),
+            "legacy_s": legacy_seconds,
+            "vectorized_s": vectorized_seconds,
+            "speedup": legacy_seconds / max(vectorized_seconds, 1e-9),
+            "identical": identical,
+            "compact_identical": compact_identical,
+        })
+        print(f"{file_name:<28} rows={len(data):>9} legacy={legacy_seconds:9.3f}s "
+              f"vectorized={vectorized_seconds:7.4f}s speedup={results[-1]['speedup']:9.1f}x "
+              f"identical={identical} compact={compact_identical}")
+    return results
+
+if __name__ == "__main__":
+    folder_path = sys.argv[1] if len(sys.argv) > 1 else "engineered_data"
+    results = benchmark_signals(folder_path)
+    if not all(result["identical"] for result in results):
+        sys.exit("Vectorized signals differ from the legacy loop.")
+    if not all(result["compact_identical"] for result in results):
+        sys.exit("Signals written through the compact schema differ from the legacy loop.")
@@ -0,0 +1,171 @@
+import os
+import bisect
+from collections.abc import MutableMapping
+import pandas as pd
+from loader import csv_cache_path, read_csv_cached
+
+class DatasetCatalog(MutableMapping):
+    """
+    Lazy, dictionary-like view of the CSV files in a folder.
+
+    Listing the catalog only reads the folder, not the files. A file is loaded
+    the first time it is accessed, keeping just the requested columns and the
+    rows between start and end. Because it behaves like the dictionary returned
+    by load_csv_data, it can be passed straight to the feature_eng functions.
+
+    Parameters:
+        folder_path (str): Path to the folder containing CSV files.
+        columns (list): Columns to keep; None keeps all columns.
+        start (str or Timestamp): First 'datetime' to keep (inclusive).
+        end (str or Timestamp): Last 'datetime' to keep (inclusive).
+        use_cache (bool): Read through the Feather cache kept next to each CSV.
+        compact (bool): Apply schema.compact_frame to each file as it is loaded,
+            so the catalog never holds the raw frame.
+    """
+
+    def __init__(self, folder_path, columns=None, start=None, end=None, use_cache=True, compact=False):
+        self.folder_path = folder_path
+        self.columns = columns
+        self.start = start
+        self.end = end
+        self.use_cache = use_cache
+        self.compact = compact
+        self._file_names = sorted(
+            file_name for file_name in os.listdir(folder_path) if file_name.endswith(".csv")
+        )
+        self._frames = {}
+
+    def timeframes(self):
+        """
+        List the timeframes available in the folder without reading any file.
+
+        Returns:
+            list: Timeframe suffixes such as '15m' or '1d', in file name order.
+        """
+        return [os.path.splitext(file_name)[0].rsplit("_", 1)[-1] for file_name in self._file_names]
+
+    def resolve(self, key):
+        """
+        Map a file name or a timeframe suffix to the file name in the folder.
+
+        Parameters:
+            key (str): File name ('BTC_2019_2023_15m.csv') or timeframe ('15m').
+
+        Returns:
+            str: File name of the matching CSV.
+        """
+        if key in self._file_names or key in self._frames:
+            return key
+        for file_name, timeframe in zip(self._file_names, self.timeframes()):
+            if timeframe == key:
+                return file_name
+        raise KeyError(key)
+
+    def load(self, key, columns=None, start=None, end=None):
+        """
+        Read one file, keeping only the given columns and datetime range.
+
+        The result is not kept by the catalog; use item access for that.
+
+        Parameters:
+            key (str): File name or timeframe suffix.
+            columns (list): Columns to keep; None keeps all columns.
+            start (str or Timestamp): First 'datetime' to keep (inclusive).
+            end (str or Timestamp): Last 'datetime' to keep (inclusive).
+
+        Returns:
+            pd.DataFrame: The selected part of the file with a fresh RangeIndex
+                (or, for a compact catalog, the compacted frame with a datetime index).
+        """
+        file_path = os.path.join(self.folder_path, self.resolve(key))
+        start = pd.Timestamp(start) if start is not None else None
+        end = pd.Timestamp(end) if end is not None else None
+        read_columns = columns
+        if columns is not None and (start is not None or end is not None) and "datetime" not in columns:
+            read_columns = ["datetime"] + list(columns)
+
+        if self.use_cache and self._has_pyarrow():
+            df = self._load_feather(file_path, read_columns, start, end)
+        else:
+            df = self._load_csv_chunks(file_path, read_columns, start, end)
+
+        if columns is not None:
+            df = df[list(columns)]
+        df = df.reset_index(drop=True)
+        if self.compact:
+            from schema import compact_frame
+
+            df = compact_frame(df)
+        return df
+
+    def _has_pyarrow(self):
+        try:
+            import pyarrow.feather  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def _load_feather(self, file_path, columns, start, end):
+        import pyarrow.feather as feather
+
+        cache_path = csv_cache_path(file_path)
+        if not os.path.exists(cache_path):
+            # the first access parses the CSV once to build its cache
+            read_csv_cached(file_path)
+        table = feather.read_table(cache_path, columns=columns, memory_map=True)
+
+        if start is not None or end is not None:
+            # rows are sorted by datetime, so a binary search only parses log(n) values
+            datetimes = table.column("datetime")
+            key = lambda value: pd.Timestamp(value.as_py())
+            lo = 0 if start is None else bisect.bisect_left(datetimes, start, key=key)
+            hi = len(datetimes) if end is None else bisect.bisect_right(datetimes, end, key=key)
+            table = table.slice(lo, max(hi - lo, 0))
+        return table.to_pandas()
+
+    def _load_csv_chunks(self, file_path, columns, start, end, chunksize=500_000):
+        if start is None and end is None:
+            return pd.read_csv(file_path, usecols=columns)
+
+        chunks = []
+        for chunk in pd.read_csv(file_path, usecols=columns, chunksize=chunksize):
+            datetimes = pd.to_datetime(chunk["datetime"])
+            mask = pd.Series(True, index=chunk.index)
+            if start is not None:
+                mask &= datetimes >= start
+            if end is not None:
+                mask &= datetimes <= end
+            chunks.append(chunk[mask])
+            if end is not None and datetimes.iloc[-1] > end:
+                break
+        if not chunks:
+            return pd.read_csv(file_path, usecols=columns, nrows=0)
+        return pd.concat(chunks)
+
+    def __getitem__(self, key):
+        file_name = self.resolve(key)
+        if file_name not in self._frames:
+            self._frames[file_name] = self.load(file_name, self.columns, self.start, self.end)
+        return self._frames[file_name]
+
+    def __setitem__(self, key, df):
+        try:
+            key = self.resolve(key)
+        except KeyError:
+            pass
+        self._frames[key] = df
+
+    def __delitem__(self, key):
+        # forgets the loaded frame; the file itself stays listed in the catalog
+        del self._frames[self.resolve(key)]
+
+    def __iter__(self):
+        names = list(self._file_names)
+        names.extend(key for key in self._frames if key not in self._file_names)
+        return iter(names)
+
+    def __len__(self):
+        return len(self._file_names) + sum(1 for key in self._frames if key not in self._file_names)
+
+    def __repr__(self):
+        return f"DatasetCatalog({self.folder_path!r}, timeframes={self.timeframes()})"
@@ -1,51 +1,126 @@
 import os
+import numpy as np
 import pandas as pd
-from ta import add_all_ta_features
-from ta.utils import dropna
-from ta.momentum import RSIIndicator
-from ta.volatility import BollingerBands
-from ta.trend import MACD, SMAIndicator, EMAIndicator
-from loader import load_csv_data, print_first_five_rows
+from loader import print_first_five_rows, read_csv_cached
+from parallel import list_csv_files, run_per_file
+from schema import compact_frame, to_csv, widen
+from window_features import build_window_features
+from instrument import instrumented, stage
 
-# ensuring ki output folder exists
-os.makedirs("engineered_data", exist_ok=True)
+def technical_indicators_frame(df, engine="ta"):
+    """
+    Add technical indicators to one DataFrame using the TA library.
+    
+    Parameters:
+        df (pd.DataFrame): DataFrame loaded from a CSV file.
+        engine (str): "ta" for the TA library, "numpy" for indicators.compute_indicators
+            (the same values, with shared intermediates and one preallocated block).
+    
+    Returns:
+        pd.DataFrame: Cleaned DataFrame with added technical indicators.
+    """
+    from ta.utils import dropna
+
+    # Clean NaN values required for TA package; its exp(709) bound overflows
+    # when compared with float32 columns, which is harmless
+    with np.errstate(over="ignore"):
+        df = dropna(df)
+    if not {"open", "high", "low", "close", "volume"}.issubset(df.columns):
+        return df
+    # float32 prices from the compact schema are restored to their exact decimals
+    close = widen(df['close'])
+
+    if engine == "numpy":
+        from indicators import INDICATOR_COLUMNS, compute_indicators
+
+        indicators = compute_indicators(close.to_numpy())
+        for column in INDICATOR_COLUMNS:
+            df[column] = indicators[column]
+        return df
+    if engine != "ta":
+        raise ValueError(f"Unknown indicator engine '{engine}', expected 'ta' or 'numpy'")
+
+    from ta.momentum import RSIIndicator
+    from ta.volatility import BollingerBands
+    from ta.trend import MACD, SMAIndicator, EMAIndicator
+
+    # adding technical indicators
+    # Moving Averages (SMA and EMA)
+    df['sma_10'] = SMAIndicator(close, window=10).sma_indicator()
+    df['ema_10'] = EMAIndicator(close, window=10).ema_indicator()
+
+    # Relative Strength Index (RSI)
+    df['rsi_14'] = RSIIndicator(close, window=14).rsi()
+
+    # Bollinger Bands (Upper, Lower Bands, and Band Width)
+    bb = BollingerBands(close, window=20, window_dev=2)
+    df['bb_upper'] = bb.bollinger_hband()
+    df['bb_lower'] = bb.bollinger_lband()
+    df['bb_width'] = bb.bollinger_wband()
+
+    # MACD (Moving Average Convergence Divergence)
+    macd = MACD(close, window_slow=26, window_fast=12, window_sign=9)
+    df['macd'] = macd.macd()
+    df['macd_signal'] = macd.macd_signal()
+    df['macd_diff'] = macd.macd_diff()
+    return df
+
+def lagged_features_frame(df, lag=3):
+    """
+    Add lagged close and volume features to one DataFrame.
+    
+    Parameters:
+        df (pd.DataFrame): DataFrame with 'close' and 'volume' columns.
+        lag (int): Number of lagged features to generate.
+    
+    Returns:
+        pd.DataFrame: DataFrame with lagged features.
+    """
+    # one block for all the lags instead of one inserted column per lag
+    lags = build_window_features(df, lags={"close": lag, "volume": lag})
+    lags.attrs = df.attrs  # pd.concat only keeps attrs shared by every frame
+    return pd.concat([df, lags], axis=1)
+
+def price_changes_frame(df):
+    """
+    Add percentage price change and volatility to one DataFrame.
+    
+    Parameters:
+        df (pd.DataFrame): DataFrame with a 'close' column.
+    
+    Returns:
+        pd.DataFrame: DataFrame with price changes and volatility.
+    """
+    if "close" in df.columns:
+        close = widen(df['close'])
+        changes = pd.DataFrame({
+            # Calculate price change percentage
+            'price_change_pct': close.pct_change() * 100,
+            # Calculate volatility (rolling standard deviation)
+            'volatility': close.rolling(window=5).std(),
+        }, index=df.index)
+        changes.attrs = df.attrs
+        df = pd.concat([df, changes], axis=1)
+    return df
 
-def add_technical_indicators(data_files):
+@instrumented()
+def add_technical_indicators(data_files, engine="ta"):
     """
     Add technical indicators to each DataFrame using the TA library.
     
     Parameters:
         data_files (dict): Dictionary of DataFrames loaded from CSV files.
+        engine (str): "ta" or "numpy", see technical_indicators_frame.
     
     Returns:
         dict: Updated DataFrames with added technical indicators.
     """
     for file_name, df in data_files.items():
-        df = dropna(df)  # Clean NaN values required for TA package
-        if {"open", "high", "low", "close", "volume"}.issubset(df.columns):
-            # adding technical indicators
-            # Moving Averages (SMA and EMA)
-            df['sma_10'] = SMAIndicator(df['close'], window=10).sma_indicator()
-            df['ema_10'] = EMAIndicator(df['close'], window=10).ema_indicator()
-
-            # Relative Strength Index (RSI)
-            df['rsi_14'] = RSIIndicator(df['close'], window=14).rsi()
-
-            # Bollinger Bands (Upper, Lower Bands, and Band Width)
-            bb = BollingerBands(df['close'], window=20, window_dev=2)
-            df['bb_upper'] = bb.bollinger_hband()
-            df['bb_lower'] = bb.bollinger_lband()
-            df['bb_width'] = bb.bollinger_wband()
-
-            # MACD (Moving Average Convergence Divergence)
-            macd = MACD(df['close'], window_slow=26, window_fast=12, window_sign=9)
-            df['macd'] = macd.macd()
-            df['macd_signal'] = macd.macd_signal()
-            df['macd_diff'] = macd.macd_diff()
-
-        data_files[file_name] = df
+        with stage("technical_indicators_frame", file=file_name, rows=len(df)):
+            data_files[file_name] = technical_indicators_frame(df, engine)
     return data_files
 
+@instrumented()
 def add_lagged_features(data_files, lag=3):
     """
     Add lagged features to each DataFrame.
@@ -58,15 +133,11 @@ def add_lagged_features(data_files, lag=3):
         dict: Updated DataFrames with lagged features.
     """
     for file_name, df in data_files.items():
-        lagged_features = []
-        for i in range(1, lag + 1):
-            for col in ["close", "volume"]:
-                lagged_col = f"{col}_lag_{i}"
-                lagged_features.append(lagged_col)
-                df[lagged_col] = df[col].shift(i)
-        data_files[file_name] = df
+        with stage("lagged_features_frame", file=file_name, rows=len(df)):
+            data_files[file_name] = lagged_features_frame(df, lag)
     return data_files
 
+@instrumented()
 def calculate_price_changes(data_files):
     """
     Calculate percentage price changes and volatility for each DataFrame.
@@ -78,40 +149,136 @@ def calculate_price_changes(data_files):
         dict: Updated DataFrames with price changes and volatility.
     """
     for file_name, df in data_files.items():
-        if "close" in df.columns:
-            # Calculate price change percentage
-            df['price_change_pct'] = df['close'].pct_change() * 100
-            # Calculate volatility (rolling standard deviation)
-            df['volatility'] = df['close'].rolling(window=5).std()
-
-        data_files[file_name] = df
+        with stage("price_changes_frame", file=file_name, rows=len(df)):
+            data_files[file_name] = price_changes_frame(df)
     return data_files
 
-def save_engineered_data(data_files):
+@instrumented(rows=None)
+def save_engineered_data(data_files, output_folder="engineered_data"):
     """
     Save engineered DataFrames to CSV files.
     
     Parameters:
         data_files (dict): Dictionary of DataFrames with engineered features.
+        output_folder (str): Folder to write the engineered CSVs into.
     """
+    os.makedirs(output_folder, exist_ok=True)
     for file_name, df in data_files.items():
-        output_path = os.path.join("engineered_data", file_name)
-        df.to_csv(output_path, index=False)
+        output_path = os.path.join(output_folder, file_name)
+        with stage("to_csv", file=file_name, rows=len(df)):
+            to_csv(df, output_path)
+        print(f"Saved engineered data to {output_path}")
+
+@instrumented(rows=None)
+def engineer_file(file_path, output_folder="engineered_data", lag=3, compact=True, chunksize=None, engine="ta"):
+    """
+    Run every feature engineering step on one CSV file and save the result.
+    
+    Used as the process pool worker: it reads and writes its own files and
+    only returns the output path and the first rows for printing.
+    
+    Parameters:
+        file_path (str): Path to the raw CSV file.
+        output_folder (str): Folder to write the engineered CSV into.
+        lag (int): Number of lagged features to generate.
+        compact (bool): Load with schema.compact_frame; the saved CSV is the same.
+        chunksize (int): If given, stream the file in chunks of this many rows
+            (see streaming.py); the saved CSV is the same.
+        engine (str): Indicator engine, "ta" or "numpy"; the saved CSV is the same.
+    
+    Returns:
+        tuple: Output path and the first five rows of the engineered DataFrame.
+    """
+    if chunksize:
+        from streaming import stream_engineer_file
+
+        return stream_engineer_file(file_path, output_folder, lag, chunksize)
+
+    with stage("read_csv", file=os.path.basename(file_path)) as record:
+        df = read_csv_cached(file_path)
+        if compact:
+            df = compact_frame(df)
+        record["rows"] = len(df)
+    with stage("features", file=os.path.basename(file_path), rows=len(df)):
+        df = technical_indicators_frame(df, engine)
+        df = lagged_features_frame(df, lag)
+        df = price_changes_frame(df)
+    os.makedirs(output_folder, exist_ok=True)
+    output_path = os.path.join(output_folder, os.path.basename(file_path))
+    with stage("to_csv", file=os.path.basename(file_path), rows=len(df)):
+        to_csv(df, output_path)
+    return output_path, df.head()
+
+def engineer_folder(folder_path, output_folder="engineered_data", lag=3, workers=None, compact=True, chunksize=None,
+                    engine="ta"):
+    """
+    Engineer every CSV file in a folder, one file per worker process.
+    
+    Parameters:
+        folder_path (str): Path to the folder containing raw CSV files.
+        output_folder (str): Folder to write the engineered CSVs into.
+        lag (int): Number of lagged features to generate.
+        workers (int): Number of processes; None uses every core.
+        compact (bool): Load with schema.compact_frame.
+        chunksize (int): If given, stream each file in chunks of this many rows.
+        engine (str): Indicator engine, "ta" or "numpy".
+    
+    Returns:
+        list: Output paths, in sorted file name order.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    file_paths = list_csv_files(folder_path)
+    results = run_per_file(engineer_file, file_paths, workers, output_folder=output_folder, lag=lag, compact=compact,
+                           chunksize=chunksize, engine=engine)
+    for file_path, (output_path, head) in zip(file_paths, results):
+        print(f"\n{'-'*60}\nFirst 5 rows of {os.path.basename(file_path)}:\n{'-'*60}")
+        print(head)
         print(f"Saved engineered data to {output_path}")
+    return [output_path for output_path, _ in results]
 
 if __name__ == "__main__":
-    # Path to the folder containing CSV files
-    data_folder = "data"
-    data_files = load_csv_data(data_folder)
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Add engineered features to the raw timeframe files.")
+    parser.add_argument("--workers", type=int, default=1, help="processes, one file each (default: 1)")
+    parser.add_argument("--default-dtypes", action="store_true", help="keep float64 and string datetimes instead of the compact schema")
+    parser.add_argument("--chunksize", type=int, default=None, help="stream each file in chunks of this many rows (bounded memory)")
+    parser.add_argument("--engine", choices=["ta", "numpy"], default="ta", help="indicator engine (same output)")
+    parser.add_argument("--report", default=None, help="save per-stage timings, rows/s and peak RSS to this JSON file")
+    parser.add_argument("--profile", default=None, help="save sampled stacks (flame graph collapsed format) to this file")
+    parser.add_argument("--config", default=None, help="pipeline JSON configuration (folders, lag and schema)")
+    args = parser.parse_args()
+
+    if args.report or args.profile:
+        import instrument
+
+        instrument.enable(args.report, args.profile)
+
+    from pipeline import load_config
+
+    # the same folders and settings as the pipeline's engineer stage
+    config = load_config(args.config)
+    data_folder, output_folder, lag = config["data"], config["engineered"], config["lag"]
+    compact = config["compact"] and not args.default_dtypes
+
+    if args.workers > 1 or args.chunksize:
+        engineer_folder(data_folder, output_folder, workers=args.workers, lag=lag, compact=compact,
+                        chunksize=args.chunksize, engine=args.engine)
+    else:
+        # each file is read (and compacted) when add_technical_indicators first
+        # touches it, and its raw frame is not kept
+        from catalog import DatasetCatalog
+
+        data_files = DatasetCatalog(data_folder, compact=compact)
 
-    # Feature Engineering Steps
-    data_files = add_technical_indicators(data_files)
-    data_files = add_lagged_features(data_files, lag=3)
-    data_files = calculate_price_changes(data_files)
+        # Feature Engineering Steps
+        data_files = add_technical_indicators(data_files, engine=args.engine)
+        data_files = add_lagged_features(data_files, lag=lag)
+        data_files = calculate_price_changes(data_files)
 
-    print_first_five_rows(data_files)
+        print_first_five_rows(data_files)
 
-    # Save engineered data
-    save_engineered_data(data_files)
+        # Save engineered data
+        save_engineered_data(data_files, output_folder)
 
-    print("\nFeature engineering completed and all files saved in 'engineered_data' folder.")
+    print(f"\nFeature engineering completed and all files saved in '{output_folder}' folder.")
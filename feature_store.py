@@ -0,0 +1,265 @@
+import os
+import re
+import json
+import hashlib
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from loader import file_fingerprint, read_csv_cached
+
+def _price_columns(df, params):
+    return {"datetime": pd.to_datetime(df["datetime"]).to_numpy(), "close": df["close"].to_numpy(dtype="float64"),
+            "volume": df["volume"].to_numpy(dtype="float64")}
+
+def _sma(df, params):
+    from ta.trend import SMAIndicator
+
+    return {"sma": SMAIndicator(df["close"], window=params["window"]).sma_indicator().to_numpy()}
+
+def _ema(df, params):
+    from ta.trend import EMAIndicator
+
+    return {"ema": EMAIndicator(df["close"], window=params["window"]).ema_indicator().to_numpy()}
+
+def _rsi(df, params):
+    from ta.momentum import RSIIndicator
+
+    return {"rsi": RSIIndicator(df["close"], window=params["window"]).rsi().to_numpy()}
+
+def _bollinger(df, params):
+    from ta.volatility import BollingerBands
+
+    bb = BollingerBands(df["close"], window=params["window"], window_dev=params["window_dev"])
+    return {"bb_upper": bb.bollinger_hband().to_numpy(), "bb_lower": bb.bollinger_lband().to_numpy(),
+            "bb_width": bb.bollinger_wband().to_numpy()}
+
+def _macd(df, params):
+    from ta.trend import MACD
+
+    macd = MACD(df["close"], window_slow=params["window_slow"], window_fast=params["window_fast"],
+                window_sign=params["window_sign"])
+    return {"macd": macd.macd().to_numpy(), "macd_signal": macd.macd_signal().to_numpy(),
+            "macd_diff": macd.macd_diff().to_numpy()}
+
+def _lags(df, params):
+    return {f"{col}_lag": df[col].shift(params["lag"]).to_numpy() for col in ["close", "volume"]}
+
+def _price_changes(df, params):
+    return {"price_change_pct": (df["close"].pct_change() * 100).to_numpy(),
+            "volatility": df["close"].rolling(window=params["window"]).std().to_numpy()}
+
+# Indicator name -> (function computing it and its siblings, default parameters).
+# The functions mirror feature_eng.technical_indicators_frame, lagged_features_frame
+# and price_changes_frame, and run on the rows left by ta's dropna.
+INDICATORS = {
+    "datetime": (_price_columns, {}),
+    "close": (_price_columns, {}),
+    "volume": (_price_columns, {}),
+    "sma": (_sma, {"window": 10}),
+    "ema": (_ema, {"window": 10}),
+    "rsi": (_rsi, {"window": 14}),
+    "bb_upper": (_bollinger, {"window": 20, "window_dev": 2}),
+    "bb_lower": (_bollinger, {"window": 20, "window_dev": 2}),
+    "bb_width": (_bollinger, {"window": 20, "window_dev": 2}),
+    "macd": (_macd, {"window_fast": 12, "window_slow": 26, "window_sign": 9}),
+    "macd_signal": (_macd, {"window_fast": 12, "window_slow": 26, "window_sign": 9}),
+    "macd_diff": (_macd, {"window_fast": 12, "window_slow": 26, "window_sign": 9}),
+    "close_lag": (_lags, {"lag": 1}),
+    "volume_lag": (_lags, {"lag": 1}),
+    "price_change_pct": (_price_changes, {"window": 5}),
+    "volatility": (_price_changes, {"window": 5}),
+}
+
+def parse_feature(column):
+    """
+    Turn a feature_eng column name or an (indicator, params) pair into a store key.
+
+    Column names with a numeric suffix carry their window or lag:
+    'sma_10', 'rsi_14', 'close_lag_2'. Other names use default parameters.
+
+    Parameters:
+        column (str or tuple): e.g. 'rsi_14', 'macd_diff' or ('rsi', {'window': 21}).
+
+    Returns:
+        tuple: (indicator name, full parameter dict).
+    """
+    if isinstance(column, tuple):
+        name, params = column
+    else:
+        name, params = column, {}
+        match = re.fullmatch(r"(sma|ema|rsi|close_lag|volume_lag)_(\d+)", column)
+        if match:
+            name = match.group(1)
+            params = {"lag" if name.endswith("_lag") else "window": int(match.group(2))}
+    if name not in INDICATORS:
+        raise KeyError(f"Unknown indicator '{name}'")
+    return name, {**INDICATORS[name][1], **params}
+
+def column_label(name, params):
+    """
+    Column name used for an indicator in returned frames ('rsi_14', 'macd_diff', ...).
+    """
+    defaults = INDICATORS[name][1]
+    if name in ("sma", "ema", "rsi"):
+        return f"{name}_{params['window']}"
+    if name.endswith("_lag"):
+        return f"{name}_{params['lag']}"
+    changed = [f"{key}={value}" for key, value in sorted(params.items()) if defaults.get(key) != value]
+    return name if not changed else f"{name}[{','.join(changed)}]"
+
+class FeatureStore:
+    """
+    On-demand indicator columns stored one per file, keyed by source file,
+    indicator name and parameters.
+
+    A column is computed the first time it is requested (together with its
+    siblings, e.g. all three MACD lines) and saved as a .npy file under a
+    directory named after the source file fingerprint, so editing the CSV
+    invalidates its columns. Later requests read only the columns they need,
+    memory-mapped. Both the in-memory and the on-disk copies are bounded and
+    evict the least recently used columns first.
+
+    Parameters:
+        root (str): Directory of the stored columns.
+        max_memory_bytes (int): Budget of the in-memory column cache.
+        max_disk_bytes (int): Budget of the directory; None for no limit.
+    """
+
+    def __init__(self, root=".feature_store", max_memory_bytes=256 * 2**20, max_disk_bytes=2 * 2**30):
+        self.root = root
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self.hits = {"memory": 0, "disk": 0, "computed": 0}
+
+    def column_path(self, file_path, name, params):
+        """
+        Path of the stored column for a source file, indicator and parameters.
+        """
+        key = json.dumps([name, params], sort_keys=True)
+        digest = hashlib.sha1(key.encode()).hexdigest()[:12]
+        return os.path.join(self.root, file_fingerprint(file_path), f"{name}.{digest}.npy")
+
+    def get(self, file_path, columns):
+        """
+        Return the requested feature columns of a raw CSV file.
+
+        Parameters:
+            file_path (str): Raw OHLCV CSV file.
+            columns (list): Column names or (indicator, params) pairs, see parse_feature.
+
+        Returns:
+            pd.DataFrame: One column per request, on the rows left by ta's dropna.
+        """
+        data = {}
+        base = None
+        for column in columns:
+            name, params = parse_feature(column)
+            path = self.column_path(file_path, name, params)
+            values = self._from_memory(path)
+            if values is None:
+                values = self._from_disk(path)
+            if values is None:
+                if base is None:
+                    base = self._clean_frame(file_path)
+                values = self._compute(file_path, base, name, params)
+            data[column_label(name, params)] = values
+        return pd.DataFrame(data)
+
+    def _clean_frame(self, file_path):
+        from ta.utils import dropna
+
+        return dropna(read_csv_cached(file_path)).reset_index(drop=True)
+
+    def _compute(self, file_path, base, name, params):
+        self.hits["computed"] += 1
+        function = INDICATORS[name][0]
+        outputs = function(base, params)
+        # siblings computed by the same function with the same parameters are saved too
+        for output_name, values in outputs.items():
+            if output_name in INDICATORS and set(params) == set(INDICATORS[output_name][1]):
+                path = self.column_path(file_path, output_name, params)
+                self._save(path, values)
+                self._remember(path, values)
+        return outputs[name]
+
+    def _from_memory(self, path):
+        values = self._memory.get(path)
+        if values is not None:
+            self._memory.move_to_end(path)
+            self.hits["memory"] += 1
+        return values
+
+    def _from_disk(self, path):
+        if not os.path.exists(path):
+            return None
+        values = np.load(path, mmap_mode="r")
+        os.utime(path)  # the modification time is the recency used for eviction
+        self.hits["disk"] += 1
+        self._remember(path, values)
+        return values
+
+    def _remember(self, path, values):
+        if path in self._memory:
+            self._memory_bytes -= self._memory.pop(path).nbytes
+        self._memory[path] = values
+        self._memory_bytes += values.nbytes
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+
+    def _save(self, path, values):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+        np.save(tmp_path, values)
+        os.replace(tmp_path, path)
+        self.evict_disk()
+
+    def disk_usage(self):
+        """
+        List the stored columns as (path, size, modification time), oldest first.
+        """
+        entries = []
+        if not os.path.isdir(self.root):
+            return entries
+        for folder, _, file_names in os.walk(self.root):
+            for file_name in file_names:
+                if file_name.endswith(".npy"):
+                    stat = os.stat(os.path.join(folder, file_name))
+                    entries.append((os.path.join(folder, file_name), stat.st_size, stat.st_mtime_ns))
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def evict_disk(self):
+        """
+        Delete the least recently used columns until the directory fits max_disk_bytes.
+
+        Returns:
+            int: Number of deleted column files.
+        """
+        if self.max_disk_bytes is None:
+            return 0
+        entries = self.disk_usage()
+        total = sum(size for _, size, _ in entries)
+        deleted = 0
+        for path, size, _ in entries:
+            if total <= self.max_disk_bytes:
+                break
+            os.remove(path)
+            if path in self._memory:
+                self._memory_bytes -= self._memory.pop(path).nbytes
+            total -= size
+            deleted += 1
+        return deleted
+
+if __name__ == "__main__":
+    import time
+
+    file_path = "data/BTC_2019_2023_15m.csv"
+    store = FeatureStore()
+    columns = ["datetime", "close", "rsi_14", "macd_diff"]
+    for attempt in ("first", "second"):
+        start = time.perf_counter()
+        frame = store.get(file_path, columns)
+        print(f"{attempt} request: {time.perf_counter() - start:.3f}s, {store.hits}")
+    print(frame.tail())
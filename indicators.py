@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+
+# Columns produced by compute_indicators, in feature_eng order
+INDICATOR_COLUMNS = [
+    "sma_10", "ema_10", "rsi_14", "bb_upper", "bb_lower", "bb_width",
+    "macd", "macd_signal", "macd_diff",
+]
+
+def span_to_com(span):
+    """
+    Convert an EMA span to the center of mass pandas (and so ta) smooths with.
+
+    pandas turns span, alpha and halflife into a center of mass before
+    smoothing; passing the same center of mass gives bit-identical averages,
+    which an alpha computed here from the span does not always do.
+    """
+    return (span - 1) / 2
+
+def wilder_com(window):
+    """
+    Center of mass pandas derives from ewm(alpha=1 / window), as in ta's RSI.
+    """
+    return 1 / (1 / window) - 1
+
+def ewm_mean(values, com, min_periods=0, out=None):
+    """
+    Exponential moving average, identical to pandas' ewm(com=com, adjust=False).mean().
+
+    Several series sharing the same smoothing can be passed as rows of a 2D
+    array, and out may be values itself to smooth in place.
+
+    Parameters:
+        values (np.ndarray): 1D series or 2D array of series (one per row).
+        com (float): Center of mass, see span_to_com and wilder_com.
+        min_periods (int): Values needed before the average is reported.
+        out (np.ndarray): Optional output of the same shape; may be values itself.
+
+    Returns:
+        np.ndarray: The moving average, NaN during warm-up.
+    """
+    values = np.asarray(values, dtype="float64")
+    if out is None:
+        out = np.empty_like(values)
+    # one Series per row: a DataFrame of the rows would be copied into column order first
+    for row, series in zip(np.atleast_2d(out), np.atleast_2d(values)):
+        smoothed = pd.Series(series, copy=False).ewm(com=com, min_periods=min_periods, adjust=False).mean()
+        row[:] = smoothed.to_numpy()
+    return out
+
+def rsi(close, window=14):
+    """
+    Relative Strength Index, identical to ta.momentum.RSIIndicator.
+
+    Parameters:
+        close (np.ndarray): Close prices without NaNs.
+        window (int): RSI period.
+
+    Returns:
+        np.ndarray: RSI values, NaN during warm-up.
+    """
+    close = np.asarray(close, dtype="float64")
+    diff = np.empty(len(close))
+    diff[:1] = np.nan
+    np.subtract(close[1:], close[:-1], out=diff[1:])
+    # ta keeps the first (NaN) difference as no move in both directions
+    directions = np.zeros((2, len(close)))
+    np.copyto(directions[0], diff, where=diff > 0)
+    np.negative(diff, out=directions[1], where=diff < 0)
+    ewm_mean(directions, wilder_com(window), min_periods=window, out=directions)
+    ema_up, ema_down = directions
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(ema_down == 0, 100, 100 - (100 / (1 + ema_up / ema_down)))
+
+def macd_diff(close, window_fast=12, window_slow=26, window_sign=9, ema_fast=None, ema_slow=None):
+    """
+    MACD histogram (MACD line minus signal line), identical to ta.trend.MACD.
+
+    Parameters:
+        close (np.ndarray): Close prices without NaNs.
+        window_fast, window_slow, window_sign (int): MACD spans.
+        ema_fast, ema_slow (np.ndarray): Optional precomputed EMAs of close
+            (with min_periods equal to their span) to share between variants.
+
+    Returns:
+        np.ndarray: MACD histogram, NaN during warm-up.
+    """
+    if ema_fast is None:
+        ema_fast = ewm_mean(close, span_to_com(window_fast), min_periods=window_fast)
+    if ema_slow is None:
+        ema_slow = ewm_mean(close, span_to_com(window_slow), min_periods=window_slow)
+    macd = ema_fast - ema_slow
+    return macd - ewm_mean(macd, span_to_com(window_sign), min_periods=window_sign)
+
+def compute_indicators(close, out=None):
+    """
+    Every feature_eng indicator of one close series, identical to the ta library.
+
+    The smoothing itself runs in the same pandas kernels ta calls, so the
+    values are bit-identical. What ta repeats per indicator is done once:
+    both RSI averages are smoothed in a single call, the 20-bar mean is shared
+    by the three Bollinger columns, the two MACD EMAs by the three MACD
+    columns, and no Series is built per intermediate. Results are written
+    into the rows of one preallocated block.
+
+    Parameters:
+        close (np.ndarray): Close prices without NaNs.
+        out (np.ndarray): Optional (len(INDICATOR_COLUMNS), len(close)) float64 block to fill.
+
+    Returns:
+        dict: Column name -> row of the block (a view, not a copy).
+    """
+    close = np.asarray(close, dtype="float64")
+    if out is None:
+        out = np.empty((len(INDICATOR_COLUMNS), len(close)))
+    rows = dict(zip(INDICATOR_COLUMNS, out))
+    prices = pd.Series(close, copy=False)
+
+    rows["sma_10"][:] = prices.rolling(10, min_periods=10).mean().to_numpy()
+    ewm_mean(close, span_to_com(10), min_periods=10, out=rows["ema_10"])
+    rows["rsi_14"][:] = rsi(close, 14)
+
+    # Bollinger Bands: mean +/- 2 population standard deviations, and their spread in % of the mean
+    upper, lower, width = rows["bb_upper"], rows["bb_lower"], rows["bb_width"]
+    bb_mean = prices.rolling(20, min_periods=20).mean().to_numpy()
+    np.multiply(prices.rolling(20, min_periods=20).std(ddof=0).to_numpy(), 2, out=width)
+    np.add(bb_mean, width, out=upper)
+    np.subtract(bb_mean, width, out=lower)
+    np.subtract(upper, lower, out=width)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.divide(width, bb_mean, out=width)
+    np.multiply(width, 100, out=width)
+
+    # MACD: the slow EMA is parked in the signal row until the MACD line is known
+    macd, signal = rows["macd"], rows["macd_signal"]
+    ewm_mean(close, span_to_com(12), min_periods=12, out=macd)
+    ewm_mean(close, span_to_com(26), min_periods=26, out=signal)
+    np.subtract(macd, signal, out=macd)
+    ewm_mean(macd, span_to_com(9), min_periods=9, out=signal)
+    np.subtract(macd, signal, out=rows["macd_diff"])
+    return rows
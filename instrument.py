@@ -0,0 +1,353 @@
+import os
+import sys
+import glob
+import json
+import time
+import atexit
+import resource
+import threading
+import functools
+from collections import Counter
+
+import pandas as pd
+
+# Set PIPELINE_REPORT (and optionally PIPELINE_PROFILE) to instrument any
+# script, including the worker processes it starts, without code changes.
+REPORT_ENV = "PIPELINE_REPORT"
+PROFILE_ENV = "PIPELINE_PROFILE"
+
+_recorder = None
+
+class _Discard(dict):
+    # stand-in record of disabled stages; writes are dropped
+    def __setitem__(self, key, value):
+        pass
+
+class _NullStage:
+    # shared no-op context manager returned while instrumentation is off
+    _record = _Discard()
+
+    def __enter__(self):
+        return self._record
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+def rss_bytes(field):
+    """
+    VmRSS (current) or VmHWM (peak since the last reset) of this process in bytes.
+
+    Returns:
+        int: The value from /proc/self/status, or None where it is not available.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+def reset_peak_rss():
+    """
+    Reset the kernel's peak RSS (VmHWM) of this process (Linux only).
+
+    Returns:
+        bool: False where the peak cannot be reset.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def _max_rss_bytes():
+    # process-wide peak: kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def count_rows(value):
+    """
+    Rows in a stage result: len of a DataFrame, or the total of a dict of DataFrames.
+    """
+    if isinstance(value, pd.DataFrame):
+        return len(value)
+    if isinstance(value, dict) and value and all(isinstance(df, pd.DataFrame) for df in value.values()):
+        return sum(len(df) for df in value.values())
+    return None
+
+class Recorder:
+    """
+    Collects the stage records of one run.
+
+    Each record holds the stage name and its parents, wall time, rows and
+    rows per second when known, and the peak RSS reached inside the stage.
+    On Linux the kernel's peak RSS is reset when a stage starts, so the
+    peak is the stage's own; nested stages hand their peak up to their
+    parent. Elsewhere the process-wide peak so far is reported.
+
+    Parameters:
+        profile_interval (float): Seconds between stack samples; None for no profiling.
+    """
+
+    def __init__(self, profile_interval=None, report_path=None, profile_path=None):
+        self.started = time.time()
+        self.report_path = report_path
+        self.profile_path = profile_path
+        self.records = []
+        self.stack = []
+        self.resettable = reset_peak_rss()
+        self.samples = Counter()
+        self.profile_interval = profile_interval
+        self._sampler = None
+        self._stop = threading.Event()
+        if profile_interval:
+            self._target = threading.get_ident()
+            self._sampler = threading.Thread(target=self._sample, name="instrument-sampler", daemon=True)
+            self._sampler.start()
+
+    def enter(self, name, fields):
+        record = {"stage": name, "path": "/".join([frame["stage"] for frame in self.stack] + [name]), **fields}
+        if self.resettable:
+            if self.stack:
+                self.stack[-1]["_peak"] = max(self.stack[-1]["_peak"], rss_bytes("VmHWM") or 0)
+            reset_peak_rss()
+        record["_peak"] = 0
+        record["_start"] = time.perf_counter()
+        self.stack.append(record)
+        return record
+
+    def exit(self, record):
+        seconds = time.perf_counter() - record.pop("_start")
+        peak = max(record.pop("_peak"), rss_bytes("VmHWM") or 0) if self.resettable else _max_rss_bytes()
+        self.stack.pop()
+        if self.stack and self.resettable:
+            self.stack[-1]["_peak"] = max(self.stack[-1]["_peak"], peak)
+        record["seconds"] = seconds
+        rows = record.get("rows")
+        record["rows_per_second"] = rows / seconds if rows is not None and seconds > 0 else None
+        record["peak_rss_mib"] = peak / 2**20
+        self.records.append(record)
+
+    def _sample(self):
+        # collapsed stacks of the instrumented thread, prefixed with the open stages
+        while not self._stop.wait(self.profile_interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            stages = [f"[{record['stage']}]" for record in list(self.stack)]
+            self.samples[";".join(stages + frames[::-1])] += 1
+
+    def stop(self):
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+            self._sampler = None
+
+    def report(self):
+        """
+        JSON-serialisable summary of the run.
+        """
+        return {
+            "run": {
+                "argv": sys.argv,
+                "pid": os.getpid(),
+                "started": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started)),
+                "seconds": time.time() - self.started,
+                "max_rss_mib": _max_rss_bytes() / 2**20,
+                "peak_per_stage": self.resettable,
+            },
+            "stages": self.records,
+        }
+
+def enable(report_path=None, profile_path=None, profile_interval=0.005):
+    """
+    Start recording stages (and optionally sampling stacks) in this process.
+
+    Process pools created with pool_options() record in their workers too;
+    their reports are merged into this one when it is saved.
+
+    Parameters:
+        report_path (str): JSON report written at exit; None to only keep it in memory.
+        profile_path (str): Collapsed-stack profile written at exit, one
+            'frame;frame;frame count' line per stack, for flamegraph.pl or speedscope.
+        profile_interval (float): Seconds between stack samples.
+
+    Returns:
+        Recorder: The active recorder.
+    """
+    recorder = _start(report_path, profile_path, profile_interval)
+    atexit.register(_save, recorder)
+    return recorder
+
+def _start(report_path, profile_path, profile_interval):
+    global _recorder
+    disable()
+    _recorder = Recorder(profile_interval if profile_path else None, report_path, profile_path)
+    return _recorder
+
+def _save(recorder):
+    recorder.stop()
+    if recorder.report_path:
+        save_report(recorder.report_path, recorder)
+    if recorder.profile_path:
+        save_profile(recorder.profile_path, recorder)
+
+def pool_options():
+    """
+    Keyword arguments for a ProcessPoolExecutor whose workers record like this process.
+
+    Pool workers are forked or spawned without running this process's
+    enable() and leave without running atexit handlers, so their stages
+    would be lost. The initializer starts a recorder in each worker and
+    saves it when the worker process finishes.
+
+    Returns:
+        dict: 'initializer' and 'initargs', or nothing while instrumentation is off.
+    """
+    if _recorder is None or not (_recorder.report_path or _recorder.profile_path):
+        return {}
+    return {"initializer": _start_worker,
+            "initargs": (_recorder.report_path, _recorder.profile_path, _recorder.profile_interval)}
+
+def _start_worker(report_path, profile_path, profile_interval):
+    from multiprocessing import util
+
+    if _recorder is not None:
+        # inherited from a forked parent or started from the environment: this worker's own recorder saves instead
+        _recorder.report_path = _recorder.profile_path = None
+    recorder = _start(report_path, profile_path, profile_interval)
+    # pool workers end with os._exit after multiprocessing's finalizers, not atexit
+    util.Finalize(None, _save, args=(recorder,), exitpriority=10)
+
+def disable():
+    """
+    Stop recording; stages become no-ops again.
+    """
+    global _recorder
+    if _recorder is not None:
+        _recorder.stop()
+    _recorder = None
+
+def enabled():
+    return _recorder is not None
+
+def stage(name, **fields):
+    """
+    Context manager timing a block as a named stage.
+
+    The yielded record can be completed inside the block, e.g.
+    record["rows"] = len(df). While instrumentation is disabled the shared
+    no-op context is returned and the record ignores writes.
+
+    Parameters:
+        name (str): Stage name.
+        **fields: Extra values stored in the record, e.g. file='BTC_2019_2023_1m.csv'.
+    """
+    if _recorder is None:
+        return _NULL_STAGE
+    return _Stage(_recorder, name, fields)
+
+class _Stage:
+    def __init__(self, recorder, name, fields):
+        self.recorder = recorder
+        self.name = name
+        self.fields = fields
+
+    def __enter__(self):
+        self.record = self.recorder.enter(self.name, self.fields)
+        return self.record
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.record["error"] = exc_type.__name__
+        self.recorder.exit(self.record)
+        return False
+
+def instrumented(name=None, rows=count_rows):
+    """
+    Decorator recording every call of a function as a stage.
+
+    Parameters:
+        name (str): Stage name; the function name by default.
+        rows (callable): Rows processed, computed from the return value.
+    """
+    def decorate(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _recorder is None:
+                return func(*args, **kwargs)
+            with stage(stage_name) as record:
+                result = func(*args, **kwargs)
+                if record.get("rows") is None and rows is not None:
+                    record["rows"] = rows(result)
+                return result
+        return wrapper
+    return decorate
+
+def _process_path(path):
+    # worker processes write next to the parent's file instead of over it
+    import multiprocessing
+
+    if multiprocessing.parent_process() is None:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{os.getppid()}-{os.getpid()}{ext}"
+
+def _worker_paths(path):
+    # files written by the workers of this process, see _process_path
+    root, ext = os.path.splitext(path)
+    return sorted(glob.glob(f"{glob.escape(root)}.{os.getpid()}-*{glob.escape(ext)}"))
+
+def save_report(path, recorder=None):
+    """
+    Write the JSON report of a recorder (the active one by default).
+
+    In the main process, the reports saved by its pool workers are merged
+    in: their stages are added with the worker's 'pid', their run summaries
+    listed under 'workers', and their files removed.
+    """
+    recorder = recorder or _recorder
+    report = recorder.report()
+    path = _process_path(path)
+    for worker_path in _worker_paths(path):
+        with open(worker_path) as f:
+            worker = json.load(f)
+        report.setdefault("workers", []).append(worker["run"])
+        report["stages"].extend({**record, "pid": worker["run"]["pid"]} for record in worker["stages"])
+        os.remove(worker_path)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+def save_profile(path, recorder=None):
+    """
+    Write the sampled stacks in collapsed format ('a;b;c count' per line).
+
+    In the main process, the stacks sampled by its pool workers are added in.
+    """
+    recorder = recorder or _recorder
+    samples = Counter(recorder.samples)
+    path = _process_path(path)
+    for worker_path in _worker_paths(path):
+        with open(worker_path) as f:
+            for line in f:
+                stack, count = line.rstrip("\n").rsplit(" ", 1)
+                samples[stack] += int(count)
+        os.remove(worker_path)
+    with open(path, "w") as f:
+        for stack, count in samples.most_common():
+            f.write(f"{stack} {count}\n")
+
+if os.environ.get(REPORT_ENV) or os.environ.get(PROFILE_ENV):
+    enable(os.environ.get(REPORT_ENV), os.environ.get(PROFILE_ENV))
@@ -0,0 +1,193 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from loader import read_csv_cached
+from resample import OHLCV_COLUMNS, TIMEFRAMES, bin_labels, datetime_values, timeframe_from_file_name
+
+def run_lengths(mask):
+    """
+    Find the runs of consecutive True values in a boolean array.
+
+    Parameters:
+        mask (np.ndarray): 1D boolean array.
+
+    Returns:
+        tuple: (starts, lengths) arrays, one entry per run.
+    """
+    edges = np.diff(np.r_[0, mask.view(np.int8), 0])
+    starts = np.flatnonzero(edges == 1)
+    return starts, np.flatnonzero(edges == -1) - starts
+
+def grid_steps(timestamps, timeframe):
+    """
+    Number of timeframe periods between consecutive bars.
+
+    Parameters:
+        timestamps (np.ndarray): datetime64[ns] bar timestamps.
+        timeframe (str): Key of resample.TIMEFRAMES.
+
+    Returns:
+        np.ndarray: Steps (1 for adjacent bars, 0 for duplicates, k + 1 when k bars are missing).
+    """
+    if TIMEFRAMES[timeframe] == "month":
+        return np.diff(timestamps.astype("datetime64[M]").astype("int64"))
+    width = pd.Timedelta(TIMEFRAMES[timeframe][0]).value
+    return np.diff(timestamps.astype("int64")) // width
+
+def _intervals(timestamps, starts, lengths, limit):
+    # the longest runs first, as [first, last, bars]
+    order = np.argsort(-lengths, kind="stable")[:limit]
+    return [
+        [str(pd.Timestamp(timestamps[starts[i]])), str(pd.Timestamp(timestamps[starts[i] + lengths[i] - 1])), int(lengths[i])]
+        for i in order
+    ]
+
+def scan_frame(df, timeframe, min_run=3, limit=10):
+    """
+    Check one OHLCV frame against its timeframe grid and the OHLC invariants.
+
+    Every check is an array operation over whole columns: gaps come from the
+    differences of consecutive timestamps, and violations and flat or
+    zero-volume stretches are boolean masks reduced to run-length intervals.
+
+    Parameters:
+        df (pd.DataFrame): OHLCV bars with a 'datetime' column or index.
+        timeframe (str): Key of resample.TIMEFRAMES, e.g. '15m'.
+        min_run (int): Shortest zero-volume or flat stretch worth reporting.
+        limit (int): Number of (longest) intervals listed per check.
+
+    Returns:
+        dict: Counts and [first, last, bars] intervals of each problem.
+    """
+    timestamps = datetime_values(df)
+    report = {"timeframe": timeframe, "rows": len(df)}
+    if len(df) == 0:
+        return report
+    report["first"] = str(pd.Timestamp(timestamps[0]))
+    report["last"] = str(pd.Timestamp(timestamps[-1]))
+
+    # Timeline: missing bars, duplicates, bars off the grid
+    steps = grid_steps(timestamps, timeframe)
+    gap_rows = np.flatnonzero(steps > 1)
+    missing = steps[gap_rows] - 1
+    if TIMEFRAMES[timeframe] == "month":
+        gap_starts = (timestamps[gap_rows].astype("datetime64[M]") + 1).astype("datetime64[ns]")
+        gap_ends = (timestamps[gap_rows + 1].astype("datetime64[M]") - 1).astype("datetime64[ns]")
+    else:
+        width = np.timedelta64(pd.Timedelta(TIMEFRAMES[timeframe][0]).value, "ns")
+        gap_starts = timestamps[gap_rows] + width
+        gap_ends = timestamps[gap_rows + 1] - width
+    order = np.argsort(-missing, kind="stable")[:limit]
+    report["gaps"] = {
+        "count": int(len(gap_rows)),
+        "missing_bars": int(missing.sum()),
+        "expected_bars": int(len(df) + missing.sum()),
+        "intervals": [[str(pd.Timestamp(gap_starts[i])), str(pd.Timestamp(gap_ends[i])), int(missing[i])] for i in order],
+    }
+    report["duplicates"] = int((steps == 0).sum())
+    report["unsorted"] = int((steps < 0).sum())
+    report["off_grid"] = int((bin_labels(timestamps, timeframe) != timestamps).sum())
+
+    if not set(OHLCV_COLUMNS).issubset(df.columns):
+        return report
+    open_, high, low, close, volume = (df[column].to_numpy(dtype="float64") for column in OHLCV_COLUMNS)
+
+    # OHLC invariants; NaN compares False, so missing values are counted apart
+    checks = {
+        "high_below_open_close": high < np.maximum(open_, close),
+        "low_above_open_close": low > np.minimum(open_, close),
+        "high_below_low": high < low,
+        "non_positive_price": (open_ <= 0) | (high <= 0) | (low <= 0) | (close <= 0),
+        "negative_volume": volume < 0,
+        "nan_values": np.isnan(open_) | np.isnan(high) | np.isnan(low) | np.isnan(close) | np.isnan(volume),
+    }
+    report["violations"] = {}
+    for name, mask in checks.items():
+        starts, lengths = run_lengths(mask)
+        report["violations"][name] = {"rows": int(mask.sum()), "intervals": _intervals(timestamps, starts, lengths, limit)}
+
+    # Stretches without trading: zero volume, or a price that does not move at all
+    unchanged = np.r_[False, close[1:] == close[:-1]]
+    stretches = {
+        "zero_volume": volume == 0,
+        "flat_price": (open_ == high) & (high == low) & (low == close) & unchanged,
+    }
+    report["stretches"] = {}
+    for name, mask in stretches.items():
+        starts, lengths = run_lengths(mask)
+        long_runs = lengths >= min_run
+        report["stretches"][name] = {
+            "rows": int(mask.sum()),
+            "runs": int(long_runs.sum()),
+            "intervals": _intervals(timestamps, starts[long_runs], lengths[long_runs], limit),
+        }
+    return report
+
+def scan_file(file_path, min_run=3, limit=10):
+    """
+    Load one timeframe CSV file and scan it (process pool worker).
+
+    Parameters:
+        file_path (str): Path to a file named like 'BTC_2019_2023_15m.csv'.
+        min_run (int): Shortest zero-volume or flat stretch worth reporting.
+        limit (int): Number of (longest) intervals listed per check.
+
+    Returns:
+        dict: Output of scan_frame with the file name, or None for an unknown timeframe.
+    """
+    timeframe = timeframe_from_file_name(file_path)
+    if timeframe not in TIMEFRAMES:
+        return None
+    report = scan_frame(read_csv_cached(file_path), timeframe, min_run, limit)
+    report["file"] = os.path.basename(file_path)
+    return report
+
+def format_report(report):
+    """
+    Render a scan report as a few lines of text.
+
+    Parameters:
+        report (dict): Output of scan_file.
+
+    Returns:
+        str: Human readable summary.
+    """
+    lines = [f"{report['file']} ({report['timeframe']}): {report['rows']} rows, {report.get('first')} -> {report.get('last')}"]
+    gaps = report.get("gaps")
+    if gaps:
+        lines.append(f"  gaps: {gaps['count']} ({gaps['missing_bars']} of {gaps['expected_bars']} bars missing), "
+                     f"duplicates: {report['duplicates']}, unsorted: {report['unsorted']}, off grid: {report['off_grid']}")
+        lines.extend(f"    missing {first} .. {last} ({bars} bars)" for first, last, bars in gaps["intervals"])
+    for name, stats in report.get("violations", {}).items():
+        if stats["rows"]:
+            lines.append(f"  {name}: {stats['rows']} rows")
+            lines.extend(f"    {first} .. {last} ({bars} bars)" for first, last, bars in stats["intervals"])
+    for name, stats in report.get("stretches", {}).items():
+        lines.append(f"  {name}: {stats['rows']} rows, {stats['runs']} stretches")
+        lines.extend(f"    {first} .. {last} ({bars} bars)" for first, last, bars in stats["intervals"])
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    import argparse
+    from parallel import list_csv_files, run_per_file
+
+    parser = argparse.ArgumentParser(description="Scan the timeframe files for gaps and OHLC problems.")
+    parser.add_argument("--data", default="data", help="Folder with the timeframe CSV files.")
+    parser.add_argument("--workers", type=int, default=1, help="processes for the per-file scans (default: 1)")
+    parser.add_argument("--min-run", type=int, default=3, help="shortest zero-volume or flat stretch to list")
+    parser.add_argument("--limit", type=int, default=5, help="intervals listed per check")
+    parser.add_argument("--json", default=None, help="also save the full reports to this JSON file")
+    args = parser.parse_args()
+
+    file_paths = list_csv_files(args.data)
+    reports = [
+        report for report in run_per_file(scan_file, file_paths, args.workers, min_run=args.min_run, limit=args.limit)
+        if report is not None
+    ]
+    for report in reports:
+        print(format_report(report))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(reports, f, indent=2)
+        print(f"Reports saved to {args.json}")
@@ -0,0 +1,215 @@
+import math
+import time
+import asyncio
+import numpy as np
+import pandas as pd
+from incremental import NAN, MACDState, RSIState
+from strat import SIGNAL_CODES, TRADE_TYPES
+
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+# ta.utils.dropna drops rows with a NaN, a zero or a value above this
+DROPNA_LIMIT = math.exp(709)
+
+async def replay_bars(file_path, speed=None, limit=None):
+    """
+    Play a raw timeframe CSV as a live feed, one bar dict at a time.
+
+    Bars are released on the schedule of their timestamps divided by speed
+    (speed=60 plays an hour of 1m bars in a minute), measured from the start
+    of the replay so sleeps do not accumulate drift. Without a speed bars
+    come as fast as they are consumed.
+
+    Parameters:
+        file_path (str): Raw CSV, e.g. 'data/BTC_2019_2023_15m.csv'.
+        speed (float): Replay speed as a multiple of real time; None or 0 for no waiting.
+        limit (int): Only replay the first bars.
+
+    Yields:
+        dict: 'datetime' (str) and the OHLCV values of one bar.
+    """
+    from loader import read_csv_cached
+
+    df = read_csv_cached(file_path)
+    if limit:
+        df = df.iloc[:limit]
+    seconds = (pd.to_datetime(df["datetime"]) - pd.to_datetime(df["datetime"].iloc[0])).dt.total_seconds().tolist()
+    columns = [df["datetime"].astype(str).tolist()] + [df[column].tolist() for column in OHLCV_COLUMNS]
+    names = ["datetime"] + OHLCV_COLUMNS
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    for i, values in enumerate(zip(*columns)):
+        if speed:
+            delay = start + seconds[i] / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        elif i % 1024 == 0:
+            # let the consumer run even when nothing has to wait
+            await asyncio.sleep(0)
+        yield dict(zip(names, values))
+
+class SignalStream:
+    """
+    The strat.py strategy evaluated bar by bar.
+
+    Only RSI 14 and the MACD histogram are needed for the signals. They are
+    kept as incremental states that follow the ta/pandas recursions exactly,
+    so each bar costs O(1) and the signals equal those of generate_signals
+    on the engineered file. Bars that ta's dropna removes from the
+    engineered file are skipped here too.
+
+    Parameters:
+        rsi_low (float): RSI level below which a bullish cross opens a long.
+        rsi_high (float): RSI level above which a bearish cross opens a short.
+    """
+
+    def __init__(self, rsi_low=30, rsi_high=70):
+        self.rsi_low = rsi_low
+        self.rsi_high = rsi_high
+        self.rsi = RSIState(14)
+        self.macd = MACDState(12, 26, 9)
+        self.prev_macd_diff = NAN
+
+    def update(self, bar):
+        """
+        Add one raw bar.
+
+        Parameters:
+            bar (dict): 'datetime' and OHLCV values.
+
+        Returns:
+            dict: Event with 'datetime', 'close', 'rsi_14', 'macd_diff', 'signals'
+                and 'trade_type', or None for a bar dropna would remove.
+        """
+        for column in OHLCV_COLUMNS:
+            value = bar[column]
+            if value != value or value == 0 or value >= DROPNA_LIMIT:
+                return None
+
+        close = float(bar["close"])
+        rsi = self.rsi.update(close)
+        _, _, macd_diff = self.macd.update(close)
+        prev_macd_diff, self.prev_macd_diff = self.prev_macd_diff, macd_diff
+
+        # same rules and priority as strat.signal_conditions; NaN compares False
+        crosses_above = macd_diff > 0 and prev_macd_diff <= 0
+        crosses_below = macd_diff < 0 and prev_macd_diff >= 0
+        conditions = [rsi < self.rsi_low and crosses_above, rsi > self.rsi_high and crosses_below,
+                      crosses_above, crosses_below]
+        signal, trade_type = 0, "hold"
+        for condition, code, label in zip(conditions, SIGNAL_CODES, TRADE_TYPES):
+            if condition:
+                signal, trade_type = code, label
+                break
+        return {"datetime": bar["datetime"], "close": close, "rsi_14": rsi, "macd_diff": macd_diff,
+                "signals": signal, "trade_type": trade_type}
+
+async def run_stream(source, stream=None, on_event=None, queue_size=1024):
+    """
+    Feed bars from an async source through a SignalStream.
+
+    The source and the strategy run as separate tasks joined by a bounded
+    queue, as they would with a live feed. The latency of a bar runs from
+    the moment the source hands it over to the moment its event is emitted,
+    so it includes the time spent waiting in the queue; the processing time
+    only covers the strategy update. In an as-fast-as-possible replay the
+    queue stays full and the latency mostly measures the queue.
+
+    Parameters:
+        source: Async iterator of bar dicts, e.g. replay_bars(...).
+        stream (SignalStream): Strategy state; a new default one if None.
+        on_event (callable): Called with every event (dict with 'latency_us' added).
+        queue_size (int): Bars buffered between the source and the strategy.
+
+    Returns:
+        dict: 'bars', 'events', 'seconds', 'bars_per_second' and per-event
+            'latencies_us' and 'processing_us'.
+    """
+    stream = stream or SignalStream()
+    queue = asyncio.Queue(queue_size)
+    done = object()
+
+    async def produce():
+        async for bar in source:
+            await queue.put((bar, time.perf_counter_ns()))
+        await queue.put((done, 0))
+
+    producer = asyncio.create_task(produce())
+    latencies, processing = [], []
+    bars = events = 0
+    start = time.perf_counter()
+    try:
+        while True:
+            bar, received = await queue.get()
+            if bar is done:
+                break
+            bars += 1
+            started = time.perf_counter_ns()
+            event = stream.update(bar)
+            if event is None:
+                continue
+            events += 1
+            emitted = time.perf_counter_ns()
+            latency = (emitted - received) / 1000
+            latencies.append(latency)
+            processing.append((emitted - started) / 1000)
+            if on_event:
+                event["latency_us"] = latency
+                on_event(event)
+        await producer
+    finally:
+        producer.cancel()
+    seconds = time.perf_counter() - start
+    return {"bars": bars, "events": events, "seconds": seconds,
+            "bars_per_second": bars / seconds if seconds else float("inf"),
+            "latencies_us": np.array(latencies), "processing_us": np.array(processing)}
+
+def batch_signals(raw):
+    """
+    Signals of generate_signals for raw bars (batch features, then compute_signals), for comparison.
+    """
+    from feature_eng import technical_indicators_frame
+    from strat import compute_signals
+
+    return compute_signals(technical_indicators_frame(raw))
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay a raw timeframe file through the streaming strategy.")
+    parser.add_argument("--file", default="data/BTC_2019_2023_15m.csv", help="raw CSV file to replay")
+    parser.add_argument("--speed", type=float, default=0, help="multiple of real time (default 0: as fast as possible)")
+    parser.add_argument("--limit", type=int, default=None, help="only replay the first bars")
+    parser.add_argument("--print-signals", action="store_true", help="print every non-hold event as it arrives")
+    parser.add_argument("--check", action="store_true", help="compare the events with the batch signals")
+    args = parser.parse_args()
+
+    events = []
+
+    def on_event(event):
+        events.append(event)
+        if args.print_signals and event["signals"]:
+            print(f"{event['datetime']} {event['trade_type']:<15} close={event['close']:.2f} "
+                  f"rsi={event['rsi_14']:.1f} latency={event['latency_us']:.0f}us", flush=True)
+
+    result = asyncio.run(run_stream(replay_bars(args.file, args.speed, args.limit), on_event=on_event))
+    print(f"{result['bars']} bars, {result['events']} events in {result['seconds']:.2f}s "
+          f"({result['bars_per_second']:,.0f} bars/s)")
+    for name, key in (("latency", "latencies_us"), ("processing", "processing_us")):
+        values = result[key]
+        if len(values):
+            print(f"{name} (us): " + ", ".join(f"p{q}={np.percentile(values, q):.1f}" for q in (50, 90, 99))
+                  + f", max={values.max():.1f}")
+
+    if args.check:
+        from loader import read_csv_cached
+
+        raw = read_csv_cached(args.file)
+        expected = batch_signals(raw.iloc[:args.limit] if args.limit else raw)
+        streamed = pd.DataFrame(events)
+        same = (len(streamed) == len(expected)
+                and (streamed["datetime"].to_numpy() == expected["datetime"].astype(str).to_numpy()).all()
+                and (streamed["signals"].to_numpy() == expected["signals"].to_numpy()).all()
+                and (streamed["trade_type"].to_numpy() == expected["trade_type"].astype(str).to_numpy()).all())
+        print(f"matches batch signals: {same}")
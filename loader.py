@@ -1,18 +1,93 @@
 import os
+import glob
+import hashlib
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
+from downsample import DEFAULT_BUCKETS, minmax_indices
+from schema import compact_frame
+from instrument import instrumented, stage
 
-# Missing data heatmaps and trading plots will be saved in these folders
-os.makedirs("missing_data_heatmaps", exist_ok=True)
-os.makedirs("trading_plots", exist_ok=True)
+# Binary copies of parsed CSVs are kept in this folder next to each CSV
+CACHE_DIR_NAME = ".cache"
 
-def load_csv_data(folder_path):
+def file_fingerprint(file_path):
+    """
+    Return a short hash identifying the current version of a file.
+    
+    The hash covers the absolute path, size and modification time, so any
+    change to the file gives a new fingerprint.
+    
+    Parameters:
+        file_path (str): Path to the file.
+    
+    Returns:
+        str: 16 hexadecimal characters.
+    """
+    stat = os.stat(file_path)
+    key = f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+def csv_cache_path(file_path):
+    """
+    Return the Feather cache path for a CSV file.
+    
+    The name is keyed on the file fingerprint, so any change to the source
+    file points to a new cache file.
+    
+    Parameters:
+        file_path (str): Path to the CSV file.
+    
+    Returns:
+        str: Path of the cache file for the current version of the CSV.
+    """
+    folder, file_name = os.path.split(file_path)
+    return os.path.join(folder, CACHE_DIR_NAME, f"{file_name}.{file_fingerprint(file_path)}.feather")
+
+def read_csv_cached(file_path, use_cache=True):
+    """
+    Read a CSV file through its Feather cache, rebuilding the cache when stale.
+    
+    Falls back to a plain pd.read_csv when pyarrow is not installed.
+    
+    Parameters:
+        file_path (str): Path to the CSV file.
+        use_cache (bool): Set to False to always parse the CSV text.
+    
+    Returns:
+        pd.DataFrame: Contents of the CSV file.
+    """
+    if not use_cache:
+        return pd.read_csv(file_path)
+    try:
+        import pyarrow.feather as feather
+    except ImportError:
+        return pd.read_csv(file_path)
+
+    cache_path = csv_cache_path(file_path)
+    if os.path.exists(cache_path):
+        # uncompressed Feather can be memory-mapped instead of read into a buffer
+        return feather.read_table(cache_path, memory_map=True).to_pandas()
+
+    df = pd.read_csv(file_path)
+    cache_dir, cache_name = os.path.split(cache_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    # drop caches left behind by older versions of the same CSV
+    csv_name = os.path.basename(file_path)
+    for stale_path in glob.glob(os.path.join(glob.escape(cache_dir), f"{glob.escape(csv_name)}.*.feather")):
+        os.remove(stale_path)
+    tmp_path = os.path.join(cache_dir, f".{cache_name}.{os.getpid()}.tmp")
+    feather.write_feather(df, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, cache_path)
+    return df
+
+@instrumented()
+def load_csv_data(folder_path, use_cache=True, compact=False):
     """
     Load all CSV files from a specified folder.
     
     Parameters:
         folder_path (str): Path to the folder containing CSV files.
+        use_cache (bool): Read through the Feather cache kept next to each CSV.
+        compact (bool): Apply schema.compact_frame (datetime index, float32 OHLCV).
     
     Returns:
         dict: Dictionary where keys are filenames and values are DataFrames.
@@ -21,10 +96,14 @@ def load_csv_data(folder_path):
     for file_name in os.listdir(folder_path):
         if file_name.endswith(".csv"):
             file_path = os.path.join(folder_path, file_name)
-            df = pd.read_csv(file_path)
-            # # Remove 'Unnamed: 0' column if it exists
-            # if "Unnamed: 0" in df.columns:
-            #     df = df.drop(columns=["Unnamed: 0"])
+            with stage("read_csv", file=file_name) as record:
+                df = read_csv_cached(file_path, use_cache=use_cache)
+                # # Remove 'Unnamed: 0' column if it exists
+                # if "Unnamed: 0" in df.columns:
+                #     df = df.drop(columns=["Unnamed: 0"])
+                if compact:
+                    df = compact_frame(df)
+                record["rows"] = len(df)
             data_files[file_name] = df
     return data_files
 
@@ -38,11 +117,11 @@ def convert_datetime_column(data_files):
     Returns:
         None
     """
-    # for file_name, df in data_files.items():
-    #     if "datetime" in df.columns:
-    #         df["datetime"] = pd.to_datetime(df["datetime"])
-    #         df.set_index("datetime", inplace=True)
-    #         data_files[file_name] = df
+    for file_name, df in data_files.items():
+        if "datetime" in df.columns:
+            df["datetime"] = pd.to_datetime(df["datetime"])
+            df.set_index("datetime", inplace=True)
+            data_files[file_name] = df
 
 def print_first_five_rows(data_files):
     """
@@ -70,66 +149,185 @@ def print_missing_data_summary(data_files):
             print(f"{column}: {count} missing values")
         print("\n")
 
-def analyze_missing_values(data_files):
+def save_missing_heatmap(file_name, df, output_folder):
+    """
+    Generate and save the missing data heatmap of one DataFrame.
+    
+    Parameters:
+        file_name (str): Name of the CSV file the DataFrame was loaded from.
+        df (pd.DataFrame): DataFrame to analyze.
+        output_folder (str): Folder of the heatmaps (config['heatmaps']), created if needed.
+    
+    Returns:
+        str: Path of the saved heatmap.
+    """
+    # plotting libraries are only imported by the functions that draw
+    import seaborn as sns
+    import matplotlib.pyplot as plt
+
+    missing_values = df.isnull()
+    plt.figure(figsize=(10, 6))
+    sns.heatmap(missing_values, cbar=False, cmap="viridis", yticklabels=False)
+    plt.title(f"Missing Data Heatmap for {file_name}", fontsize=14)
+    os.makedirs(output_folder, exist_ok=True)
+    heatmap_path = os.path.join(output_folder, f"{file_name}_missing_heatmap.png")
+    plt.savefig(heatmap_path, bbox_inches="tight")
+    plt.close()
+    return heatmap_path
+
+def analyze_missing_values(data_files, output_folder):
     """
     Calculate missing data values for each DataFrame and generate a heatmap.
     
     Parameters:
         data_files (dict): Dictionary of DataFrames loaded from CSV files.
+        output_folder (str): Folder of the heatmaps.
     """
     for file_name, df in data_files.items():
-        missing_values = df.isnull()
-        plt.figure(figsize=(10, 6))
-        sns.heatmap(missing_values, cbar=False, cmap="viridis", yticklabels=False)
-        plt.title(f"Missing Data Heatmap for {file_name}", fontsize=14)
-        heatmap_path = os.path.join("missing_data_heatmaps", f"{file_name}_missing_heatmap.png")
-        plt.savefig(heatmap_path, bbox_inches="tight")
-        plt.close()
+        heatmap_path = save_missing_heatmap(file_name, df, output_folder)
         print(f"Heatmap saved for {file_name} at {heatmap_path}")
 
-def generate_trading_plots(data_files):
+def save_trading_plot(file_name, df, output_folder, max_points=DEFAULT_BUCKETS):
+    """
+    Generate and save the trading-related plots of one DataFrame.
+    
+    Parameters:
+        file_name (str): Name of the CSV file the DataFrame was loaded from.
+        df (pd.DataFrame): DataFrame with OHLCV columns.
+        output_folder (str): Folder of the plots (config['trading_plots']), created if needed.
+        max_points (int): Number of min/max buckets drawn per line.
+    
+    Returns:
+        str: Path of the saved plot, or None if the OHLCV columns are missing.
+    """
+    if not {"open", "high", "low", "close", "volume"}.issubset(df.columns):
+        return None
+    import seaborn as sns
+    import matplotlib.pyplot as plt
+
+    fig, axs = plt.subplots(5, 1, figsize=(14, 18), sharex=True, gridspec_kw={'hspace': 0.3})
+    trading_columns = ["open", "high", "low", "close", "volume"]
+    colors = ["blue", "green", "red", "purple", "orange"]
+    
+    # only the extremes of each pixel-wide bucket are drawn, so the cost no longer grows with the row count
+    x = df.index.to_numpy()
+    for ax, column, color in zip(axs, trading_columns, colors):
+        values = df[column].to_numpy()
+        rows = minmax_indices(values, max_points)
+        sns.lineplot(x=x[rows], y=values[rows], ax=ax, color=color, estimator=None)
+        ax.set_title(f"{column.capitalize()} Over Time", fontsize=12)
+        ax.set_ylabel(column.capitalize())
+        ax.grid(True)
+    
+    os.makedirs(output_folder, exist_ok=True)
+    trading_plot_path = os.path.join(output_folder, f"{file_name}_trading_plot.png")
+    plt.savefig(trading_plot_path, bbox_inches="tight")
+    plt.close(fig)
+    return trading_plot_path
+
+def generate_trading_plots(data_files, output_folder):
     """
     Generate and save trading-related plots for each CSV file.
     
     Parameters:
         data_files (dict): Dictionary of DataFrames loaded from CSV files.
+        output_folder (str): Folder of the plots.
     """
     for file_name, df in data_files.items():
-        if {"open", "high", "low", "close", "volume"}.issubset(df.columns):
-            plt.figure(figsize=(12, 8))
-            
-            fig, axs = plt.subplots(5, 1, figsize=(14, 18), sharex=True, gridspec_kw={'hspace': 0.3})
-            trading_columns = ["open", "high", "low", "close", "volume"]
-            colors = ["blue", "green", "red", "purple", "orange"]
-            
-            for ax, column, color in zip(axs, trading_columns, colors):
-                sns.lineplot(data=df, x=df.index, y=column, ax=ax, color=color)
-                ax.set_title(f"{column.capitalize()} Over Time", fontsize=12)
-                ax.set_ylabel(column.capitalize())
-                ax.grid(True)
-            
-            trading_plot_path = os.path.join("trading_plots", f"{file_name}_trading_plot.png")
-            plt.savefig(trading_plot_path, bbox_inches="tight")
-            plt.close(fig)
+        trading_plot_path = save_trading_plot(file_name, df, output_folder)
+        if trading_plot_path is not None:
             print(f"Trading plots saved for {file_name} at {trading_plot_path}")
 
+def missing_heatmap_for_file(file_path, output_folder):
+    """
+    Load one CSV file and save its missing data heatmap (process pool worker).
+    
+    Parameters:
+        file_path (str): Path to the CSV file.
+        output_folder (str): Folder of the heatmaps.
+    
+    Returns:
+        str: Path of the saved heatmap.
+    """
+    return save_missing_heatmap(os.path.basename(file_path), read_csv_cached(file_path), output_folder)
+
+def trading_plot_for_file(file_path, output_folder):
+    """
+    Load one CSV file and save its trading plots (process pool worker).
+    
+    Parameters:
+        file_path (str): Path to the CSV file.
+        output_folder (str): Folder of the plots.
+    
+    Returns:
+        str: Path of the saved plot, or None if the OHLCV columns are missing.
+    """
+    return save_trading_plot(os.path.basename(file_path), read_csv_cached(file_path), output_folder)
+
+def generate_reports_parallel(folder_path, heatmap_folder, plot_folder, workers=None, heatmaps=True):
+    """
+    Save the missing data heatmaps and trading plots of a folder across processes.
+    
+    Each worker reads its own file, so no DataFrame is sent between processes.
+    
+    Parameters:
+        folder_path (str): Path to the folder containing CSV files.
+        heatmap_folder (str): Folder of the heatmaps.
+        plot_folder (str): Folder of the trading plots.
+        workers (int): Number of processes; None uses every core.
+        heatmaps (bool): Whether to draw the missing data heatmaps.
+    """
+    from parallel import list_csv_files, run_per_file
+
+    file_paths = list_csv_files(folder_path)
+    if heatmaps:
+        heatmap_paths = run_per_file(missing_heatmap_for_file, file_paths, workers, output_folder=heatmap_folder)
+        for file_path, heatmap_path in zip(file_paths, heatmap_paths):
+            print(f"Heatmap saved for {os.path.basename(file_path)} at {heatmap_path}")
+    plot_paths = run_per_file(trading_plot_for_file, file_paths, workers, output_folder=plot_folder)
+    for file_path, trading_plot_path in zip(file_paths, plot_paths):
+        if trading_plot_path is not None:
+            print(f"Trading plots saved for {os.path.basename(file_path)} at {trading_plot_path}")
+
 if __name__ == "__main__":
-    # Path to the folder containing CSV files
-    data_folder = "data"
+    import argparse
+    from integrity import format_report, scan_file
+    from pipeline import load_config
+
+    parser = argparse.ArgumentParser(description="Inspect and plot the raw timeframe files.")
+    parser.add_argument("--workers", type=int, default=1, help="processes for the per-file plots (default: 1)")
+    parser.add_argument("--heatmaps", action="store_true", help="also draw the (slow) missing data heatmaps")
+    parser.add_argument("--config", default=None, help="pipeline JSON configuration (folders)")
+    args = parser.parse_args()
 
-    data_files = load_csv_data(data_folder)
+    # the raw files and the plot folders come from the pipeline configuration
+    config = load_config(args.config)
+    data_folder = config["data"]
 
-    convert_datetime_column(data_files)
+    # compact_frame already parses 'datetime' and makes it the index
+    data_files = load_csv_data(data_folder, compact=True)
 
     print_first_five_rows(data_files)
 
     print_missing_data_summary(data_files)
 
-    analyze_missing_values(data_files)
+    # gaps in the timeline and OHLC problems, which the heatmaps cannot show
+    from parallel import list_csv_files, run_per_file
+
+    for report in run_per_file(scan_file, list_csv_files(data_folder), args.workers):
+        if report is not None:
+            print(format_report(report) + "\n")
+
+    if args.workers > 1:
+        generate_reports_parallel(data_folder, config["heatmaps"], config["trading_plots"], workers=args.workers,
+                                  heatmaps=args.heatmaps)
+    else:
+        if args.heatmaps:
+            analyze_missing_values(data_files, config["heatmaps"])
 
-    generate_trading_plots(data_files)
+        generate_trading_plots(data_files, config["trading_plots"])
 
-    print("\nAll heatmaps and trading plots have been generated and saved.")
+    print("\nAll integrity reports and trading plots have been generated.")
 
 # -> there is no missing data in the data files, so the heatmaps will be empty.
 # -> as the timeframe increases (e.g., 1 minute → 1 day), trading patterns consolidate, showing aggregated movements over broader intervals.
@@ -0,0 +1,322 @@
+import json
+import numpy as np
+import pandas as pd
+
+SECONDS_PER_YEAR = 365.25 * 24 * 3600
+
+def positions_from_signals(signals):
+    """
+    Turn strategy signals into the position held after each bar.
+
+    1 buys and -1 sells one unit within [-1, 1], so a 1 while short closes
+    the short; 2 and -2 reverse straight into a long or a short; 0 holds.
+
+    The position after some signals does not depend on the one before:
+    after a 2 or -2, and after a 1 or -1 that repeats the previous signal
+    (two buys in a row always end long). Between such anchors the 1s and
+    -1s alternate, so from the anchor's position a the run of steps
+    d, -d, d, ... gives clip(a + d) after odd steps and clip(a + d) - d
+    after even ones. Every signal is placed with array operations, and the
+    bars in between are forward-filled.
+
+    Parameters:
+        signals (np.ndarray): Signal column produced by strat.generate_signals.
+
+    Returns:
+        np.ndarray: int8 position (-1, 0 or 1) after each bar.
+    """
+    signals = np.asarray(signals)
+    events = np.flatnonzero(signals)
+    codes = signals[events].astype("int64")
+    previous = np.r_[0, codes[:-1]]
+    anchors = (np.abs(codes) >= 2) | ((codes == previous) & (np.abs(codes) == 1))
+
+    # latest anchor at or before each signal, -1 before the first one (flat start)
+    index = np.arange(len(codes))
+    latest_anchor = np.maximum.accumulate(np.where(anchors, index, -1)) if len(codes) else index
+    start = np.where(latest_anchor >= 0, np.sign(codes[np.maximum(latest_anchor, 0)]), 0)
+    first_step = codes[np.minimum(latest_anchor + 1, len(codes) - 1)]
+    steps_taken = index - latest_anchor
+    after_odd = np.clip(start + first_step, -1, 1)
+    event_positions = np.where(anchors, np.sign(codes),
+                               np.where(steps_taken % 2 == 1, after_odd, after_odd - first_step)).astype(np.int8)
+
+    # forward-fill the position of the latest signal onto every bar
+    latest_event = np.full(len(signals), -1)
+    latest_event[events] = index
+    np.maximum.accumulate(latest_event, out=latest_event)
+    positions = np.zeros(len(signals), dtype=np.int8)
+    held = latest_event >= 0
+    positions[held] = event_positions[latest_event[held]]
+    return positions
+
+def strategy_returns(close, positions, leverage=1, fee=0.001, slippage=0.0):
+    """
+    Per-bar net returns of holding the given positions.
+
+    Trades fill at the close of the signal bar. Each unit of position change
+    pays fee + slippage on the leveraged notional.
+
+    Parameters:
+        close (np.ndarray): Close prices.
+        positions (np.ndarray): Position after each bar.
+        leverage (float): Leverage applied to every position.
+        fee (float): Fee per unit traded, as a fraction (0.001 = 0.1%).
+        slippage (float): Slippage per unit traded, as a fraction.
+
+    Returns:
+        tuple: (gross, entry_costs, exit_costs) arrays; the net return of
+            bar t is gross[t] - entry_costs[t] - exit_costs[t].
+    """
+    close = np.asarray(close, dtype="float64")
+    positions = np.asarray(positions, dtype="float64")
+    previous = np.zeros_like(positions)
+    previous[1:] = positions[:-1]
+
+    gross = np.zeros(len(close))
+    gross[1:] = leverage * previous[1:] * (close[1:] / close[:-1] - 1)
+
+    changed = positions != previous
+    cost = leverage * (fee + slippage)
+    entry_costs = np.where(changed, np.abs(positions) * cost, 0.0)
+    exit_costs = np.where(changed, np.abs(previous) * cost, 0.0)
+    return gross, entry_costs, exit_costs
+
+def extract_trades(positions, gross, entry_costs, exit_costs):
+    """
+    Split the position series into trades and total the returns of each.
+
+    A trade is a run of bars with the same non-zero position. The return of
+    bar t belongs to the trade held over bar t - 1; entry costs belong to the
+    trade that opens and exit costs to the trade that closes.
+
+    Parameters:
+        positions (np.ndarray): Position after each bar.
+        gross, entry_costs, exit_costs (np.ndarray): Output of strategy_returns.
+
+    Returns:
+        dict: Arrays 'start', 'end' (exclusive), 'direction', 'static_return'
+            and 'compound_return', one value per trade.
+    """
+    positions = np.asarray(positions)
+    n = len(positions)
+    previous = np.r_[0, positions[:-1]]
+    starts = np.flatnonzero((positions != previous) & (positions != 0))
+    if len(starts) == 0:
+        empty = np.array([], dtype="int64")
+        return {"start": empty, "end": empty, "direction": empty,
+                "static_return": np.array([]), "compound_return": np.array([])}
+
+    # a trade ends at the next bar where the position changes again
+    change_points = np.r_[np.flatnonzero(positions != previous), n]
+    ends = change_points[np.searchsorted(change_points, starts, side="right")]
+
+    # trade id of every bar (-1 when flat)
+    markers = np.zeros(n, dtype="int64")
+    markers[starts] = 1
+    trade_id = np.cumsum(markers) - 1
+    trade_id[positions == 0] = -1
+
+    owner = np.full(n, -1)
+    owner[1:] = trade_id[:-1]              # bar returns and exit costs
+    entry_owner = trade_id                 # entry costs
+
+    n_trades = len(starts)
+    bar_owned = owner >= 0
+    static = np.bincount(owner[bar_owned], gross[bar_owned] - exit_costs[bar_owned], minlength=n_trades)
+    entries = entry_owner >= 0
+    static -= np.bincount(entry_owner[entries], entry_costs[entries], minlength=n_trades)
+
+    # a leveraged bar can lose everything, but not more
+    growth = np.log1p(np.maximum(gross[bar_owned], -1.0)) + np.log1p(-exit_costs[bar_owned])
+    log_growth = np.bincount(owner[bar_owned], growth, minlength=n_trades)
+    log_growth += np.bincount(entry_owner[entries], np.log1p(-entry_costs[entries]), minlength=n_trades)
+
+    return {
+        "start": starts,
+        "end": ends,
+        "direction": positions[starts].astype("int64"),
+        "static_return": static,
+        "compound_return": np.expm1(log_growth),
+    }
+
+def max_drawdown(equity, initial=1.0):
+    """
+    Largest peak-to-trough fall of an equity curve, as a positive fraction.
+
+    Parameters:
+        equity (np.ndarray): Balance after each bar.
+        initial (float): Balance before the first bar, which counts as a peak.
+    """
+    if len(equity) == 0:
+        return 0.0
+    peaks = np.maximum.accumulate(np.concatenate([[initial], equity]))[1:]
+    return float(np.max((peaks - equity) / peaks))
+
+def _ratios(returns, bars_per_year):
+    mean = returns.mean() if len(returns) else 0.0
+    std = returns.std(ddof=1) if len(returns) > 1 else 0.0
+    downside = np.minimum(returns, 0.0)
+    downside_std = np.sqrt(np.mean(downside ** 2)) if len(returns) else 0.0
+    sharpe = mean / std * np.sqrt(bars_per_year) if std > 0 else 0.0
+    sortino = mean / downside_std * np.sqrt(bars_per_year) if downside_std > 0 else 0.0
+    return float(sharpe), float(sortino)
+
+def evaluate(close, signals, leverage=1, fee=0.001, slippage=0.0, bars_per_year=1.0):
+    """
+    Headline metrics of a signal array, without building the full report.
+
+    Used by the parameter sweep and walk-forward runs, which score many
+    signal arrays against the same prices.
+
+    Parameters:
+        close (np.ndarray): Close prices.
+        signals (np.ndarray): Signal codes.
+        leverage, fee, slippage: As in strategy_returns.
+        bars_per_year (float): Used to annualise the Sharpe ratio.
+
+    Returns:
+        dict: total_return, max_drawdown, sharpe, trades and win_rate
+            (fractions, compounded).
+    """
+    positions = positions_from_signals(signals)
+    gross, entry_costs, exit_costs = strategy_returns(close, positions, leverage, fee, slippage)
+    net = gross - entry_costs - exit_costs
+    trades = extract_trades(positions, gross, entry_costs, exit_costs)
+    equity = np.cumprod(np.maximum(1 + net, 0.0))
+    sharpe, _ = _ratios(net, bars_per_year)
+    return {
+        "total_return": float(equity[-1] - 1) if len(equity) else 0.0,
+        "max_drawdown": max_drawdown(equity),
+        "sharpe": sharpe,
+        "trades": int(len(trades["start"])),
+        "win_rate": float((trades["compound_return"] > 0).mean()) if len(trades["start"]) else 0.0,
+    }
+
+def annual_bar_count(datetimes):
+    """
+    Number of bars in a year at the median spacing of the given timestamps.
+    """
+    datetimes = np.asarray(datetimes, dtype="datetime64[ns]")
+    if len(datetimes) < 2:
+        return 1.0
+    bar_seconds = np.median(np.diff(datetimes).astype("timedelta64[s]").astype("float64"))
+    return SECONDS_PER_YEAR / bar_seconds if bar_seconds > 0 else 1.0
+
+def _statistics(trade_returns, trade_profits, equity, net, trades, datetimes, base):
+    wins = trade_returns > 0
+    holding = datetimes[np.minimum(trades["end"], len(datetimes) - 1)] - datetimes[trades["start"]]
+    stats = dict(base)
+    stats.update({
+        "Total Trades": int(len(trade_returns)),
+        "Winning Trades": int(wins.sum()),
+        "Losing Trades": int((~wins).sum()),
+        "No. of Long Trades": int((trades["direction"] > 0).sum()),
+        "No. of Short Trades": int((trades["direction"] < 0).sum()),
+        "Win Rate (%)": float(wins.mean() * 100) if len(wins) else 0.0,
+        "Gross Profit": float(trade_profits[trade_profits > 0].sum()),
+        "Gross Loss": float(trade_profits[trade_profits <= 0].sum()),
+        "Net Profit": float(equity[-1] - base["Initial Balance"]) if len(equity) else 0.0,
+        "Final Balance": float(equity[-1]) if len(equity) else base["Initial Balance"],
+        "Total Return (%)": float((equity[-1] / base["Initial Balance"] - 1) * 100) if len(equity) else 0.0,
+        "Maximum Drawdown (%)": max_drawdown(equity, base["Initial Balance"]) * 100,
+        "Average Win (%)": float(trade_returns[wins].mean() * 100) if wins.any() else 0.0,
+        "Average Loss (%)": float(trade_returns[~wins].mean() * 100) if (~wins).any() else 0.0,
+        "Largest Win (%)": float(trade_returns.max() * 100) if len(trade_returns) else 0.0,
+        "Largest Loss (%)": float(trade_returns.min() * 100) if len(trade_returns) else 0.0,
+        "Average Holding Time": str(pd.Timedelta(holding.mean())) if len(holding) else "0 days",
+        "Maximum Holding Time": str(pd.Timedelta(holding.max())) if len(holding) else "0 days",
+    })
+    stats["Sharpe Ratio"], stats["Sortino Ratio"] = _ratios(net, base["_bars_per_year"])
+    del stats["_bars_per_year"]
+    return stats
+
+def run_backtest(data, leverage=1, fee=0.001, slippage=0.0, initial_capital=1000.0):
+    """
+    Backtest a signals DataFrame locally, without the untrade client.
+
+    Parameters:
+        data (pd.DataFrame): Output of strat.generate_signals, with 'datetime',
+            'close' and 'signals' columns.
+        leverage (float): Leverage applied to every position.
+        fee (float): Fee per unit traded, as a fraction.
+        slippage (float): Slippage per unit traded, as a fraction.
+        initial_capital (float): Starting balance.
+
+    Returns:
+        dict: 'static_statistics' (returns on fixed capital) and
+            'compound_statistics' (returns reinvested), as printed by
+            backtest.parse_and_print_statistics.
+    """
+    close = data["close"].to_numpy(dtype="float64")
+    datetimes = pd.to_datetime(data["datetime"]).to_numpy()
+    positions = positions_from_signals(data["signals"].to_numpy())
+    gross, entry_costs, exit_costs = strategy_returns(close, positions, leverage, fee, slippage)
+    net = gross - entry_costs - exit_costs
+    trades = extract_trades(positions, gross, entry_costs, exit_costs)
+
+    base = {
+        "From": str(pd.Timestamp(datetimes[0])) if len(datetimes) else "",
+        "To": str(pd.Timestamp(datetimes[-1])) if len(datetimes) else "",
+        "Leverage Applied": leverage,
+        "Initial Balance": float(initial_capital),
+        "Benchmark Return (%)": float((close[-1] / close[0] - 1) * 100) if len(close) else 0.0,
+        "Total Fee": float((entry_costs + exit_costs).sum() * initial_capital),
+        "_bars_per_year": annual_bar_count(datetimes),
+    }
+
+    static_equity = initial_capital * (1 + np.cumsum(net))
+    compound_equity = initial_capital * np.cumprod(np.maximum(1 + net, 0.0))
+    equity_before = np.r_[initial_capital, compound_equity[:-1]]
+
+    return {
+        "static_statistics": _statistics(
+            trades["static_return"], trades["static_return"] * initial_capital,
+            static_equity, net, trades, datetimes, base),
+        "compound_statistics": _statistics(
+            trades["compound_return"], trades["compound_return"] * equity_before[trades["start"]],
+            compound_equity, net, trades, datetimes, base),
+    }
+
+def as_event_stream(statistics):
+    """
+    Wrap statistics in the 'data: {...}' line format of the untrade client.
+
+    Parameters:
+        statistics (dict): Output of run_backtest.
+
+    Returns:
+        list: One event line that parse_and_print_statistics understands.
+    """
+    return [f"data: {json.dumps({'result': statistics})}"]
+
+class LocalClient:
+    """
+    Stand-in for untrade's Client that backtests locally.
+
+    backtest() takes the same arguments and returns the same 'data: {...}'
+    event lines, so code written against the client (e.g. batch_backtest)
+    can run offline. It can also fail on purpose to exercise retries.
+
+    Parameters:
+        fee (float): Fee per unit traded, as a fraction.
+        slippage (float): Slippage per unit traded, as a fraction.
+        failure_rate (float): Probability that a call raises ConnectionError.
+        seed (int): Seed of the simulated failures.
+    """
+
+    def __init__(self, fee=0.001, slippage=0.0, failure_rate=0.0, seed=None):
+        self.fee = fee
+        self.slippage = slippage
+        self.failure_rate = failure_rate
+        self.random = np.random.default_rng(seed)
+        self.calls = 0
+        # results also depend on the costs, which untrade does not take
+        self.cache_key = f"local:fee={fee}:slippage={slippage}"
+
+    def backtest(self, file_path, leverage=1, jupyter_id=None):
+        self.calls += 1
+        if self.failure_rate and self.random.random() < self.failure_rate:
+            raise ConnectionError(f"Simulated failure backtesting {file_path}")
+        data = pd.read_csv(file_path)
+        return as_event_stream(run_backtest(data, leverage=leverage, fee=self.fee, slippage=self.slippage))
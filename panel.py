@@ -0,0 +1,170 @@
+import os
+import hashlib
+import numpy as np
+import pandas as pd
+from loader import CACHE_DIR_NAME, file_fingerprint, read_csv_cached
+from resample import TIMEFRAMES, bin_labels, datetime_values, timeframe_from_file_name
+
+# Higher-timeframe columns added to the base rows by default
+CONTEXT_COLUMNS = ["rsi_14", "macd", "macd_signal", "macd_diff"]
+
+def timeframe_width(timeframe):
+    """
+    Nominal length of a timeframe bar in nanoseconds (31 days for '1month'), for ordering.
+    """
+    if TIMEFRAMES[timeframe] == "month":
+        return pd.Timedelta("31D").value
+    return pd.Timedelta(TIMEFRAMES[timeframe][0]).value
+
+def bar_close_times(timestamps, timeframe):
+    """
+    Time at which each bar is complete: the start of the next bin.
+
+    Parameters:
+        timestamps (np.ndarray): datetime64[ns] bar timestamps (bin starts).
+        timeframe (str): Key of resample.TIMEFRAMES.
+
+    Returns:
+        np.ndarray: datetime64[ns] close time of each bar.
+    """
+    if TIMEFRAMES[timeframe] == "month":
+        return (timestamps.astype("datetime64[M]") + 1).astype("datetime64[ns]")
+    return bin_labels(timestamps, timeframe) + np.timedelta64(timeframe_width(timeframe), "ns")
+
+def asof_positions(times, close_times):
+    """
+    Row of the last bar already closed at each time, as one binary search per row.
+
+    Parameters:
+        times (np.ndarray): datetime64[ns] query times.
+        close_times (np.ndarray): Sorted datetime64[ns] close times of the other frame.
+
+    Returns:
+        np.ndarray: Row positions into the other frame, -1 where no bar has closed yet.
+    """
+    if np.any(close_times[1:] < close_times[:-1]):
+        raise ValueError("Bars must be sorted by time to be aligned")
+    return np.searchsorted(close_times, times, side="right") - 1
+
+def build_panel(frames, columns=None, base=None):
+    """
+    Align the features of several timeframes to the rows of the finest one.
+
+    A row of the base timeframe is a decision taken when its bar closes. It
+    sees the features of the last higher-timeframe bar that had closed by
+    then, never the bar still in progress, so there is no look-ahead. The
+    row mapping is computed once per timeframe with a binary search over the
+    close times, and the columns are gathered with it in one indexing step.
+
+    Parameters:
+        frames (dict): Timeframe key -> engineered frame (with 'datetime').
+        columns (list): Higher-timeframe columns to add; defaults to CONTEXT_COLUMNS.
+        base (str): Timeframe whose rows make the panel; defaults to the finest.
+
+    Returns:
+        pd.DataFrame: The base frame followed by '<column>_<timeframe>' columns,
+            NaN until the first higher-timeframe bar has closed.
+    """
+    columns = columns or CONTEXT_COLUMNS
+    base = base or min(frames, key=timeframe_width)
+    base_frame = frames[base]
+    decision_times = bar_close_times(datetime_values(base_frame), base)
+
+    blocks = [base_frame]
+    for timeframe, df in sorted(frames.items(), key=lambda item: timeframe_width(item[0])):
+        if timeframe == base:
+            continue
+        positions = asof_positions(decision_times, bar_close_times(datetime_values(df), timeframe))
+        values = df[columns].to_numpy(dtype="float64")[np.maximum(positions, 0)]
+        values[positions < 0] = np.nan
+        blocks.append(pd.DataFrame(values, index=base_frame.index, columns=[f"{column}_{timeframe}" for column in columns]))
+    return pd.concat(blocks, axis=1)
+
+def timeframe_files(folder, timeframes):
+    """
+    Map each requested timeframe to its CSV file in a folder.
+
+    Parameters:
+        folder (str): Folder of files named like 'BTC_2019_2023_15m.csv'.
+        timeframes (list): Timeframe keys.
+
+    Returns:
+        dict: Timeframe key -> file path.
+    """
+    from parallel import list_csv_files
+
+    files = {timeframe_from_file_name(file_path): file_path for file_path in list_csv_files(folder)}
+    missing = [timeframe for timeframe in timeframes if timeframe not in files]
+    if missing:
+        raise FileNotFoundError(f"No file for timeframes {missing} in {folder}")
+    return {timeframe: files[timeframe] for timeframe in timeframes}
+
+def panel_cache_path(file_paths, columns, base):
+    """
+    Feather cache path of a panel, keyed on the fingerprints of its input files.
+    """
+    key = "|".join([*(f"{timeframe}={file_fingerprint(path)}" for timeframe, path in sorted(file_paths.items())),
+                    ",".join(columns), str(base)])
+    digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+    folder = os.path.dirname(next(iter(file_paths.values())))
+    return os.path.join(folder, CACHE_DIR_NAME, f"panel_{'_'.join(file_paths)}.{digest}.feather")
+
+def load_panel(folder="engineered_data", timeframes=("15m", "1h", "1d"), columns=None, base=None, use_cache=True):
+    """
+    Build (or read back) the panel of the engineered files of several timeframes.
+
+    The panel is saved as Feather in the folder's .cache directory, keyed on
+    the input files, columns and base, so editing an engineered file rebuilds it.
+
+    Parameters:
+        folder (str): Folder of engineered CSV files.
+        timeframes (list): Timeframe keys to combine.
+        columns (list): Higher-timeframe columns to add; defaults to CONTEXT_COLUMNS.
+        base (str): Timeframe whose rows make the panel; defaults to the finest.
+        use_cache (bool): Read and write the Feather cache.
+
+    Returns:
+        pd.DataFrame: Output of build_panel.
+    """
+    columns = list(columns or CONTEXT_COLUMNS)
+    file_paths = timeframe_files(folder, timeframes)
+    try:
+        import pyarrow.feather as feather
+    except ImportError:
+        use_cache = False
+
+    if use_cache:
+        cache_path = panel_cache_path(file_paths, columns, base)
+        if os.path.exists(cache_path):
+            return feather.read_table(cache_path, memory_map=True).to_pandas()
+
+    panel = build_panel({timeframe: read_csv_cached(path) for timeframe, path in file_paths.items()}, columns, base)
+
+    if use_cache:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        feather.write_feather(panel.reset_index(drop=True), tmp_path, compression="uncompressed")
+        os.replace(tmp_path, cache_path)
+    return panel
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from schema import to_csv
+
+    parser = argparse.ArgumentParser(description="Align higher-timeframe features to the finest timeframe.")
+    parser.add_argument("--data", default="engineered_data", help="Folder with the engineered CSV files.")
+    parser.add_argument("--timeframes", nargs="+", default=["15m", "1h", "1d"], help="timeframes to combine")
+    parser.add_argument("--columns", nargs="+", default=CONTEXT_COLUMNS, help="higher-timeframe columns to add")
+    parser.add_argument("--base", default=None, help="timeframe of the panel rows (default: the finest)")
+    parser.add_argument("--no-cache", action="store_true", help="rebuild the panel without the Feather cache")
+    parser.add_argument("--output", default=None, help="also save the panel to this CSV file")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    panel = load_panel(args.data, args.timeframes, args.columns, args.base, use_cache=not args.no_cache)
+    print(f"{len(panel)} rows x {panel.shape[1]} columns in {time.perf_counter() - start:.3f}s")
+    print(panel.tail())
+    if args.output:
+        to_csv(panel, args.output)
+        print(f"Panel saved to {args.output}")
@@ -0,0 +1,49 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+def list_csv_files(folder_path):
+    """
+    List the CSV files in a folder in a stable (sorted) order.
+
+    Parameters:
+        folder_path (str): Path to the folder containing CSV files.
+
+    Returns:
+        list: Paths of the CSV files.
+    """
+    return [
+        os.path.join(folder_path, file_name)
+        for file_name in sorted(os.listdir(folder_path))
+        if file_name.endswith(".csv")
+    ]
+
+def run_per_file(func, file_paths, workers=None, **kwargs):
+    """
+    Call func(file_path, **kwargs) for every file, optionally across a process pool.
+
+    Only file paths and the small values returned by func cross process
+    boundaries; each worker reads its own input and writes its own output, so
+    whole DataFrames are never pickled. Results come back in the order of
+    file_paths whatever the number of workers.
+
+    Parameters:
+        func (callable): Picklable (module-level) function taking a file path.
+        file_paths (list): Paths of the files to process.
+        workers (int): Number of processes; None uses every core, 1 runs serially.
+        **kwargs: Extra keyword arguments passed to func.
+
+    Returns:
+        list: Return values of func, one per file, in input order.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(file_paths) <= 1:
+        return [func(file_path, **kwargs) for file_path in file_paths]
+
+    from instrument import pool_options
+
+    # submit the largest files first so the 1m file does not start last
+    order = sorted(range(len(file_paths)), key=lambda i: os.path.getsize(file_paths[i]), reverse=True)
+    with ProcessPoolExecutor(max_workers=min(workers, len(file_paths)), **pool_options()) as pool:
+        futures = {i: pool.submit(func, file_paths[i], **kwargs) for i in order}
+        return [futures[i].result() for i in range(len(file_paths))]
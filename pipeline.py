@@ -0,0 +1,284 @@
+import os
+import json
+import time
+import hashlib
+import contextlib
+
+CONFIG_ENV = "PIPELINE_CONFIG"
+CONFIG_FILE = "pipeline.json"
+
+# Folders and parameters of the pipeline. A JSON file (pipeline.json in the
+# working directory, or the path in $PIPELINE_CONFIG) overrides any of them.
+DEFAULT_CONFIG = {
+    "data": "data",
+    "engineered": "engineered_data",
+    "signals": "signals",
+    "backtests": "backtests",
+    "plots": "random_outputs",
+    "integrity": "integrity_reports",
+    "trading_plots": "trading_plots",
+    "heatmaps": "missing_data_heatmaps",
+    "manifest": ".pipeline_manifest.json",
+    "timeframes": None,
+    "lag": 3,
+    "compact": True,
+    "rsi_low": 30,
+    "rsi_high": 70,
+    "backend": "local",
+    "leverage": 1,
+    "fee": 0.001,
+    "slippage": 0.0,
+    "workers": 1,
+}
+
+def load_config(path=None, **overrides):
+    """
+    Read the pipeline configuration.
+
+    Parameters:
+        path (str): JSON file; defaults to $PIPELINE_CONFIG or pipeline.json when present.
+        **overrides: Values that take precedence over the file (None values are ignored).
+
+    Returns:
+        dict: DEFAULT_CONFIG updated with the file and the overrides.
+    """
+    config = dict(DEFAULT_CONFIG)
+    path = path or os.environ.get(CONFIG_ENV) or (CONFIG_FILE if os.path.exists(CONFIG_FILE) else None)
+    if path:
+        with open(path) as f:
+            settings = json.load(f)
+        unknown = set(settings) - set(DEFAULT_CONFIG)
+        if unknown:
+            raise ValueError(f"Unknown settings in {path}: {sorted(unknown)}")
+        config.update(settings)
+    config.update({key: value for key, value in overrides.items() if value is not None})
+    return config
+
+def _integrity(input_path, output_path, config):
+    from integrity import scan_file
+
+    report = scan_file(input_path)
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    os.replace(tmp_path, output_path)
+
+def _trading_plot(input_path, output_path, config):
+    from loader import read_csv_cached, save_trading_plot
+
+    file_name = os.path.basename(input_path)
+    if save_trading_plot(file_name, read_csv_cached(input_path), os.path.dirname(output_path)) is None:
+        raise ValueError(f"{file_name} has no OHLCV columns to plot")
+
+def _engineer(input_path, output_path, config):
+    from feature_eng import engineer_file
+
+    with contextlib.redirect_stdout(None):
+        engineer_file(input_path, os.path.dirname(output_path), config["lag"], config["compact"])
+
+def _signals(input_path, output_path, config):
+    from strat import generate_signals
+
+    with contextlib.redirect_stdout(None):
+        generate_signals(input_path, output_path, config["rsi_low"], config["rsi_high"])
+
+def _backtest(input_path, output_path, config):
+    from backtest import parse_event_stream, perform_backtest, perform_local_backtest
+
+    if config["backend"] == "local":
+        result = perform_local_backtest(input_path, config["leverage"], config["fee"], config["slippage"])
+    else:
+        result = perform_backtest(input_path, config["leverage"])
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(parse_event_stream(result), f, indent=2)
+    os.replace(tmp_path, output_path)
+
+# The stages in dependency order. Each reads the file of its branch (one
+# timeframe) from the folder of its input and writes one file into the
+# folder of its output; 'params' are the settings its result depends on.
+STAGES = [
+    {"name": "integrity", "input": "data", "output": "integrity", "suffix": ".json",
+     "params": [], "run": _integrity},
+    # loader.save_trading_plot names the plot after the whole CSV name
+    {"name": "plots", "input": "data", "output": "trading_plots", "suffix": ".csv_trading_plot.png",
+     "params": [], "run": _trading_plot},
+    {"name": "engineer", "input": "data", "output": "engineered", "suffix": ".csv",
+     "params": ["lag", "compact"], "run": _engineer},
+    {"name": "signals", "input": "engineered", "output": "signals", "suffix": ".csv",
+     "params": ["rsi_low", "rsi_high"], "run": _signals},
+    {"name": "backtest", "input": "signals", "output": "backtests", "suffix": ".json",
+     "params": ["backend", "leverage", "fee", "slippage"], "run": _backtest},
+]
+
+def stage_order(stages=STAGES):
+    """
+    Check that every stage input is the raw data or the output of an earlier stage.
+
+    Returns:
+        list: Stage names in execution order.
+    """
+    available = {"data"}
+    for stage in stages:
+        if stage["input"] not in available:
+            raise ValueError(f"Stage '{stage['name']}' reads '{stage['input']}', which no earlier stage writes")
+        available.add(stage["output"])
+    return [stage["name"] for stage in stages]
+
+def content_hash(path, known=None):
+    """
+    SHA-256 of a file, reusing a hash from 'known' while size and mtime are unchanged.
+
+    Parameters:
+        path (str): File to hash.
+        known (dict): Earlier {'size', 'mtime_ns', 'sha256'} entry of the same path.
+
+    Returns:
+        dict: {'size', 'mtime_ns', 'sha256'}.
+    """
+    stat = os.stat(path)
+    if known and known.get("size") == stat.st_size and known.get("mtime_ns") == stat.st_mtime_ns:
+        return known
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest.hexdigest()}
+
+def params_hash(stage, config):
+    values = {key: config[key] for key in stage["params"]}
+    return hashlib.sha256(json.dumps(values, sort_keys=True).encode()).hexdigest()
+
+def run_branch(file_name, config, manifest, stages, force=False):
+    """
+    Run the stages of one timeframe file, skipping those whose inputs are unchanged.
+
+    A stage is skipped when its output exists with the content recorded in
+    the manifest, and its input content and parameters are the ones it was
+    built from. Skipped or not, the next stage then checks its own input.
+
+    Parameters:
+        file_name (str): Raw CSV name, e.g. 'BTC_2019_2023_15m.csv'.
+        config (dict): Output of load_config.
+        manifest (dict): Output path -> entry recorded by earlier runs.
+        stages (list): Stages to run, in order.
+        force (bool): Run every stage.
+
+    Returns:
+        tuple: Manifest entries to record and a list of (stage, status, seconds).
+    """
+    base_name = os.path.splitext(file_name)[0]
+    updates, log = {}, []
+    for stage in stages:
+        input_folder = config[stage["input"]]
+        input_name = file_name if stage["input"] == "data" else base_name + _suffix(stage["input"], stages)
+        input_path = os.path.join(input_folder, input_name)
+        output_path = os.path.join(config[stage["output"]], base_name + stage["suffix"])
+        if not os.path.exists(input_path):
+            log.append((stage["name"], "missing input", 0.0))
+            break
+
+        entry = manifest.get(output_path, {})
+        input_state = content_hash(input_path, entry.get("input"))
+        parameters = params_hash(stage, config)
+        if (not force and os.path.exists(output_path)
+                and entry.get("input", {}).get("sha256") == input_state["sha256"]
+                and entry.get("params") == parameters):
+            output_state = content_hash(output_path, entry.get("output"))
+            if output_state["sha256"] == entry["output"]["sha256"]:
+                # touched but identical files get their new mtime recorded, so they are not hashed again
+                if input_state is not entry["input"] or output_state is not entry["output"]:
+                    updates[output_path] = {**entry, "input": input_state, "output": output_state}
+                log.append((stage["name"], "skipped", 0.0))
+                continue
+
+        start = time.perf_counter()
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        stage["run"](input_path, output_path, config)
+        updates[output_path] = {"stage": stage["name"], "input": input_state, "params": parameters,
+                                "output": content_hash(output_path)}
+        log.append((stage["name"], "ran", time.perf_counter() - start))
+    return updates, log
+
+def _suffix(folder_key, stages):
+    # file suffix written by the stage that produces a folder
+    return next(stage["suffix"] for stage in stages if stage["output"] == folder_key)
+
+def _run_branch_worker(file_path, config, manifest, stage_names, force):
+    # process pool worker: stages are looked up by name, their functions are not pickled
+    stages = [stage for stage in STAGES if stage["name"] in stage_names]
+    return run_branch(os.path.basename(file_path), config, manifest, stages, force)
+
+def read_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def write_manifest(path, manifest):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def run_pipeline(config, until=None, force=False):
+    """
+    Run the pipeline over every timeframe file, one independent branch per file.
+
+    Branches run in parallel across config['workers'] processes. The
+    manifest is only written by this process, after the branches return.
+
+    Parameters:
+        config (dict): Output of load_config.
+        until (str): Last stage to run; all stages by default.
+        force (bool): Rerun stages even when their inputs are unchanged.
+
+    Returns:
+        dict: File name -> list of (stage, status, seconds).
+    """
+    from parallel import list_csv_files, run_per_file
+    from resample import timeframe_from_file_name
+
+    names = stage_order()
+    if until is not None:
+        names = names[:names.index(until) + 1]
+    file_paths = [
+        file_path for file_path in list_csv_files(config["data"])
+        if config["timeframes"] is None or timeframe_from_file_name(file_path) in config["timeframes"]
+    ]
+    manifest = read_manifest(config["manifest"])
+    results = run_per_file(_run_branch_worker, file_paths, config["workers"],
+                           config=config, manifest=manifest, stage_names=names, force=force)
+    logs = {}
+    for file_path, (updates, log) in zip(file_paths, results):
+        manifest.update(updates)
+        logs[os.path.basename(file_path)] = log
+    write_manifest(config["manifest"], manifest)
+    return logs
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Run the integrity/plots -> engineer -> signals -> backtest pipeline, skipping unchanged work.",
+        epilog=f"Folders and parameters come from {CONFIG_FILE} (or --config / ${CONFIG_ENV}); "
+               f"defaults: {json.dumps(DEFAULT_CONFIG)}",
+    )
+    parser.add_argument("--config", default=None, help="JSON configuration file")
+    parser.add_argument("--until", choices=stage_order(), default=None, help="last stage to run")
+    parser.add_argument("--timeframes", nargs="+", default=None, help="only these timeframes, e.g. 15m 1h")
+    parser.add_argument("--workers", type=int, default=None, help="timeframe branches run in parallel")
+    parser.add_argument("--backend", choices=["local", "untrade"], default=None, help="backtest backend")
+    parser.add_argument("--force", action="store_true", help="rerun every stage")
+    args = parser.parse_args()
+
+    config = load_config(args.config, timeframes=args.timeframes, workers=args.workers, backend=args.backend)
+    start = time.perf_counter()
+    logs = run_pipeline(config, args.until, args.force)
+    for file_name, log in logs.items():
+        print(f"{file_name:<28} " + "  ".join(
+            f"{stage}: {status}" + (f" ({seconds:.2f}s)" if status == "ran" else "") for stage, status, seconds in log
+        ))
+    ran = sum(status == "ran" for log in logs.values() for _, status, _ in log)
+    skipped = sum(status == "skipped" for log in logs.values() for _, status, _ in log)
+    print(f"{ran} stage runs, {skipped} skipped, in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,211 @@
+import os
+import numpy as np
+import pandas as pd
+from loader import read_csv_cached
+
+# Bin width and offset from the Unix epoch of every exported timeframe. The
+# offsets reproduce the anchors of the shipped files: 3-day bins fall on days
+# where (days since epoch) % 3 == 2 (e.g. 2019-09-07), weekly bins start on
+# Monday (1970-01-05 was the first epoch Monday) and months on the 1st.
+TIMEFRAMES = {
+    "1m": ("1min", "0min"),
+    "3m": ("3min", "0min"),
+    "15m": ("15min", "0min"),
+    "30m": ("30min", "0min"),
+    "1h": ("1h", "0h"),
+    "2h": ("2h", "0h"),
+    "4h": ("4h", "0h"),
+    "6h": ("6h", "0h"),
+    "8h": ("8h", "0h"),
+    "12h": ("12h", "0h"),
+    "1d": ("1D", "0D"),
+    "3d": ("3D", "2D"),
+    "1w": ("7D", "4D"),
+    "1month": "month",
+}
+
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+def timeframe_from_file_name(file_name):
+    """
+    Extract the timeframe suffix from a file name like 'BTC_2019_2023_15m.csv'.
+
+    Parameters:
+        file_name (str): Name or path of a timeframe CSV file.
+
+    Returns:
+        str: Timeframe suffix, e.g. '15m'.
+    """
+    return os.path.splitext(os.path.basename(file_name))[0].rsplit("_", 1)[-1]
+
+def datetime_values(df):
+    """
+    Return the timestamps of a frame as a datetime64[ns] array.
+
+    Parameters:
+        df (pd.DataFrame): Frame with a DatetimeIndex or a 'datetime' column.
+
+    Returns:
+        np.ndarray: Timestamps as datetime64[ns].
+    """
+    if isinstance(df.index, pd.DatetimeIndex):
+        return df.index.values.astype("datetime64[ns]")
+    return pd.to_datetime(df["datetime"]).values.astype("datetime64[ns]")
+
+def bin_labels(timestamps, timeframe):
+    """
+    Compute the label (bin start) of every timestamp for a timeframe.
+
+    Parameters:
+        timestamps (np.ndarray): datetime64[ns] timestamps.
+        timeframe (str): Key of TIMEFRAMES, e.g. '4h'.
+
+    Returns:
+        np.ndarray: datetime64[ns] bin start of each timestamp.
+    """
+    spec = TIMEFRAMES[timeframe]
+    if spec == "month":
+        return timestamps.astype("datetime64[M]").astype("datetime64[ns]")
+    width = pd.Timedelta(spec[0]).value
+    offset = pd.Timedelta(spec[1]).value
+    nanos = timestamps.astype("int64") - offset
+    return (nanos - nanos % width + offset).astype("datetime64[ns]")
+
+def resample_ohlcv(df, timeframe):
+    """
+    Build a timeframe from 1m OHLCV bars in one vectorized pass.
+
+    Bars are grouped by bin label, then open=first, high=max, low=min,
+    close=last and volume=sum are taken with reduceat over the bin starts.
+    Bins with no source bars are not emitted, matching the exported files.
+
+    Parameters:
+        df (pd.DataFrame): 1m bars with OHLCV columns and a datetime index or column.
+        timeframe (str): Key of TIMEFRAMES, e.g. '4h'.
+
+    Returns:
+        pd.DataFrame: Resampled OHLCV bars indexed by 'datetime'.
+    """
+    timestamps = datetime_values(df)
+    order = None
+    if len(timestamps) > 1 and (np.diff(timestamps.astype("int64")) < 0).any():
+        order = np.argsort(timestamps, kind="stable")
+        timestamps = timestamps[order]
+
+    columns = {}
+    for column in OHLCV_COLUMNS:
+        values = df[column].to_numpy()
+        columns[column] = values[order] if order is not None else values
+
+    labels = bin_labels(timestamps, timeframe)
+    if len(labels) == 0:
+        return pd.DataFrame(columns=OHLCV_COLUMNS, index=pd.DatetimeIndex([], name="datetime"))
+    starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+    ends = np.r_[starts[1:], len(labels)]
+
+    return pd.DataFrame(
+        {
+            "open": columns["open"][starts],
+            "high": np.maximum.reduceat(columns["high"], starts),
+            "low": np.minimum.reduceat(columns["low"], starts),
+            "close": columns["close"][ends - 1],
+            "volume": np.add.reduceat(columns["volume"], starts),
+        },
+        index=pd.DatetimeIndex(labels[starts], name="datetime"),
+    )
+
+def resample_all(df, timeframes=None, prefix="BTC_2019_2023"):
+    """
+    Build several timeframes from the same 1m bars.
+
+    Parameters:
+        df (pd.DataFrame): 1m OHLCV bars.
+        timeframes (list): Keys of TIMEFRAMES; None builds all of them.
+        prefix (str): File name prefix used for the dictionary keys.
+
+    Returns:
+        dict: Dictionary where keys are filenames and values are DataFrames.
+    """
+    timeframes = timeframes or list(TIMEFRAMES)
+    return {f"{prefix}_{timeframe}.csv": resample_ohlcv(df, timeframe) for timeframe in timeframes}
+
+def write_timeframes(df, output_folder, timeframes=None, prefix="BTC_2019_2023", volume_decimals=3):
+    """
+    Resample 1m bars and save each timeframe in the format of the exported CSVs.
+
+    Parameters:
+        df (pd.DataFrame): 1m OHLCV bars.
+        output_folder (str): Folder to write the CSV files into.
+        timeframes (list): Keys of TIMEFRAMES; None writes all of them.
+        prefix (str): File name prefix.
+        volume_decimals (int): Volume sums are rounded to the exchange precision.
+
+    Returns:
+        list: Paths of the written files.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    output_paths = []
+    for file_name, resampled in resample_all(df, timeframes, prefix).items():
+        resampled["volume"] = resampled["volume"].round(volume_decimals)
+        output_path = os.path.join(output_folder, file_name)
+        resampled.to_csv(output_path)
+        output_paths.append(output_path)
+    return output_paths
+
+def reconcile(derived, shipped, rtol=1e-9, atol=1e-6):
+    """
+    Compare resampled bars with an exported timeframe file.
+
+    Parameters:
+        derived (pd.DataFrame): Output of resample_ohlcv.
+        shipped (pd.DataFrame): Exported file with a 'datetime' column or index.
+        rtol (float): Relative tolerance for value comparisons.
+        atol (float): Absolute tolerance (volumes are rounded to 3 decimals).
+
+    Returns:
+        dict: Row counts, timestamps missing on either side and, per column,
+            the number of mismatching rows and the largest absolute difference.
+    """
+    shipped = shipped.set_index(pd.DatetimeIndex(datetime_values(shipped), name="datetime"))
+    common = derived.index.intersection(shipped.index)
+    report = {
+        "derived_rows": len(derived),
+        "shipped_rows": len(shipped),
+        "only_derived": len(derived.index.difference(shipped.index)),
+        "only_shipped": len(shipped.index.difference(derived.index)),
+        "columns": {},
+    }
+    for column in OHLCV_COLUMNS:
+        left = derived.loc[common, column].to_numpy(dtype="float64")
+        right = shipped.loc[common, column].to_numpy(dtype="float64")
+        mismatched = ~np.isclose(left, right, rtol=rtol, atol=atol)
+        report["columns"][column] = {
+            "mismatched": int(mismatched.sum()),
+            "max_abs_diff": float(np.abs(left - right).max()) if len(common) else 0.0,
+        }
+    report["ok"] = (
+        report["only_derived"] == 0
+        and report["only_shipped"] == 0
+        and all(stats["mismatched"] == 0 for stats in report["columns"].values())
+    )
+    return report
+
+if __name__ == "__main__":
+    # Rebuild every exported timeframe from the 1m file and check it against the CSVs
+    data_folder = "data"
+    base_df = read_csv_cached(os.path.join(data_folder, "BTC_2019_2023_1m.csv"))
+
+    for file_name in sorted(os.listdir(data_folder)):
+        if not file_name.endswith(".csv"):
+            continue
+        timeframe = timeframe_from_file_name(file_name)
+        if timeframe not in TIMEFRAMES:
+            print(f"{file_name}: unknown timeframe '{timeframe}', skipped")
+            continue
+        derived = resample_ohlcv(base_df, timeframe)
+        report = reconcile(derived, read_csv_cached(os.path.join(data_folder, file_name)))
+        mismatches = ", ".join(
+            f"{column}={stats['mismatched']}" for column, stats in report["columns"].items() if stats["mismatched"]
+        )
+        print(f"{file_name:<28} {'OK' if report['ok'] else 'MISMATCH'} rows={report['derived_rows']}/{report['shipped_rows']} "
+              f"only_derived={report['only_derived']} only_shipped={report['only_shipped']} {mismatches}")
@@ -0,0 +1,227 @@
+import numpy as np
+import pandas as pd
+from local_backtest import extract_trades, positions_from_signals, strategy_returns, SECONDS_PER_YEAR
+
+METHODS = ["bootstrap", "block", "shuffle"]
+METRICS = ["total_return", "max_drawdown", "sharpe"]
+
+def trade_returns(data, leverage=1, fee=0.001, slippage=0.0):
+    """
+    Compounded net return of every trade implied by a signals DataFrame.
+
+    Trades are split and costed by local_backtest.extract_trades, as in the
+    trade statistics of local_backtest.run_backtest.
+
+    Parameters:
+        data (pd.DataFrame): Output of strat.generate_signals, with 'datetime',
+            'close' and 'signals' columns.
+        leverage, fee, slippage: As in local_backtest.strategy_returns.
+
+    Returns:
+        tuple: (returns array, trades per year), the latter used to annualise the Sharpe ratio.
+    """
+    close = data["close"].to_numpy(dtype="float64")
+    positions = positions_from_signals(data["signals"].to_numpy())
+    gross, entry_costs, exit_costs = strategy_returns(close, positions, leverage, fee, slippage)
+    returns = extract_trades(positions, gross, entry_costs, exit_costs)["compound_return"]
+
+    datetimes = pd.to_datetime(data["datetime"]).to_numpy()
+    seconds = (datetimes[-1] - datetimes[0]) / np.timedelta64(1, "s") if len(datetimes) > 1 else 0.0
+    trades_per_year = len(returns) / (seconds / SECONDS_PER_YEAR) if seconds > 0 else 1.0
+    return returns, trades_per_year
+
+def path_metrics(returns, trades_per_year=1.0):
+    """
+    Total return, max drawdown and Sharpe ratio of many trade sequences at once.
+
+    Each row is one sequence of trade returns, compounded in order. The
+    drawdown is measured between trades, so moves inside a trade are not
+    seen; the Sharpe ratio is per trade, annualised with trades_per_year.
+
+    Parameters:
+        returns (np.ndarray): (n_paths, n_trades) trade returns.
+        trades_per_year (float): Number of trades in a year.
+
+    Returns:
+        dict: One (n_paths,) array per name in METRICS.
+    """
+    returns = np.atleast_2d(returns)
+    # a leveraged trade can lose everything, but not more
+    with np.errstate(divide="ignore"):
+        log_equity = np.cumsum(np.log1p(np.maximum(returns, -1.0)), axis=1)
+    # the peak includes the starting balance of 1, i.e. log equity 0
+    log_peaks = np.maximum(np.maximum.accumulate(log_equity, axis=1), 0.0)
+    with np.errstate(invalid="ignore"):
+        drawdown = -np.expm1(np.min(log_equity - log_peaks, axis=1, initial=0.0))
+
+    n_trades = returns.shape[1]
+    mean = returns.mean(axis=1) if n_trades else np.zeros(len(returns))
+    std = returns.std(axis=1, ddof=1) if n_trades > 1 else np.zeros(len(returns))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std > 0, mean / std * np.sqrt(trades_per_year), 0.0)
+    return {
+        "total_return": np.expm1(log_equity[:, -1]) if n_trades else np.zeros(len(returns)),
+        "max_drawdown": np.nan_to_num(drawdown, nan=1.0),
+        "sharpe": sharpe,
+    }
+
+def resample_indices(rng, n_paths, n_trades, method="bootstrap", block_length=None):
+    """
+    Trade indices of n_paths resampled sequences.
+
+    'bootstrap' draws trades independently with replacement. 'block' is a
+    circular block bootstrap: runs of block_length consecutive trades are
+    drawn, so winning and losing streaks survive. 'shuffle' permutes the
+    trades without replacement, which leaves the total return and the
+    Sharpe ratio unchanged and only tests how much the drawdown owes to
+    the order of the trades.
+
+    Parameters:
+        rng (np.random.Generator): Source of randomness.
+        n_paths (int): Number of sequences.
+        n_trades (int): Trades in each sequence (and in the original).
+        method (str): One of METHODS.
+        block_length (int): Trades per block; about n_trades ** (1/3) by default.
+
+    Returns:
+        np.ndarray: (n_paths, n_trades) indices into the original trades.
+    """
+    if method == "bootstrap":
+        return rng.integers(0, n_trades, size=(n_paths, n_trades))
+    if method == "block":
+        block_length = block_length or max(1, round(n_trades ** (1 / 3)))
+        n_blocks = -(-n_trades // block_length)
+        starts = rng.integers(0, n_trades, size=(n_paths, n_blocks, 1))
+        indices = (starts + np.arange(block_length)) % n_trades
+        return indices.reshape(n_paths, -1)[:, :n_trades]
+    if method == "shuffle":
+        return np.argsort(rng.random((n_paths, n_trades)), axis=1)
+    raise ValueError(f"Unknown resampling method '{method}', expected one of {METHODS}")
+
+def monte_carlo(returns, n_resamples=10_000, method="bootstrap", block_length=None, trades_per_year=1.0,
+                seed=0, chunk_bytes=64 * 2**20):
+    """
+    Metrics of many resampled trade sequences.
+
+    Resamples are drawn and scored as (chunk, n_trades) arrays; the chunk
+    is sized so that each working array stays under chunk_bytes, so the
+    memory does not grow with n_resamples.
+
+    Parameters:
+        returns (np.ndarray): Trade returns in their original order.
+        n_resamples (int): Number of resampled sequences.
+        method (str): One of METHODS, see resample_indices.
+        block_length (int): Block length of the 'block' method.
+        trades_per_year (float): Used to annualise the Sharpe ratio.
+        seed (int): Random seed; the same seed and inputs give the same samples.
+        chunk_bytes (int): Memory budget of one working array.
+
+    Returns:
+        dict: One (n_resamples,) array per name in METRICS.
+    """
+    returns = np.asarray(returns, dtype="float64")
+    n_trades = len(returns)
+    samples = {metric: np.empty(n_resamples) for metric in METRICS}
+    if n_trades == 0:
+        for values in samples.values():
+            values.fill(0.0)
+        return samples
+
+    rng = np.random.default_rng(seed)
+    chunk = max(1, min(n_resamples, chunk_bytes // (8 * n_trades)))
+    for first in range(0, n_resamples, chunk):
+        size = min(chunk, n_resamples - first)
+        indices = resample_indices(rng, size, n_trades, method, block_length)
+        for metric, values in path_metrics(returns[indices], trades_per_year).items():
+            samples[metric][first:first + size] = values
+    return samples
+
+def confidence_intervals(samples, observed, confidence=0.95):
+    """
+    Percentile confidence interval of every metric.
+
+    Parameters:
+        samples (dict): Output of monte_carlo.
+        observed (dict): Metrics of the original trade sequence.
+        confidence (float): Coverage of the interval, e.g. 0.95.
+
+    Returns:
+        pd.DataFrame: One row per metric with observed, mean, low, high and
+            the share of resamples below the observed value.
+    """
+    tail = (1 - confidence) / 2
+    rows = []
+    for metric in METRICS:
+        values = samples[metric]
+        low, high = np.quantile(values, [tail, 1 - tail])
+        rows.append({
+            "metric": metric,
+            "observed": float(observed[metric]),
+            "mean": float(values.mean()),
+            "low": float(low),
+            "high": float(high),
+            # resamples equal to the observed value up to rounding, e.g. every shuffled total return, are not below it
+            "below_observed": float(((values < observed[metric]) & ~np.isclose(values, observed[metric])).mean()),
+        })
+    return pd.DataFrame(rows).set_index("metric")
+
+def robustness_report(data, n_resamples=10_000, methods=METHODS, confidence=0.95, block_length=None, seed=0,
+                      leverage=1, fee=0.001, slippage=0.0):
+    """
+    Confidence intervals of the strategy metrics under every resampling method.
+
+    Parameters:
+        data (pd.DataFrame): Output of strat.generate_signals.
+        n_resamples (int): Resampled sequences per method.
+        methods (list): Names from METHODS.
+        confidence (float): Coverage of the intervals.
+        block_length (int): Block length of the 'block' method.
+        seed (int): Random seed.
+        leverage, fee, slippage: As in local_backtest.strategy_returns.
+
+    Returns:
+        tuple: (intervals, summary) where intervals has one row per method
+            and metric, and summary holds the trade count, trades per year,
+            the observed metrics and the bootstrap probability of a loss.
+    """
+    returns, trades_per_year = trade_returns(data, leverage, fee, slippage)
+    observed = {metric: values[0] for metric, values in path_metrics(returns[None, :], trades_per_year).items()}
+    frames = {}
+    summary = {"trades": len(returns), "trades_per_year": trades_per_year, **observed}
+    for method in methods:
+        samples = monte_carlo(returns, n_resamples, method, block_length, trades_per_year, seed)
+        frames[method] = confidence_intervals(samples, observed, confidence)
+        if method == "bootstrap":
+            summary["probability_of_loss"] = float((samples["total_return"] <= 0).mean())
+    return pd.concat(frames, names=["method"]), summary
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from tabulate import tabulate
+    from loader import read_csv_cached
+
+    parser = argparse.ArgumentParser(description="Monte Carlo confidence intervals of the strategy's trades.")
+    parser.add_argument("file", help="signals CSV written by strat.generate_signals")
+    parser.add_argument("--resamples", type=int, default=10_000)
+    parser.add_argument("--methods", nargs="+", choices=METHODS, default=METHODS)
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--block-length", type=int, default=None, help="trades per block (default: n ** 1/3)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--leverage", type=float, default=1)
+    parser.add_argument("--fee", type=float, default=0.001)
+    parser.add_argument("--slippage", type=float, default=0.0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    intervals, summary = robustness_report(
+        read_csv_cached(args.file), args.resamples, args.methods, args.confidence, args.block_length, args.seed,
+        args.leverage, args.fee, args.slippage,
+    )
+    print(f"{summary['trades']} trades ({summary['trades_per_year']:.1f} per year): "
+          f"return {summary['total_return']:.2%}, max drawdown {summary['max_drawdown']:.2%}, "
+          f"Sharpe {summary['sharpe']:.2f}")
+    if "probability_of_loss" in summary:
+        print(f"Bootstrap probability of a loss: {summary['probability_of_loss']:.1%}")
+    print(tabulate(intervals.round(4).reset_index(), headers="keys", tablefmt="pretty", showindex=False))
+    print(f"{args.resamples:,} resamples x {len(args.methods)} methods in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,258 @@
+import re
+import ast
+import numpy as np
+import pandas as pd
+from schema import TRADE_TYPE_CATEGORIES
+
+# The strategy of strat.py written as rules
+DEFAULT_RULES = """
+# Buy signal: RSI < 30 and MACD crosses above signal
+rsi_14 < 30 & crosses_above(macd_diff, 0) -> 1 long_open
+# Sell signal: RSI > 70 and MACD crosses below signal
+rsi_14 > 70 & crosses_below(macd_diff, 0) -> -1 short_open
+crosses_above(macd_diff, 0) -> 2 long_reversal
+crosses_below(macd_diff, 0) -> -2 short_reversal
+"""
+
+class RuleError(ValueError):
+    """
+    A rule that cannot be parsed or evaluated.
+    """
+
+def _shift(values, periods=1):
+    if np.ndim(values) == 0:
+        return values
+    periods = int(periods)
+    shifted = np.full(len(values), np.nan)
+    if periods < len(values):
+        shifted[periods:] = values[:len(values) - periods]
+    return shifted
+
+def _crosses_above(a, b):
+    return (a > b) & (_shift(a) <= _shift(b))
+
+def _crosses_below(a, b):
+    return (a < b) & (_shift(a) >= _shift(b))
+
+# Functions available in rule conditions; arguments are float arrays or numbers
+FUNCTIONS = {
+    "crosses_above": _crosses_above,
+    "crosses_below": _crosses_below,
+    "shift": _shift,
+    "prev": _shift,
+    "abs": np.abs,
+}
+
+_COMPARISONS = {ast.Lt: np.less, ast.LtE: np.less_equal, ast.Gt: np.greater,
+                ast.GtE: np.greater_equal, ast.Eq: np.equal, ast.NotEq: np.not_equal}
+_ARITHMETIC = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.divide}
+_RULE = re.compile(r"^(?P<condition>.+?)\s*->\s*(?P<code>[+-]?\d+)\s+(?P<trade_type>\w+)$")
+
+def _check(node, source):
+    # only comparisons, boolean logic, arithmetic, column names, numbers and FUNCTIONS
+    allowed = (ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+               ast.Compare, ast.BinOp, ast.Name, ast.Load, ast.Constant, ast.Call, *_COMPARISONS, *_ARITHMETIC)
+    for child in ast.walk(node):
+        if not isinstance(child, allowed):
+            raise RuleError(f"Unsupported syntax '{type(child).__name__}' in rule: {source}")
+        if isinstance(child, ast.Constant) and not isinstance(child.value, (int, float)):
+            raise RuleError(f"Only numbers are allowed as constants in rule: {source}")
+        if isinstance(child, ast.Call):
+            if not isinstance(child.func, ast.Name) or child.func.id not in FUNCTIONS or child.keywords:
+                raise RuleError(f"Unknown function in rule: {source} (available: {sorted(FUNCTIONS)})")
+
+def parse_condition(source):
+    """
+    Parse a rule condition into a syntax tree.
+
+    '&', '|' and '~' are read as 'and', 'or' and 'not', so they bind more
+    loosely than comparisons: 'rsi_14 < 30 & macd_diff > 0' needs no brackets.
+
+    Parameters:
+        source (str): Condition, e.g. 'rsi_14 < 30 & crosses_above(macd_diff, 0)'.
+
+    Returns:
+        ast.Expression: Validated tree.
+    """
+    text = source.replace("&", " and ").replace("|", " or ").replace("~", " not ")
+    try:
+        tree = ast.parse(text.strip(), mode="eval")
+    except SyntaxError as error:
+        raise RuleError(f"Cannot parse rule condition: {source}") from error
+    _check(tree, source)
+    return tree
+
+def parse_rules(text):
+    """
+    Parse rule lines written as '<condition> -> <signal code> <trade type>'.
+
+    Blank lines and '#' comments are ignored; earlier rules take priority.
+
+    Parameters:
+        text (str): Rules, one per line.
+
+    Returns:
+        list: (condition tree, signal code, trade type, source line) per rule.
+    """
+    rules = []
+    for line in text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        match = _RULE.match(line)
+        if match is None:
+            raise RuleError(f"Expected '<condition> -> <code> <trade_type>': {line}")
+        code = int(match.group("code"))
+        if code == 0 or not -128 <= code <= 127:
+            raise RuleError(f"Signal codes are non-zero int8 values: {line}")
+        rules.append((parse_condition(match.group("condition")), code, match.group("trade_type"), line))
+    return rules
+
+def rule_columns(rules):
+    """
+    Names of the feature columns the rules read.
+    """
+    return sorted({node.id for tree, *_ in rules for node in ast.walk(tree)
+                   if isinstance(node, ast.Name) and node.id not in FUNCTIONS})
+
+class RuleEvaluator:
+    """
+    Evaluates rule sets on one frame of features.
+
+    Columns and sub-expressions are computed once and shared: evaluating many
+    rule sets that all test 'crosses_above(macd_diff, 0)' computes that mask
+    a single time.
+
+    Parameters:
+        data (pd.DataFrame): Features, e.g. an engineered frame.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.cache = {}
+
+    def value(self, node):
+        """
+        Array (or number) of one expression node, from the cache when possible.
+        """
+        if isinstance(node, ast.Expression):
+            node = node.body
+        if isinstance(node, ast.Constant):
+            return node.value
+        key = ast.dump(node)
+        if key not in self.cache:
+            self.cache[key] = self._compute(node)
+        return self.cache[key]
+
+    def _compute(self, node):
+        if isinstance(node, ast.Name):
+            if node.id not in self.data.columns:
+                raise RuleError(f"Unknown column '{node.id}'")
+            return self.data[node.id].to_numpy(dtype="float64")
+        if isinstance(node, ast.BoolOp):
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            return combine.reduce([self._mask(value) for value in node.values])
+        if isinstance(node, ast.UnaryOp):
+            operand = self.value(node.operand)
+            if isinstance(node.op, ast.Not):
+                return ~self._mask(node.operand)
+            return -operand if isinstance(node.op, ast.USub) else operand
+        if isinstance(node, ast.Compare):
+            # chained comparisons such as 30 < rsi_14 < 70
+            masks, left = [], self.value(node.left)
+            for op, comparator in zip(node.ops, node.comparators):
+                right = self.value(comparator)
+                masks.append(np.asarray(_COMPARISONS[type(op)](left, right)))
+                left = right
+            return np.logical_and.reduce(masks)
+        if isinstance(node, ast.BinOp):
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return _ARITHMETIC[type(node.op)](self.value(node.left), self.value(node.right))
+        if isinstance(node, ast.Call):
+            return FUNCTIONS[node.func.id](*(self.value(arg) for arg in node.args))
+        raise RuleError(f"Unsupported expression: {ast.unparse(node)}")
+
+    def _mask(self, node):
+        mask = np.asarray(self.value(node))
+        if mask.dtype != bool:
+            raise RuleError(f"Not a condition: {ast.unparse(node)}")
+        return np.broadcast_to(mask, (len(self.data),))
+
+    def signals(self, rules):
+        """
+        Signal codes and trade types of one rule set, first matching rule wins.
+
+        Parameters:
+            rules (list): Output of parse_rules.
+
+        Returns:
+            tuple: int8 signal codes and a categorical of trade types ('hold' when no rule matches).
+        """
+        conditions = [self._mask(tree) for tree, *_ in rules]
+        codes = [code for _, code, _, _ in rules]
+        labels = [trade_type for *_, trade_type, _ in rules]
+        categories = TRADE_TYPE_CATEGORIES + [label for label in dict.fromkeys(labels) if label not in TRADE_TYPE_CATEGORIES]
+        signals = np.select(conditions, codes, default=0).astype(np.int8)
+        trade_types = pd.Categorical.from_codes(
+            np.select(conditions, [categories.index(label) for label in labels], default=0), categories=categories
+        )
+        return signals, trade_types
+
+def evaluate_rule_sets(data, rule_sets):
+    """
+    Evaluate several rule sets against the same features in one batch.
+
+    Parameters:
+        data (pd.DataFrame): Features.
+        rule_sets (dict): Name -> rule text or output of parse_rules.
+
+    Returns:
+        dict: Name -> (signals, trade types), see RuleEvaluator.signals.
+    """
+    evaluator = RuleEvaluator(data)
+    return {
+        name: evaluator.signals(parse_rules(rules) if isinstance(rules, str) else rules)
+        for name, rules in rule_sets.items()
+    }
+
+def apply_rules(data, rules=DEFAULT_RULES):
+    """
+    Add 'signals' and 'trade_type' columns from a rule set, like strat.compute_signals.
+
+    Parameters:
+        data (pd.DataFrame): Features.
+        rules (str or list): Rule text or output of parse_rules.
+
+    Returns:
+        pd.DataFrame: The same DataFrame with 'signals' and 'trade_type' added.
+    """
+    data['signals'], data['trade_type'] = evaluate_rule_sets(data, {"rules": rules})["rules"]
+    return data
+
+if __name__ == "__main__":
+    import os
+    import argparse
+    from loader import read_csv_cached
+    from local_backtest import annual_bar_count, evaluate
+
+    parser = argparse.ArgumentParser(description="Backtest rule sets against one engineered file.")
+    parser.add_argument("--file", default="engineered_data/BTC_2019_2023_15m.csv", help="engineered CSV file")
+    parser.add_argument("rules", nargs="*", help="rule files, one rule set each (default: the strat.py rules)")
+    parser.add_argument("--leverage", type=float, default=1)
+    parser.add_argument("--fee", type=float, default=0.001)
+    parser.add_argument("--slippage", type=float, default=0.0)
+    args = parser.parse_args()
+
+    rule_sets = {"default": DEFAULT_RULES}
+    for path in args.rules:
+        with open(path) as f:
+            rule_sets[os.path.basename(path)] = f.read()
+
+    data = read_csv_cached(args.file)
+    close = data["close"].to_numpy(dtype="float64")
+    bars_per_year = annual_bar_count(pd.to_datetime(data["datetime"]).to_numpy())
+    rows = []
+    for name, (signals, _) in evaluate_rule_sets(data, rule_sets).items():
+        metrics = evaluate(close, signals, args.leverage, args.fee, args.slippage, bars_per_year)
+        rows.append({"rules": name, "signals": int((signals != 0).sum()), **metrics})
+    print(pd.DataFrame(rows).to_string(index=False))
@@ -0,0 +1,204 @@
+import os
+import numpy as np
+import pandas as pd
+
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+TRADE_TYPE_CATEGORIES = ["hold", "long_open", "short_open", "long_reversal", "short_reversal"]
+
+# float32 has a 24-bit significand, so below 2**23 neighbouring values are
+# at most half a unit of the last decimal apart: a column with d decimals can
+# fit when every |value| * 10**d stays below it.
+FLOAT32_EXACT_LIMIT = 2 ** 23
+MAX_DECIMALS = 8
+
+DATE_FORMAT = "%Y-%m-%d"
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+def float32_decimals(values):
+    """
+    Find whether a float64 column survives a float32 round trip.
+
+    A column qualifies when all its values have at most d decimals,
+    |value| * 10**d < 2**23, and widen restores every value exactly from
+    its float32 copy.
+
+    Parameters:
+        values (np.ndarray): float64 values (NaNs are ignored).
+
+    Returns:
+        int: The number of decimals d, or None if float32 would lose information.
+    """
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return None
+    largest = np.abs(values).max()
+    for decimals in range(MAX_DECIMALS + 1):
+        if largest * 10 ** decimals >= FLOAT32_EXACT_LIMIT:
+            return None
+        if np.array_equal(np.round(values, decimals), values):
+            # the bound is necessary but widen picks the fewest decimals that fit, so check the round trip
+            if np.array_equal(widen(values.astype(np.float32)), values):
+                return decimals
+            return None
+    return None
+
+def widen(values):
+    """
+    Return float64 values, restoring the exact decimals of a compacted float32 column.
+
+    Parameters:
+        values (np.ndarray or pd.Series): Column of any float dtype.
+
+    Returns:
+        np.ndarray or pd.Series: float64 values of the same kind as the input.
+    """
+    if isinstance(values, pd.Series):
+        return pd.Series(widen(values.to_numpy()), index=values.index, name=values.name)
+    if values.dtype != np.float32:
+        return values.astype("float64", copy=False)
+    wide = values.astype("float64")
+    finite = ~np.isnan(wide)
+    for decimals in range(MAX_DECIMALS + 1):
+        candidate = np.round(wide, decimals)
+        if np.array_equal(candidate[finite].astype(np.float32), values[finite]):
+            return candidate
+    return wide
+
+def datetime_format(text):
+    """
+    Format of the datetime text of a CSV column, so it can be written back unchanged.
+
+    pandas writes a datetime column whose times are all midnight as bare
+    dates, which would turn '2019-09-08 00:00:00' into '2019-09-08'.
+
+    Parameters:
+        text (pd.Series): Datetime strings as read from the file.
+
+    Returns:
+        str: DATE_FORMAT for bare dates, otherwise DATETIME_FORMAT.
+    """
+    first = text.dropna().head(1)
+    if len(first) and len(str(first.iloc[0]).strip()) == len("2019-09-08"):
+        return DATE_FORMAT
+    return DATETIME_FORMAT
+
+def is_ohlcv_column(column):
+    """
+    True for OHLCV columns and their lags, e.g. 'close' or 'close_lag_2'.
+    """
+    return column.split("_lag_")[0] in OHLCV_COLUMNS
+
+def compact_frame(df, datetime_index=True):
+    """
+    Apply the compact loading schema to a raw, engineered or signals frame.
+
+    - 'datetime' is parsed to datetime64[ns] (and becomes the index if asked);
+      the format of its text is kept in df.attrs['datetime_format'] for to_csv
+    - OHLCV columns and their lags become float32 where float32_decimals allows
+    - 'signals' becomes int8 and 'trade_type' a categorical
+    Indicator columns stay float64: they are not short decimals, and the
+    strategy thresholds are compared against them.
+
+    Parameters:
+        df (pd.DataFrame): Frame as read from one of the CSV files.
+        datetime_index (bool): Move 'datetime' to the index.
+
+    Returns:
+        pd.DataFrame: The compacted frame (the input is not modified).
+    """
+    df = df.copy()
+    if "datetime" in df.columns:
+        if df["datetime"].dtype == object:
+            df.attrs["datetime_format"] = datetime_format(df["datetime"])
+        df["datetime"] = pd.to_datetime(df["datetime"])
+        if datetime_index:
+            df = df.set_index("datetime")
+
+    bases = {}
+    for column in df.columns:
+        if not is_ohlcv_column(column) or df[column].dtype != np.float64:
+            continue
+        base = column.split("_lag_")[0]
+        # lags share the decision of their source column
+        if base not in bases:
+            bases[base] = float32_decimals(df[base].to_numpy()) if base in df.columns else None
+        if bases[base] is not None:
+            df[column] = df[column].astype(np.float32)
+
+    if "signals" in df.columns:
+        df["signals"] = df["signals"].astype(np.int8)
+    if "trade_type" in df.columns:
+        df["trade_type"] = pd.Categorical(df["trade_type"], categories=TRADE_TYPE_CATEGORIES)
+    return df
+
+def to_csv(df, output_path, date_format=None):
+    """
+    Save a frame with the layout of the original CSV files.
+
+    A datetime index is written back as the leading 'datetime' column and
+    float32 columns are widened first, so the text matches the float64 output.
+    Datetimes are written in the format compact_frame found in the source.
+
+    Parameters:
+        df (pd.DataFrame): Frame to save.
+        output_path (str or file): Destination CSV path or buffer.
+        date_format (str): strftime format of the datetimes; defaults to
+            df.attrs['datetime_format'], then to pandas' own choice.
+    """
+    wide = df.copy(deep=False)
+    for column in wide.columns:
+        if wide[column].dtype == np.float32:
+            wide[column] = widen(wide[column].to_numpy())
+    wide.to_csv(output_path, index=isinstance(wide.index, pd.DatetimeIndex),
+                date_format=date_format or df.attrs.get("datetime_format"))
+
+def frame_memory(df):
+    """
+    Bytes used by a frame, including its index and the contents of object columns.
+    """
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+def memory_report(file_paths, compacted=None):
+    """
+    Compare the memory of each file loaded with default dtypes and with the compact schema.
+
+    Parameters:
+        file_paths (list): CSV files (raw, engineered or signals).
+        compacted (callable): Schema to apply; defaults to compact_frame.
+
+    Returns:
+        pd.DataFrame: Default and compact sizes in MiB and the saving per file.
+    """
+    from loader import read_csv_cached
+
+    compacted = compacted or compact_frame
+    rows = []
+    for file_path in file_paths:
+        df = read_csv_cached(file_path)
+        before = frame_memory(df)
+        after = frame_memory(compacted(df))
+        rows.append({
+            "file": os.path.basename(file_path),
+            "rows": len(df),
+            "default_mib": before / 2 ** 20,
+            "compact_mib": after / 2 ** 20,
+            "saved_pct": 100 * (1 - after / before) if before else 0.0,
+        })
+    return pd.DataFrame(rows)
+
+if __name__ == "__main__":
+    import argparse
+    from parallel import list_csv_files
+
+    parser = argparse.ArgumentParser(description="Show the memory saved by the compact dtype schema.")
+    parser.add_argument("folders", nargs="*", default=["data", "engineered_data"], help="folders of CSV files")
+    args = parser.parse_args()
+
+    for folder in args.folders:
+        if not os.path.isdir(folder):
+            continue
+        report = memory_report(list_csv_files(folder))
+        print(f"\n{folder}:")
+        print(report.to_string(index=False, float_format=lambda value: f"{value:.1f}"))
+        total_before, total_after = report["default_mib"].sum(), report["compact_mib"].sum()
+        print(f"total: {total_before:.1f} MiB -> {total_after:.1f} MiB ({100 * (1 - total_after / total_before):.1f}% saved)")
@@ -1,30 +1,88 @@
+import os
+import numpy as np
 import pandas as pd
-import plotly.graph_objects as go
+from loader import read_csv_cached
+from schema import TRADE_TYPE_CATEGORIES, compact_frame, to_csv
+from downsample import DEFAULT_BUCKETS, minmax_indices
+from instrument import instrumented, stage
 
-def generate_signals(input_csv_path, output_csv_path):
-    data = pd.read_csv(input_csv_path)
+SIGNAL_CODES = [1, -1, 2, -2]
+TRADE_TYPES = ['long_open', 'short_open', 'long_reversal', 'short_reversal']
+
+def signal_conditions(rsi, macd_diff, rsi_low=30, rsi_high=70):
+    """
+    Boolean masks of the four strategy rules, in priority order.
+
+    Parameters:
+        rsi (np.ndarray): RSI values.
+        macd_diff (np.ndarray): MACD histogram values.
+        rsi_low (float): RSI level below which a bullish cross opens a long.
+        rsi_high (float): RSI level above which a bearish cross opens a short.
 
-    data['signals'] = 0
-    data['trade_type'] = 'hold'
+    Returns:
+        list: Masks for the codes in SIGNAL_CODES.
+    """
+    prev_macd_diff = np.empty(len(macd_diff))
+    prev_macd_diff[:1] = np.nan
+    prev_macd_diff[1:] = macd_diff[:-1]
+
+    crosses_above = (macd_diff > 0) & (prev_macd_diff <= 0)
+    crosses_below = (macd_diff < 0) & (prev_macd_diff >= 0)
 
     # Strategy Logic:
     # Buy signal: RSI < 30 and MACD crosses above signal
     # Sell signal: RSI > 70 and MACD crosses below signal
-    for i in range(1, len(data)):
-        if data.loc[i, 'rsi_14'] < 30 and data.loc[i, 'macd_diff'] > 0 and data.loc[i - 1, 'macd_diff'] <= 0:
-            data.loc[i, 'signals'] = 1
-            data.loc[i, 'trade_type'] = 'long_open'
-        elif data.loc[i, 'rsi_14'] > 70 and data.loc[i, 'macd_diff'] < 0 and data.loc[i - 1, 'macd_diff'] >= 0:
-            data.loc[i, 'signals'] = -1
-            data.loc[i, 'trade_type'] = 'short_open'
-        elif data.loc[i, 'macd_diff'] > 0 and data.loc[i - 1, 'macd_diff'] <= 0:
-            data.loc[i, 'signals'] = 2
-            data.loc[i, 'trade_type'] = 'long_reversal'
-        elif data.loc[i, 'macd_diff'] < 0 and data.loc[i - 1, 'macd_diff'] >= 0:
-            data.loc[i, 'signals'] = -2
-            data.loc[i, 'trade_type'] = 'short_reversal'
-
-    data.to_csv(output_csv_path, index=False)
+    return [
+        (rsi < rsi_low) & crosses_above,
+        (rsi > rsi_high) & crosses_below,
+        crosses_above,
+        crosses_below,
+    ]
+
+def signal_array(rsi, macd_diff, rsi_low=30, rsi_high=70):
+    """
+    Signal codes (1, -1, 2, -2 or 0) for arrays of RSI and MACD histogram values.
+    """
+    return np.select(signal_conditions(rsi, macd_diff, rsi_low, rsi_high), SIGNAL_CODES, default=0)
+
+@instrumented()
+def compute_signals(data, rsi_low=30, rsi_high=70):
+    """
+    Add 'signals' and 'trade_type' columns to a DataFrame of engineered features.
+
+    The rules are evaluated on whole columns at once; earlier rules take
+    priority over later ones, like the if/elif chain they replace.
+
+    Parameters:
+        data (pd.DataFrame): DataFrame with 'rsi_14' and 'macd_diff' columns.
+        rsi_low (float): RSI level below which a bullish cross opens a long.
+        rsi_high (float): RSI level above which a bearish cross opens a short.
+
+    Returns:
+        pd.DataFrame: The same DataFrame with 'signals' and 'trade_type' added.
+    """
+    conditions = signal_conditions(
+        data['rsi_14'].to_numpy(dtype="float64"), data['macd_diff'].to_numpy(dtype="float64"), rsi_low, rsi_high
+    )
+    data['signals'] = np.select(conditions, SIGNAL_CODES, default=0).astype(np.int8)
+    data['trade_type'] = pd.Categorical.from_codes(
+        np.select(conditions, np.arange(1, len(TRADE_TYPES) + 1), default=0), categories=TRADE_TYPE_CATEGORIES
+    )
+    return data
+
+@instrumented(rows=None)
+def generate_signals(input_csv_path, output_csv_path, rsi_low=30, rsi_high=70):
+    # a DataFrame, e.g. from a DatasetCatalog, can be passed instead of a path
+    with stage("read_csv") as record:
+        if isinstance(input_csv_path, pd.DataFrame):
+            data = input_csv_path.copy()
+        else:
+            data = read_csv_cached(input_csv_path)
+        record["rows"] = len(data)
+    data = compute_signals(compact_frame(data, datetime_index=False), rsi_low, rsi_high)
+
+    with stage("to_csv", rows=len(data)):
+        to_csv(data, output_csv_path)
 
     # local stats about signals
     total_data_points = len(data)
@@ -34,38 +92,82 @@ def generate_signals(input_csv_path, output_csv_path):
     for signal, count in signal_counts.items():
         print(f"  Signal {signal}: {count}")
 
-def plot_signals(input_csv_path):
+def generate_signals_from_store(raw_csv_path, output_csv_path, store=None):
+    """
+    Generate signals from the few feature columns the strategy needs.
+
+    The columns come from a feature_store.FeatureStore, which computes them
+    once per version of the raw file; the engineered CSV is not read.
+
+    Parameters:
+        raw_csv_path (str): Raw OHLCV CSV file.
+        output_csv_path (str): Where to save the signals.
+        store (FeatureStore): Store to use; a default store is created if None.
+    """
+    from feature_store import FeatureStore
+
+    store = store or FeatureStore()
+    generate_signals(store.get(raw_csv_path, ['datetime', 'close', 'rsi_14', 'macd_diff']), output_csv_path)
+
+@instrumented(rows=None)
+def plot_signals(input_csv_path, max_points=DEFAULT_BUCKETS, webgl=True,
+                 output_html_path=None,
+                 show=True):
+    """
+    Plot the close price with every trading signal as an interactive HTML chart.
+
+    The price line is reduced to the extremes of max_points buckets, so the
+    page size and render time stay about the same for any number of rows;
+    signal markers are all drawn. WebGL traces keep panning responsive when
+    there are many markers.
+
+    Parameters:
+        input_csv_path (str): CSV written by generate_signals.
+        max_points (int): Number of min/max buckets of the price line.
+        webgl (bool): Use Scattergl traces instead of SVG Scatter traces.
+        output_html_path (str): Where the HTML chart is saved; next to the
+            input as signals_plot_<name>.html by default.
+        show (bool): Also open the chart.
+    """
+    if output_html_path is None:
+        folder, file_name = os.path.split(input_csv_path)
+        output_html_path = os.path.join(folder, f"signals_plot_{os.path.splitext(file_name)[0]}.html")
+    import plotly.graph_objects as go
+
     data = pd.read_csv(input_csv_path)
+    scatter = go.Scattergl if webgl else go.Scatter
 
     fig = go.Figure()
 
-    fig.add_trace(go.Scatter(
-        x=data['datetime'], y=data['close'], mode='lines', name='Close Price', line=dict(color='blue', width=1),
+    close = data['close'].to_numpy()
+    rows = minmax_indices(close, max_points)
+    fig.add_trace(scatter(
+        x=data['datetime'].to_numpy()[rows], y=close[rows], mode='lines', name='Close Price', line=dict(color='blue', width=1),
     ))
 
     buy_signals = data[data['signals'] == 1]
-    fig.add_trace(go.Scatter(
+    fig.add_trace(scatter(
         x=buy_signals['datetime'], y=buy_signals['close'],
         mode='markers', name='Buy Signal',
         marker=dict(color='green', symbol='triangle-up', size=10),
     ))
 
     sell_signals = data[data['signals'] == -1]
-    fig.add_trace(go.Scatter(
+    fig.add_trace(scatter(
         x=sell_signals['datetime'], y=sell_signals['close'],
         mode='markers', name='Sell Signal',
         marker=dict(color='red', symbol='triangle-down', size=10),
     ))
 
     long_reversals = data[data['signals'] == 2]
-    fig.add_trace(go.Scatter(
+    fig.add_trace(scatter(
         x=long_reversals['datetime'], y=long_reversals['close'],
         mode='markers', name='Long Reversal',
         marker=dict(color='orange', symbol='circle', size=10),
     ))
 
     short_reversals = data[data['signals'] == -2]
-    fig.add_trace(go.Scatter(
+    fig.add_trace(scatter(
         x=short_reversals['datetime'], y=short_reversals['close'],
         mode='markers', name='Short Reversal',
         marker=dict(color='purple', symbol='x', size=10),
@@ -81,15 +183,29 @@ def plot_signals(input_csv_path):
     )
 
     # saving plot as html
-    fig.write_html('/Users/shivanshgupta/Desktop/zelta hack/random_outputs/signals_plot_BTC_2019_2023_15m.html')
-    fig.show()
+    fig.write_html(output_html_path)
+    if show:
+        fig.show()
 
 if __name__ == "__main__":
-    input_csv_path = "/Users/shivanshgupta/Desktop/zelta hack/engineered_data/BTC_2019_2023_15m.csv"
-    output_csv_path = "/Users/shivanshgupta/Desktop/zelta hack/random_outputs/signals_BTC_2019_2023_15m.csv"
-    
+    import argparse
+    from pipeline import load_config
+
+    parser = argparse.ArgumentParser(description="Generate and plot the signals of one engineered file.")
+    parser.add_argument("--file", default="BTC_2019_2023_15m.csv", help="engineered CSV name")
+    parser.add_argument("--config", default=None, help="pipeline JSON configuration (folders and RSI bounds)")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    input_csv_path = os.path.join(config["engineered"], args.file)
+    # signals go where the pipeline writes them, the chart into the plots folder
+    output_csv_path = os.path.join(config["signals"], args.file)
+    output_html_path = os.path.join(config["plots"], f"signals_plot_{os.path.splitext(args.file)[0]}.html")
+    os.makedirs(config["signals"], exist_ok=True)
+    os.makedirs(config["plots"], exist_ok=True)
+
     # Generate the signals and save to CSV
-    generate_signals(input_csv_path, output_csv_path)
-    
+    generate_signals(input_csv_path, output_csv_path, config["rsi_low"], config["rsi_high"])
+
     # Plot the signals
-    plot_signals(output_csv_path)
+    plot_signals(output_csv_path, output_html_path=output_html_path)
@@ -1,28 +1,12 @@
+import os
 import pandas as pd
-import plotly.graph_objects as go
+from downsample import DEFAULT_BUCKETS, minmax_indices
+# the rules live in strat.py, so both scripts trade the same signals
+from strat import compute_signals
 
 def generate_signals(input_csv_path, output_csv_path):
     data = pd.read_csv(input_csv_path)
-
-    data['signals'] = 0
-    data['trade_type'] = 'hold'
-
-    # Strategy Logic:
-    # Buy signal: RSI < 30 and MACD crosses above signal
-    # Sell signal: RSI > 70 and MACD crosses below signal
-    for i in range(1, len(data)):
-        if data.loc[i, 'rsi_14'] < 30 and data.loc[i, 'macd_diff'] > 0 and data.loc[i - 1, 'macd_diff'] <= 0:
-            data.loc[i, 'signals'] = 1
-            data.loc[i, 'trade_type'] = 'long_open'
-        elif data.loc[i, 'rsi_14'] > 70 and data.loc[i, 'macd_diff'] < 0 and data.loc[i - 1, 'macd_diff'] >= 0:
-            data.loc[i, 'signals'] = -1
-            data.loc[i, 'trade_type'] = 'short_open'
-        elif data.loc[i, 'macd_diff'] > 0 and data.loc[i - 1, 'macd_diff'] <= 0:
-            data.loc[i, 'signals'] = 2
-            data.loc[i, 'trade_type'] = 'long_reversal'
-        elif data.loc[i, 'macd_diff'] < 0 and data.loc[i - 1, 'macd_diff'] >= 0:
-            data.loc[i, 'signals'] = -2
-            data.loc[i, 'trade_type'] = 'short_reversal'
+    data = compute_signals(data)
 
     data.to_csv(output_csv_path, index=False)
 
@@ -34,38 +18,61 @@ def generate_signals(input_csv_path, output_csv_path):
     for signal, count in signal_counts.items():
         print(f"  Signal {signal}: {count}")
 
-def plot_signals(input_csv_path):
+def plot_signals(input_csv_path, max_points=DEFAULT_BUCKETS, webgl=True, output_html_path=None):
+    """
+    Plot the close price with every trading signal as an interactive HTML chart.
+
+    The price line is reduced to the extremes of max_points buckets, so the
+    page size and render time stay about the same for any number of rows;
+    signal markers are all drawn. WebGL traces keep panning responsive when
+    there are many markers.
+
+    Parameters:
+        input_csv_path (str): CSV written by generate_signals.
+        max_points (int): Number of min/max buckets of the price line.
+        webgl (bool): Use Scattergl traces instead of SVG Scatter traces.
+        output_html_path (str): Where the HTML chart is saved; next to the
+            input as signals_plot_<name>.html by default.
+    """
+    if output_html_path is None:
+        folder, file_name = os.path.split(input_csv_path)
+        output_html_path = os.path.join(folder, f"signals_plot_{os.path.splitext(file_name)[0]}.html")
+    import plotly.graph_objects as go
+
     data = pd.read_csv(input_csv_path)
+    scatter = go.Scattergl if webgl else go.Scatter
 
     fig = go.Figure()
 
-    fig.add_trace(go.Scatter(
-        x=data['datetime'], y=data['close'], mode='lines', name='Close Price', line=dict(color='blue', width=1),
+    close = data['close'].to_numpy()
+    rows = minmax_indices(close, max_points)
+    fig.add_trace(scatter(
+        x=data['datetime'].to_numpy()[rows], y=close[rows], mode='lines', name='Close Price', line=dict(color='blue', width=1),
     ))
 
     buy_signals = data[data['signals'] == 1]
-    fig.add_trace(go.Scatter(
+    fig.add_trace(scatter(
         x=buy_signals['datetime'], y=buy_signals['close'],
         mode='markers', name='Buy Signal',
         marker=dict(color='green', symbol='triangle-up', size=10),
     ))
 
     sell_signals = data[data['signals'] == -1]
-    fig.add_trace(go.Scatter(
+    fig.add_trace(scatter(
         x=sell_signals['datetime'], y=sell_signals['close'],
         mode='markers', name='Sell Signal',
         marker=dict(color='red', symbol='triangle-down', size=10),
     ))
 
     long_reversals = data[data['signals'] == 2]
-    fig.add_trace(go.Scatter(
+    fig.add_trace(scatter(
         x=long_reversals['datetime'], y=long_reversals['close'],
         mode='markers', name='Long Reversal',
         marker=dict(color='orange', symbol='circle', size=10),
     ))
 
     short_reversals = data[data['signals'] == -2]
-    fig.add_trace(go.Scatter(
+    fig.add_trace(scatter(
         x=short_reversals['datetime'], y=short_reversals['close'],
         mode='markers', name='Short Reversal',
         marker=dict(color='purple', symbol='x', size=10),
@@ -81,15 +88,28 @@ def plot_signals(input_csv_path):
     )
 
     # saving plot as html
-    fig.write_html('/Users/shivanshgupta/Desktop/zelta hack/random_outputs/signals_plot_BTC_2019_2023_15m.html')
+    fig.write_html(output_html_path)
     fig.show()
 
 if __name__ == "__main__":
-    input_csv_path = "/Users/shivanshgupta/Desktop/zelta hack/engineered_data/BTC_2019_2023_15m.csv"
-    output_csv_path = "/Users/shivanshgupta/Desktop/zelta hack/random_outputs/signals_BTC_2019_2023_15m.csv"
-    
+    import argparse
+    from pipeline import load_config
+
+    parser = argparse.ArgumentParser(description="Generate and plot the signals of one engineered file.")
+    parser.add_argument("--file", default="BTC_2019_2023_15m.csv", help="engineered CSV name")
+    parser.add_argument("--config", default=None, help="pipeline JSON configuration (folders)")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    input_csv_path = os.path.join(config["engineered"], args.file)
+    # signals go where the pipeline writes them, the chart into the plots folder
+    output_csv_path = os.path.join(config["signals"], args.file)
+    output_html_path = os.path.join(config["plots"], f"signals_plot_{os.path.splitext(args.file)[0]}.html")
+    os.makedirs(config["signals"], exist_ok=True)
+    os.makedirs(config["plots"], exist_ok=True)
+
     # Generate the signals and save to CSV
     generate_signals(input_csv_path, output_csv_path)
-    
+
     # Plot the signals
-    plot_signals(output_csv_path)
+    plot_signals(output_csv_path, output_html_path=output_html_path)
@@ -0,0 +1,38 @@
+import os
+import pandas as pd
+from incremental import IncrementalFeatureEngine
+
+OHLCV_DTYPES = {column: "float64" for column in ["open", "high", "low", "close", "volume"]}
+
+def stream_engineer_file(file_path, output_folder="engineered_data", lag=3, chunksize=100_000):
+    """
+    Engineer one raw CSV chunk by chunk, appending each chunk to the output as it is done.
+
+    Memory depends on chunksize, not on the length of the file. Between
+    chunks only the running state of an incremental.IncrementalFeatureEngine
+    is kept, so the rows are identical to the batch feature_eng output.
+
+    Parameters:
+        file_path (str): Path to the raw CSV file.
+        output_folder (str): Folder to write the engineered CSV into.
+        lag (int): Number of lagged features to generate.
+        chunksize (int): Raw rows read per chunk.
+
+    Returns:
+        tuple: Output path and the first five engineered rows, like feature_eng.engineer_file.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    output_path = os.path.join(output_folder, os.path.basename(file_path))
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    engine = IncrementalFeatureEngine(lag)
+    head = None
+    with open(tmp_path, "w", newline="") as output:
+        for chunk in pd.read_csv(file_path, chunksize=chunksize, dtype=OHLCV_DTYPES):
+            engineered = engine.update(chunk)
+            if len(engineered) == 0:
+                continue
+            engineered.to_csv(output, index=False, header=head is None)
+            if head is None:
+                head = engineered.head()
+    os.replace(tmp_path, output_path)
+    return output_path, head
@@ -0,0 +1,274 @@
+import os
+import json
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from loader import file_fingerprint, read_csv_cached
+from parallel import list_csv_files
+from instrument import pool_options
+from indicators import ewm_mean, macd_diff, rsi, span_to_com
+from local_backtest import annual_bar_count, evaluate
+from strat import signal_array
+from resample import timeframe_from_file_name
+
+RESULT_COLUMNS = [
+    "file", "rsi_low", "rsi_high", "macd_fast", "macd_slow", "macd_sign",
+    "total_return", "max_drawdown", "sharpe", "trades", "win_rate",
+]
+# A checkpointed result is reused only for the same grid point, costs and
+# version of the data file.
+KEY_COLUMNS = RESULT_COLUMNS[:6] + ["leverage", "fee", "slippage", "fingerprint"]
+
+def load_prices(file_path):
+    """
+    Load the close prices of one timeframe file, cleaned like feature_eng does.
+
+    Parameters:
+        file_path (str): Path to a raw OHLCV CSV file.
+
+    Returns:
+        tuple: (close, bars_per_year).
+    """
+    from ta.utils import dropna
+
+    df = dropna(read_csv_cached(file_path))
+    return df["close"].to_numpy(dtype="float64"), annual_bar_count(pd.to_datetime(df["datetime"]).to_numpy())
+
+def evaluate_file(file_path, variants, leverage=1, fee=0.001, slippage=0.0):
+    """
+    Score every grid point of one file.
+
+    The file is read once, its RSI and the EMA of every span used by the
+    MACD variants are computed once, and each MACD histogram once per
+    variant; only the signal masks and the backtest are repeated for each
+    threshold pair.
+
+    Parameters:
+        file_path (str): Path to a raw OHLCV CSV file.
+        variants (list): ((fast, slow, sign), rsi_pairs) per MACD variant,
+            with the (rsi_low, rsi_high) pairs to evaluate for it.
+        leverage, fee, slippage: Passed to local_backtest.evaluate.
+
+    Returns:
+        list: One result dictionary per grid point, keyed by RESULT_COLUMNS
+            plus the leverage, fee and slippage it was evaluated with.
+    """
+    close, bars_per_year = load_prices(file_path)
+    rsi_values = rsi(close)
+    spans = sorted({span for (fast, slow, _), _ in variants for span in (fast, slow)})
+    emas = {span: ewm_mean(close, span_to_com(span), min_periods=span) for span in spans}
+
+    results = []
+    for (fast, slow, sign), rsi_pairs in variants:
+        histogram = macd_diff(close, fast, slow, sign, ema_fast=emas[fast], ema_slow=emas[slow])
+        for rsi_low, rsi_high in rsi_pairs:
+            signals = signal_array(rsi_values, histogram, rsi_low, rsi_high)
+            metrics = evaluate(close, signals, leverage, fee, slippage, bars_per_year)
+            results.append({
+                "file": os.path.basename(file_path),
+                "rsi_low": rsi_low, "rsi_high": rsi_high,
+                "macd_fast": fast, "macd_slow": slow, "macd_sign": sign,
+                **metrics,
+                "leverage": leverage, "fee": fee, "slippage": slippage,
+            })
+    return results
+
+def result_key(result):
+    """
+    Identify a grid point in the checkpoint file, with its costs and data version.
+
+    Results saved before the costs and fingerprint were recorded get None
+    for them, so they never match and are evaluated again.
+    """
+    return tuple(result.get(column) for column in KEY_COLUMNS)
+
+def split_variants(variants, n_chunks):
+    """
+    Split one file's grid into up to n_chunks tasks of about the same size.
+
+    The (MACD variant, RSI pair) points are cut in order, so a variant's
+    pairs stay together except at a cut and each chunk recomputes at most
+    one MACD histogram more than the whole file would.
+
+    Parameters:
+        variants (list): ((fast, slow, sign), rsi_pairs) per MACD variant.
+        n_chunks (int): Number of tasks wanted.
+
+    Returns:
+        list: Variant lists in the same format, one per task.
+    """
+    points = [(windows, pair) for windows, pairs in variants for pair in pairs]
+    chunks = []
+    for part in np.array_split(np.arange(len(points)), min(n_chunks, len(points))):
+        chunk = []
+        for windows, pair in (points[i] for i in part):
+            if chunk and chunk[-1][0] == windows:
+                chunk[-1][1].append(pair)
+            else:
+                chunk.append((windows, [pair]))
+        chunks.append(chunk)
+    return chunks
+
+def read_checkpoint(checkpoint_path):
+    """
+    Read the results saved by an earlier (possibly interrupted) sweep.
+
+    Parameters:
+        checkpoint_path (str): JSON-lines checkpoint file.
+
+    Returns:
+        dict: Grid point key to result dictionary.
+    """
+    done = {}
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return done
+    with open(checkpoint_path) as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a line cut short by the interruption
+            done[result_key(result)] = result
+    return done
+
+def run_sweep(file_paths, rsi_lows, rsi_highs, macd_windows, workers=None, checkpoint_path=None,
+              leverage=1, fee=0.001, slippage=0.0):
+    """
+    Evaluate the strategy over a grid of RSI thresholds, MACD windows and timeframe files.
+
+    Run serially, each file is one task covering all its MACD variants and
+    RSI pairs, so its indicators are computed once. With a pool, each file's
+    grid is split into enough chunks to keep every worker busy, even for a
+    single file; the indicators are then shared within each chunk. Results
+    are appended to the checkpoint as tasks finish, and grid points already
+    in it for the same costs and data file version are not evaluated again.
+
+    Parameters:
+        file_paths (list): Raw OHLCV CSV files (one per timeframe).
+        rsi_lows, rsi_highs (list): RSI threshold values; pairs with low >= high are skipped.
+        macd_windows (list): (fast, slow, sign) MACD spans.
+        workers (int): Number of processes; None uses every core, 1 runs serially.
+        checkpoint_path (str): JSON-lines file to resume from and append to.
+        leverage, fee, slippage: Passed to local_backtest.evaluate.
+
+    Returns:
+        pd.DataFrame: One row per grid point, keyed by RESULT_COLUMNS.
+    """
+    rsi_pairs = [(low, high) for low, high in itertools.product(rsi_lows, rsi_highs) if low < high]
+    fingerprints = {file_path: file_fingerprint(file_path) for file_path in file_paths}
+    done = read_checkpoint(checkpoint_path)
+
+    def grid_key(file_path, low, high, windows):
+        return (os.path.basename(file_path), low, high, *windows, leverage, fee, slippage, fingerprints[file_path])
+
+    tasks = []
+    for file_path in file_paths:
+        variants = []
+        for windows in macd_windows:
+            pending = [(low, high) for low, high in rsi_pairs if grid_key(file_path, low, high, windows) not in done]
+            if pending:
+                variants.append((tuple(windows), pending))
+        if variants:
+            tasks.append((file_path, variants))
+    n_pending = sum(len(pairs) for _, variants in tasks for _, pairs in variants)
+    print(f"{len(done)} grid points loaded from checkpoint, {n_pending} to evaluate")
+
+    checkpoint = open(checkpoint_path, "a") if checkpoint_path else None
+    try:
+        def record(file_path, results):
+            for result in results:
+                result["fingerprint"] = fingerprints[file_path]
+                done[result_key(result)] = result
+                if checkpoint:
+                    checkpoint.write(json.dumps(result) + "\n")
+            if checkpoint:
+                checkpoint.flush()
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers > 1 and tasks:
+            chunks_per_file = -(-workers // len(tasks))
+            tasks = [(file_path, chunk) for file_path, variants in tasks
+                     for chunk in split_variants(variants, chunks_per_file)]
+        if workers <= 1 or len(tasks) <= 1:
+            for file_path, variants in tasks:
+                record(file_path, evaluate_file(file_path, variants, leverage, fee, slippage))
+        else:
+            # the largest files go first so the 1m file does not start last
+            tasks.sort(key=lambda task: os.path.getsize(task[0]), reverse=True)
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), **pool_options()) as pool:
+                futures = {
+                    pool.submit(evaluate_file, file_path, variants, leverage, fee, slippage): file_path
+                    for file_path, variants in tasks
+                }
+                for future in as_completed(futures):
+                    record(futures[future], future.result())
+    finally:
+        if checkpoint:
+            checkpoint.close()
+
+    wanted = {
+        grid_key(file_path, low, high, windows)
+        for file_path, windows in itertools.product(file_paths, macd_windows)
+        for low, high in rsi_pairs
+    }
+    return pd.DataFrame([done[key] for key in wanted if key in done], columns=RESULT_COLUMNS)
+
+def rank_results(results, metric="sharpe", ascending=False):
+    """
+    Sort sweep results by a metric and number the rows from 1.
+
+    Parameters:
+        results (pd.DataFrame): Output of run_sweep.
+        metric (str): Column to rank by.
+        ascending (bool): True when smaller is better (e.g. max_drawdown).
+
+    Returns:
+        pd.DataFrame: Ranked results with a 'rank' column.
+    """
+    ranked = results.sort_values([metric] + RESULT_COLUMNS[:6], ascending=[ascending] + [True] * 6)
+    ranked = ranked.reset_index(drop=True)
+    ranked.insert(0, "rank", np.arange(1, len(ranked) + 1))
+    return ranked
+
+def parse_values(text, cast=float):
+    """
+    Parse a comma-separated list like '20,25,30'.
+    """
+    return [cast(value) for value in text.split(",") if value.strip()]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep the RSI/MACD strategy over a parameter grid.")
+    parser.add_argument("--data", default="data", help="Folder with the raw timeframe CSV files.")
+    parser.add_argument("--timeframes", default="", help="Comma-separated timeframes, e.g. '15m,1h' (default: all files).")
+    parser.add_argument("--rsi-low", default="20,25,30,35", help="Comma-separated lower RSI thresholds.")
+    parser.add_argument("--rsi-high", default="65,70,75,80", help="Comma-separated upper RSI thresholds.")
+    parser.add_argument("--macd", nargs="+", default=["12,26,9"], help="MACD variants as fast,slow,sign.")
+    parser.add_argument("--leverage", type=float, default=1)
+    parser.add_argument("--fee", type=float, default=0.001)
+    parser.add_argument("--slippage", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=None, help="Number of processes (default: every core).")
+    parser.add_argument("--checkpoint", default="sweep_results/checkpoint.jsonl")
+    parser.add_argument("--output", default="sweep_results/ranked.csv")
+    parser.add_argument("--metric", default="sharpe", choices=RESULT_COLUMNS[6:])
+    args = parser.parse_args()
+
+    file_paths = list_csv_files(args.data)
+    if args.timeframes:
+        wanted_timeframes = set(parse_values(args.timeframes, str))
+        file_paths = [path for path in file_paths if timeframe_from_file_name(path) in wanted_timeframes]
+    macd_windows = [tuple(parse_values(variant, int)) for variant in args.macd]
+
+    for path in (args.checkpoint, args.output):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+    results = run_sweep(
+        file_paths, parse_values(args.rsi_low), parse_values(args.rsi_high), macd_windows,
+        args.workers, args.checkpoint, args.leverage, args.fee, args.slippage,
+    )
+    ranked = rank_results(results, args.metric, ascending=args.metric == "max_drawdown")
+    ranked.to_csv(args.output, index=False)
+    print(ranked.head(20).to_string(index=False))
+    print(f"Ranked results saved to {args.output}")
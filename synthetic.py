@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+MINUTES_PER_YEAR = 365.25 * 24 * 60
+
+def synthetic_ohlcv(n_rows, seed=0, start="2019-09-08 17:45:00", start_price=10000.0, annual_volatility=0.8,
+                    zero_volume_rate=0.002):
+    """
+    Generate BTC-like 1m OHLCV bars.
+
+    Closes follow a log random walk with fat-tailed (Student t, 5 degrees of
+    freedom) shocks and clustered volatility: the per-bar volatility is a
+    slowly mean-reverting log process, so calm and hectic periods alternate
+    as in the real series. Open is the previous close; high and low extend
+    beyond open/close by a fraction of the bar volatility. Volume is
+    lognormal, larger on large moves and during the busy hours of the day. A
+    few bars are flat with zero volume, as in the shipped files. Prices have
+    2 decimals and volumes 3, like the exported CSVs.
+
+    Parameters:
+        n_rows (int): Number of 1m bars.
+        seed (int or list): Random seed; the same seed gives the same bars.
+        start (str): Timestamp of the first bar.
+        start_price (float): First open.
+        annual_volatility (float): Long-run annualised volatility of the closes.
+        zero_volume_rate (float): Fraction of flat, zero-volume bars.
+
+    Returns:
+        pd.DataFrame: 'datetime' (str) and OHLCV columns.
+    """
+    rng = np.random.default_rng(seed)
+    base_sigma = annual_volatility / np.sqrt(MINUTES_PER_YEAR)
+
+    # log-volatility: AR(1) with a half-life of about a day and a stationary deviation of 0.6
+    persistence = 0.5 ** (1 / 1440)
+    shocks = rng.standard_normal(n_rows) * 0.6 * np.sqrt(1 - persistence ** 2)
+    shocks[:1] *= (1 - persistence) / np.sqrt(1 - persistence ** 2)
+    log_vol = pd.Series(shocks).ewm(alpha=1 - persistence, adjust=False).mean().to_numpy() / (1 - persistence)
+    # exp(-0.18) undoes the mean of exp() of a normal with deviation 0.6
+    sigma = base_sigma * np.exp(log_vol - 0.18)
+
+    # Student t shocks scaled to unit variance; flat bars do not move
+    flat = rng.random(n_rows) < zero_volume_rate
+    returns = sigma * rng.standard_t(5, n_rows) * np.sqrt(3 / 5)
+    returns[flat] = 0.0
+    close = np.round(start_price * np.exp(np.cumsum(returns)), 2)
+    open_ = np.r_[round(start_price, 2), close[:-1]]
+    spread = np.where(flat, 0.0, sigma * 0.5)
+    high = np.round(np.maximum(open_, close) * (1 + np.abs(rng.standard_normal(n_rows)) * spread), 2)
+    low = np.round(np.minimum(open_, close) * (1 - np.abs(rng.standard_normal(n_rows)) * spread), 2)
+
+    minutes = pd.date_range(start, periods=n_rows, freq="1min")
+    # busier during European and US hours
+    hourly = 1 + 0.5 * np.sin((minutes.hour.to_numpy() - 9) / 24 * 2 * np.pi)
+    volume = np.round(hourly * np.exp(rng.normal(2.0, 0.8, n_rows)) * (1 + np.abs(returns) / sigma), 3)
+    volume[flat] = 0.0
+
+    return pd.DataFrame({
+        "datetime": minutes.strftime("%Y-%m-%d %H:%M:%S"),
+        "open": open_,
+        "high": high,
+        "low": low,
+        "close": close,
+        "volume": volume,
+    })
+
+def write_synthetic(output_path, n_rows, seed=0, chunk_rows=1_000_000):
+    """
+    Write synthetic 1m bars to a CSV in the layout of the raw data files.
+
+    Large series are generated and written in chunks (continuing the price
+    and the timestamps), so 10M rows do not have to fit in memory at once.
+
+    Parameters:
+        output_path (str): Destination CSV path.
+        n_rows (int): Number of 1m bars.
+        seed (int): Random seed.
+        chunk_rows (int): Bars generated per chunk.
+
+    Returns:
+        str: output_path.
+    """
+    start, price = pd.Timestamp("2019-09-08 17:45:00"), 10000.0
+    with open(output_path, "w", newline="") as f:
+        for i, first in enumerate(range(0, n_rows, chunk_rows)):
+            size = min(chunk_rows, n_rows - first)
+            chunk = synthetic_ohlcv(size, seed=[seed, i], start=str(start), start_price=price)
+            chunk.to_csv(f, index=False, header=first == 0)
+            start += pd.Timedelta(minutes=size)
+            price = float(chunk["close"].iloc[-1])
+    return output_path
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write synthetic BTC-like 1m OHLCV bars.")
+    parser.add_argument("rows", type=int, help="number of 1m bars")
+    parser.add_argument("--output", default=None, help="CSV path (default: synthetic_<rows>_1m.csv)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    output_path = args.output or f"synthetic_{args.rows}_1m.csv"
+    write_synthetic(output_path, args.rows, args.seed)
+    print(f"Wrote {args.rows} bars to {output_path}")
@@ -0,0 +1,237 @@
+import os
+import argparse
+import itertools
+import numpy as np
+import pandas as pd
+from loader import read_csv_cached
+from indicators import ewm_mean, macd_diff, rsi, span_to_com
+from local_backtest import annual_bar_count, max_drawdown, positions_from_signals, strategy_returns
+from strat import signal_array
+from sweep import parse_values
+
+METRICS = ["sharpe", "total_return"]
+
+def walk_forward_folds(n_bars, train_size, test_size, step=None, anchored=False):
+    """
+    Split n_bars into consecutive train/test windows.
+
+    Parameters:
+        n_bars (int): Length of the series.
+        train_size (int): Bars in each train window (the first one when anchored).
+        test_size (int): Bars in each test window.
+        step (int): Bars between fold starts; defaults to test_size so the
+            test windows tile the series without overlap.
+        anchored (bool): If True every train window starts at bar 0 and grows;
+            otherwise it rolls forward with a fixed length.
+
+    Returns:
+        np.ndarray: (n_folds, 3) array of train_start, test_start, test_end.
+    """
+    step = step or test_size
+    test_starts = np.arange(train_size, n_bars - test_size + 1, step)
+    train_starts = np.zeros_like(test_starts) if anchored else test_starts - train_size
+    return np.column_stack([train_starts, test_starts, test_starts + test_size])
+
+def load_series(file_path):
+    """
+    Load the close prices and timestamps of a timeframe file, cleaned like feature_eng does.
+
+    Parameters:
+        file_path (str): Path to a raw OHLCV CSV file.
+
+    Returns:
+        tuple: (close, datetimes) arrays.
+    """
+    from ta.utils import dropna
+
+    df = dropna(read_csv_cached(file_path))
+    return df["close"].to_numpy(dtype="float64"), pd.to_datetime(df["datetime"]).to_numpy()
+
+def grid_signals(close, rsi_pairs, macd_windows):
+    """
+    Compute the signals of every grid point over the full history.
+
+    All indicators are causal, so a value computed over the full history
+    equals the value a window would see with unlimited warm-up. Computing
+    them once and slicing replaces a warm-up recomputation per fold. RSI is
+    computed once and each EMA span once, whatever the grid size.
+
+    Parameters:
+        close (np.ndarray): Close prices.
+        rsi_pairs (list): (rsi_low, rsi_high) threshold pairs.
+        macd_windows (list): (fast, slow, sign) MACD spans.
+
+    Returns:
+        tuple: (params, signals) where params lists the grid points and
+            signals is an int8 array with one row per grid point.
+    """
+    rsi_values = rsi(close)
+    spans = sorted({span for fast, slow, _ in macd_windows for span in (fast, slow)})
+    emas = {span: ewm_mean(close, span_to_com(span), min_periods=span) for span in spans}
+
+    params = []
+    signals = np.empty((len(rsi_pairs) * len(macd_windows), len(close)), dtype=np.int8)
+    for fast, slow, sign in macd_windows:
+        histogram = macd_diff(close, fast, slow, sign, ema_fast=emas[fast], ema_slow=emas[slow])
+        for rsi_low, rsi_high in rsi_pairs:
+            signals[len(params)] = signal_array(rsi_values, histogram, rsi_low, rsi_high)
+            params.append({"rsi_low": rsi_low, "rsi_high": rsi_high,
+                           "macd_fast": fast, "macd_slow": slow, "macd_sign": sign})
+    return params, signals
+
+def train_scores(close, signals, folds, metric="sharpe", leverage=1, fee=0.001, slippage=0.0):
+    """
+    Score every grid point on every train window.
+
+    Each grid point is backtested once over the full history, i.e. as if the
+    strategy had been running continuously, and the per-bar returns are
+    turned into prefix sums. The score of any window is then a difference
+    of two prefix sums, so the cost per fold does not depend on the window
+    length.
+
+    Parameters:
+        close (np.ndarray): Close prices.
+        signals (np.ndarray): Output of grid_signals, one row per grid point.
+        folds (np.ndarray): Output of walk_forward_folds.
+        metric (str): 'sharpe' (per bar, not annualised) or 'total_return'.
+        leverage, fee, slippage: As in local_backtest.strategy_returns.
+
+    Returns:
+        np.ndarray: (n_grid, n_folds) scores, NaN where undefined.
+    """
+    starts, ends = folds[:, 0], folds[:, 1]
+    lengths = (ends - starts).astype("float64")
+    scores = np.empty((len(signals), len(folds)))
+    prefix = np.zeros(len(close) + 1)
+    for row, grid_signals_row in enumerate(signals):
+        positions = positions_from_signals(grid_signals_row)
+        gross, entry_costs, exit_costs = strategy_returns(close, positions, leverage, fee, slippage)
+        net = gross - entry_costs - exit_costs
+        if metric == "total_return":
+            np.cumsum(np.log(np.maximum(1 + net, 1e-300)), out=prefix[1:])
+            scores[row] = np.expm1(prefix[ends] - prefix[starts])
+            continue
+        np.cumsum(net, out=prefix[1:])
+        means = (prefix[ends] - prefix[starts]) / lengths
+        np.cumsum(net * net, out=prefix[1:])
+        squares = prefix[ends] - prefix[starts]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            variances = (squares - lengths * means ** 2) / (lengths - 1)
+            scores[row] = np.where(variances > 1e-18, means / np.sqrt(np.maximum(variances, 0.0)), np.nan)
+    return scores
+
+def test_returns(close, signals, leverage=1, fee=0.001, slippage=0.0):
+    """
+    Per-bar net returns of trading one test window from a flat position.
+
+    Any position still open on the last bar is closed there, so each fold
+    pays its own exit costs and no position leaks into the next fold.
+
+    Parameters:
+        close (np.ndarray): Close prices of the window (a view).
+        signals (np.ndarray): Signals of the window (a view).
+        leverage, fee, slippage: As in local_backtest.strategy_returns.
+
+    Returns:
+        np.ndarray: Net return of each bar in the window.
+    """
+    positions = positions_from_signals(signals)
+    positions[-1] = 0
+    gross, entry_costs, exit_costs = strategy_returns(close, positions, leverage, fee, slippage)
+    return gross - entry_costs - exit_costs
+
+def walk_forward(close, datetimes, rsi_pairs, macd_windows, train_size, test_size, step=None,
+                 anchored=False, metric="sharpe", leverage=1, fee=0.001, slippage=0.0):
+    """
+    Run a walk-forward optimization: choose parameters on each train window
+    and trade them on the test window that follows.
+
+    Parameters:
+        close (np.ndarray): Close prices.
+        datetimes (np.ndarray): Timestamps of the bars.
+        rsi_pairs (list): (rsi_low, rsi_high) threshold pairs.
+        macd_windows (list): (fast, slow, sign) MACD spans.
+        train_size, test_size, step, anchored: As in walk_forward_folds.
+        metric (str): Train score used to choose the parameters, see METRICS.
+        leverage, fee, slippage: As in local_backtest.strategy_returns.
+
+    Returns:
+        tuple: (folds, equity) where folds is a DataFrame with the chosen
+            parameters and train/test scores of every fold, and equity is the
+            stitched out-of-sample equity curve (starting at 1) indexed by datetime.
+    """
+    folds = walk_forward_folds(len(close), train_size, test_size, step, anchored)
+    if len(folds) == 0:
+        raise ValueError(f"{len(close)} bars are too few for train={train_size} and test={test_size}")
+    params, signals = grid_signals(close, rsi_pairs, macd_windows)
+    scores = train_scores(close, signals, folds, metric, leverage, fee, slippage)
+    # the first grid point wins when a fold has no defined score at all
+    chosen = np.argmax(np.where(np.isnan(scores), -np.inf, scores), axis=0)
+
+    bars_per_year = annual_bar_count(datetimes)
+    records, pieces, stamps, last_end = [], [], [], folds[0][1]
+    for fold, (train_start, test_start, test_end) in enumerate(folds):
+        # with step < test_size the windows overlap; only the new bars are stitched
+        stitch_start = max(test_start, last_end)
+        window = slice(test_start, test_end)
+        net = test_returns(close[window], signals[chosen[fold], window], leverage, fee, slippage)
+        pieces.append(net[stitch_start - test_start:])
+        # with step > test_size there are gaps between the windows, so each piece keeps its own timestamps
+        stamps.append(datetimes[stitch_start:test_end])
+        last_end = max(last_end, test_end)
+
+        equity = np.cumprod(np.maximum(1 + net, 0.0))
+        std = net.std(ddof=1) if len(net) > 1 else 0.0
+        records.append({
+            "fold": fold,
+            "train_from": pd.Timestamp(datetimes[train_start]),
+            "test_from": pd.Timestamp(datetimes[test_start]),
+            "test_to": pd.Timestamp(datetimes[test_end - 1]),
+            **params[chosen[fold]],
+            f"train_{metric}": float(scores[chosen[fold], fold]),
+            "test_return": float(equity[-1] - 1),
+            "test_max_drawdown": max_drawdown(equity),
+            "test_sharpe": float(net.mean() / std * np.sqrt(bars_per_year)) if std > 0 else 0.0,
+        })
+
+    stitched = np.concatenate(pieces)
+    equity = pd.Series(
+        np.cumprod(np.maximum(1 + stitched, 0.0)),
+        index=pd.DatetimeIndex(np.concatenate(stamps), name="datetime"),
+        name="equity",
+    )
+    return pd.DataFrame(records), equity
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Walk-forward optimization of the RSI/MACD strategy.")
+    parser.add_argument("--file", default="data/BTC_2019_2023_15m.csv", help="Raw OHLCV CSV file.")
+    parser.add_argument("--train", type=int, default=2880, help="Bars per train window.")
+    parser.add_argument("--test", type=int, default=480, help="Bars per test window.")
+    parser.add_argument("--step", type=int, default=None, help="Bars between folds (default: --test).")
+    parser.add_argument("--anchored", action="store_true", help="Grow the train window from the first bar.")
+    parser.add_argument("--rsi-low", default="20,25,30,35", help="Comma-separated lower RSI thresholds.")
+    parser.add_argument("--rsi-high", default="65,70,75,80", help="Comma-separated upper RSI thresholds.")
+    parser.add_argument("--macd", nargs="+", default=["12,26,9", "8,21,5", "5,35,5"], help="MACD variants as fast,slow,sign.")
+    parser.add_argument("--metric", default="sharpe", choices=METRICS)
+    parser.add_argument("--leverage", type=float, default=1)
+    parser.add_argument("--fee", type=float, default=0.001)
+    parser.add_argument("--slippage", type=float, default=0.0)
+    parser.add_argument("--output", default="walk_forward_results")
+    args = parser.parse_args()
+
+    close, datetimes = load_series(args.file)
+    rsi_pairs = [(low, high) for low, high in itertools.product(parse_values(args.rsi_low), parse_values(args.rsi_high)) if low < high]
+    macd_windows = [tuple(parse_values(variant, int)) for variant in args.macd]
+    folds, equity = walk_forward(
+        close, datetimes, rsi_pairs, macd_windows, args.train, args.test, args.step,
+        args.anchored, args.metric, args.leverage, args.fee, args.slippage,
+    )
+
+    os.makedirs(args.output, exist_ok=True)
+    name = os.path.splitext(os.path.basename(args.file))[0]
+    folds.to_csv(os.path.join(args.output, f"{name}_folds.csv"), index=False)
+    equity.to_csv(os.path.join(args.output, f"{name}_oos_equity.csv"))
+    print(folds.tail(10).to_string(index=False))
+    print(f"{len(folds)} folds, out-of-sample return {equity.iloc[-1] - 1:.2%}, "
+          f"max drawdown {max_drawdown(equity.to_numpy()):.2%}")
+    print(f"Results saved to {args.output}")